@@ -0,0 +1,98 @@
+# ************************************************
+#   AtlasTexturas.py
+#   Junta varias imagens (ladrilhos) em uma unica
+#   textura (atlas) e informa o retangulo de
+#   coordenadas de textura (u0, v0, u1, v1) de cada
+#   ladrilho. O atlas montado e guardado em disco e
+#   reaproveitado enquanto as imagens nao mudarem.
+# ************************************************
+
+import hashlib
+import json
+import math
+import os
+
+import numpy as npy
+from PIL import Image
+
+VERSAO_ATLAS = 1
+
+
+# Gera a chave que identifica o conteudo das imagens de origem
+def chaveAtlas(caminhos, margem):
+    itens = []
+    for chave, caminho in sorted(caminhos.items()):
+        info = os.stat(caminho)
+        itens.append([str(chave), os.path.basename(caminho), info.st_size, info.st_mtime_ns])
+    texto = json.dumps([VERSAO_ATLAS, margem, itens])
+    return hashlib.sha1(texto.encode("utf-8")).hexdigest()
+
+
+# Nome do arquivo de cache de um atlas com as chaves dadas; atlas com
+# conjuntos diferentes de imagens na mesma pasta nao disputam o arquivo
+def nomeCacheAtlas(chaves):
+    texto = json.dumps(sorted(str(chave) for chave in chaves))
+    return f"atlas_{hashlib.sha1(texto.encode('utf-8')).hexdigest()[:12]}.png"
+
+
+# Monta o atlas em memoria. Cada ladrilho ganha uma borda de 'margem'
+# pixels copiando os pixels da beirada, para que a filtragem linear nao
+# misture cores de ladrilhos vizinhos.
+def montarAtlas(caminhos, margem=4):
+    imagens = {chave: npy.asarray(Image.open(caminho).convert("RGBA")) for chave, caminho in caminhos.items()}
+    if not imagens:
+        return Image.new("RGBA", (1, 1)), {}
+    celula_l = max(img.shape[1] for img in imagens.values()) + 2 * margem
+    celula_a = max(img.shape[0] for img in imagens.values()) + 2 * margem
+    colunas = math.ceil(math.sqrt(len(imagens)))
+    linhas = math.ceil(len(imagens) / colunas)
+    largura, altura = colunas * celula_l, linhas * celula_a
+    atlas = npy.zeros((altura, largura, 4), dtype=npy.uint8)
+    uvs = {}
+    for i, (chave, img) in enumerate(sorted(imagens.items())):
+        x0 = (i % colunas) * celula_l
+        y0 = (i // colunas) * celula_a
+        a, l = img.shape[0], img.shape[1]
+        atlas[y0:y0 + a + 2 * margem, x0:x0 + l + 2 * margem] = npy.pad(
+            img, ((margem, margem), (margem, margem), (0, 0)), mode="edge")
+        uvs[chave] = ((x0 + margem) / largura, (y0 + margem) / altura,
+                      (x0 + margem + l) / largura, (y0 + margem + a) / altura)
+    return Image.fromarray(atlas, "RGBA"), uvs
+
+
+# Retorna (imagem, uvs) do atlas, lendo do cache em disco quando ele
+# corresponde as imagens atuais e montando (e salvando) caso contrario
+def carregarAtlas(caminhos, arquivo_cache, margem=4):
+    caminhos = {chave: c for chave, c in caminhos.items() if os.path.exists(c)}
+    chave = chaveAtlas(caminhos, margem)
+    arquivo_json = os.path.splitext(arquivo_cache)[0] + ".json"
+    try:
+        with open(arquivo_json, "r", encoding="utf-8") as f:
+            info = json.load(f)
+        if info.get("chave") == chave:
+            uvs = {int(k) if k.isdigit() else k: tuple(v) for k, v in info["uvs"].items()}
+            return Image.open(arquivo_cache).convert("RGBA"), uvs
+    except (OSError, ValueError, KeyError):
+        pass
+    imagem, uvs = montarAtlas(caminhos, margem)
+    try:
+        imagem.save(arquivo_cache)
+        with open(arquivo_json, "w", encoding="utf-8") as f:
+            json.dump({"chave": chave, "uvs": {str(k): v for k, v in uvs.items()}}, f)
+    except OSError as e:
+        print(f"Aviso: não foi possível salvar o atlas em cache: {e}")
+    return imagem, uvs
+
+
+# Cor media dos quatro cantos de cada ladrilho (0..1), que e o que a
+# filtragem linear com GL_REPEAT amostra na coordenada (0, 1) do ladrilho
+def corCantosLadrilhos(imagem, uvs):
+    pixels = npy.asarray(imagem.convert("RGB"), dtype=npy.float32) / 255.0
+    altura, largura = pixels.shape[0], pixels.shape[1]
+    cores = {}
+    for chave, (u0, v0, u1, v1) in uvs.items():
+        x0, y0 = int(round(u0 * largura)), int(round(v0 * altura))
+        x1, y1 = int(round(u1 * largura)) - 1, int(round(v1 * altura)) - 1
+        cantos = pixels[[y0, y0, y1, y1], [x0, x1, x0, x1]]
+        cores[chave] = tuple(float(c) for c in cantos.mean(axis=0))
+    return cores
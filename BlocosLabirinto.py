@@ -0,0 +1,194 @@
+# ************************************************
+#   BlocosLabirinto.py
+#   Divide o mapa em blocos de TAMANHO_BLOCO x
+#   TAMANHO_BLOCO celulas, cada um com sua caixa
+#   envolvente e suas proprias malhas (piso e
+#   paredes). A cada quadro as caixas sao testadas
+#   contra o volume de visao da camera (frustum) e
+#   so os blocos visiveis sao desenhados.
+#   Malhas com o retangulo de celulas de cada
+#   primitiva tambem podem ser desenhadas so nas
+#   celulas visiveis dos blocos visiveis.
+# ************************************************
+
+from OpenGL.GL import *
+import numpy as npy
+
+from MalhaGL import MalhaGL
+from VisibilidadeLabirinto import MalhaPorCelula
+
+TAMANHO_BLOCO = 16
+MARGEM = 0.5    # folga em volta de cada bloco para entidades na borda
+
+
+# Os seis planos (a, b, c, d) do volume de visao, com a normal para dentro,
+# tirados da matriz projecao * modelview (metodo de Gribb e Hartmann)
+def planosDoFrustum(projecao, modelview):
+    matriz = npy.asarray(projecao, dtype=npy.float64) @ npy.asarray(modelview, dtype=npy.float64)
+    planos = npy.array([matriz[3] + matriz[0], matriz[3] - matriz[0],
+                        matriz[3] + matriz[1], matriz[3] - matriz[1],
+                        matriz[3] + matriz[2], matriz[3] - matriz[2]])
+    return planos / npy.linalg.norm(planos[:, :3], axis=1)[:, None]
+
+
+# Planos do volume de visao atual do OpenGL. As matrizes voltam na ordem
+# de colunas do OpenGL, por isso sao transpostas.
+def planosDoFrustumAtual():
+    projecao = npy.array(glGetDoublev(GL_PROJECTION_MATRIX)).reshape(4, 4).T
+    modelview = npy.array(glGetDoublev(GL_MODELVIEW_MATRIX)).reshape(4, 4).T
+    return planosDoFrustum(projecao, modelview)
+
+
+# Verifica quais caixas (minimos, maximos), (N, 3) cada, tem alguma parte
+# dentro dos planos: a caixa fica de fora se o seu canto mais a frente de
+# algum plano (na direcao da normal) estiver atras dele
+def caixasVisiveis(planos, minimos, maximos):
+    visiveis = npy.ones(len(minimos), dtype=bool)
+    for a, b, c, d in planos:
+        normal = npy.array([a, b, c])
+        canto = npy.where(normal >= 0, maximos, minimos)
+        visiveis &= canto @ normal + d >= 0
+    return visiveis
+
+
+""" Classe BlocosLabirinto """
+class BlocosLabirinto:
+    def __init__(self, largura, altura, altura_minima=1.0, tamanho=TAMANHO_BLOCO):
+        self.tamanho = tamanho
+        self.largura = largura
+        self.altura = altura
+        self.colunas = -(-largura // tamanho)
+        self.linhas = -(-altura // tamanho)
+        total = self.colunas * self.linhas
+        # Caixa de cada bloco: a area das suas celulas com a margem, do chao
+        # ate 'altura_minima', aumentada com o que for colocado nele
+        linhas, colunas = npy.divmod(npy.arange(total), max(self.colunas, 1))
+        self.minimos = npy.stack([colunas * tamanho - MARGEM, npy.zeros(total),
+                                  linhas * tamanho - MARGEM], axis=1).astype(npy.float64)
+        self.maximos = npy.stack([npy.minimum((colunas + 1) * tamanho, largura) + MARGEM,
+                                  npy.full(total, float(altura_minima)),
+                                  npy.minimum((linhas + 1) * tamanho, altura) + MARGEM], axis=1)
+        self.malhas = {}        # nome -> lista com uma MalhaGL (ou None) por bloco
+        self.janelas = {}       # nome -> (x0, z0, x1, z1) das celulas cobertas em cada bloco
+        self.visiveis = npy.ones(total, dtype=bool)
+        self.desenhados = total
+        self.montado = False
+
+    def __len__(self):
+        return self.colunas * self.linhas
+
+    """ Indice do bloco de cada ponto (x, z) do mundo; fora do mapa, -1 ou,
+        com 'limitar', o bloco mais perto """
+    def blocosDosPontos(self, xs, zs, limitar=False):
+        bx = npy.floor(npy.asarray(xs, dtype=npy.float64) / self.tamanho).astype(npy.int64)
+        bz = npy.floor(npy.asarray(zs, dtype=npy.float64) / self.tamanho).astype(npy.int64)
+        if limitar:
+            return npy.clip(bz, 0, self.linhas - 1) * self.colunas + npy.clip(bx, 0, self.colunas - 1)
+        dentro = (bx >= 0) & (bz >= 0) & (bx < self.colunas) & (bz < self.linhas)
+        return npy.where(dentro, bz * self.colunas + bx, -1)
+
+    """ Separa as primitivas de 'vertices' (grupos de 'por_primitiva'
+        vertices intercalados, com x, y, z a partir da coluna
+        'inicio_posicao') pelo bloco do seu centro e guarda uma MalhaGL por
+        bloco com o nome dado, aumentando as caixas para conter tudo. Com
+        'retangulos' (x0, z0, largura, profundidade das celulas cobertas
+        por cada primitiva), cada bloco guarda uma MalhaPorCelula, que pode
+        ser desenhada so nas celulas visiveis (desenharCelulas) """
+    def adicionarMalha(self, nome, vertices, primitiva, formato, por_primitiva, inicio_posicao,
+                       retangulos=None):
+        self.liberarMalha(nome)
+        vertices = npy.asarray(vertices, dtype=npy.float32)
+        grupos = vertices.reshape(-1, por_primitiva, vertices.shape[1])
+        posicoes = grupos[:, :, inicio_posicao:inicio_posicao + 3]
+        centros = posicoes.mean(axis=1)
+        blocos = self.blocosDosPontos(centros[:, 0], centros[:, 2], limitar=True)
+        self.incluirCaixas(blocos, posicoes.min(axis=1), posicoes.max(axis=1))
+        ordem = npy.argsort(blocos, kind='stable')
+        inicios = npy.searchsorted(blocos[ordem], npy.arange(len(self) + 1))
+        if retangulos is not None:
+            x0, z0, larguras, profundidades = npy.broadcast_arrays(*(npy.asarray(r, dtype=npy.int64)
+                                                                     for r in retangulos), blocos)[:4]
+            x1, z1 = x0 + larguras, z0 + profundidades
+            # Janela de cada bloco: a caixa dos retangulos das suas primitivas
+            # (vazia nos blocos sem nenhuma)
+            janelas = npy.zeros((4, len(self)), dtype=npy.int64)
+            janelas[0:2] = npy.iinfo(npy.int64).max
+            npy.minimum.at(janelas[0], blocos, x0)
+            npy.minimum.at(janelas[1], blocos, z0)
+            npy.maximum.at(janelas[2], blocos, x1)
+            npy.maximum.at(janelas[3], blocos, z1)
+            janelas[0:2] = npy.minimum(janelas[0:2], janelas[2:4])
+            self.janelas[nome] = tuple(janelas)
+        malhas = []
+        for bloco in range(len(self)):
+            selecionadas = ordem[inicios[bloco]:inicios[bloco + 1]]
+            if len(selecionadas) == 0:
+                malhas.append(None)
+                continue
+            dados = grupos[selecionadas].reshape(-1, vertices.shape[1])
+            if retangulos is None:
+                malhas.append(MalhaGL(dados, primitiva, formato))
+            else:
+                malhas.append(MalhaPorCelula(dados, (x0[selecionadas], z0[selecionadas], larguras[selecionadas],
+                                                     profundidades[selecionadas]), primitiva, formato, por_primitiva))
+        self.malhas[nome] = malhas
+
+    """ Aumenta as caixas dos blocos indicados para conter as caixas
+        (minimos, maximos) dadas, (N, 3) cada """
+    def incluirCaixas(self, blocos, minimos, maximos):
+        blocos = npy.asarray(blocos, dtype=npy.int64)
+        validos = blocos >= 0
+        npy.minimum.at(self.minimos, blocos[validos], npy.asarray(minimos)[validos])
+        npy.maximum.at(self.maximos, blocos[validos], npy.asarray(maximos)[validos])
+
+    """ Testa as caixas contra os planos do volume de visao """
+    def atualizarVisiveis(self, planos):
+        self.visiveis = caixasVisiveis(planos, self.minimos, self.maximos)
+        self.desenhados = int(npy.count_nonzero(self.visiveis))
+
+    """ Mascara dos pontos (x, z) que estao em blocos visiveis """
+    def pontosVisiveis(self, xs, zs):
+        blocos = self.blocosDosPontos(xs, zs)
+        if len(self) == 0:
+            return npy.zeros(blocos.shape, dtype=bool)
+        return (blocos >= 0) & self.visiveis[npy.maximum(blocos, 0)]
+
+    """ Verifica se a celula (x, z) esta em um bloco visivel """
+    def celulaVisivel(self, x, z):
+        bx, bz = int(x) // self.tamanho, int(z) // self.tamanho
+        if not (0 <= bx < self.colunas and 0 <= bz < self.linhas):
+            return False
+        return bool(self.visiveis[bz * self.colunas + bx])
+
+    """ Desenha a malha 'nome' dos blocos visiveis """
+    def desenhar(self, nome):
+        for bloco, malha in enumerate(self.malhas.get(nome, ())):
+            if malha is not None and self.visiveis[bloco]:
+                malha.desenhar()
+
+    """ Desenha a malha 'nome' (montada com retangulos) so nas celulas
+        marcadas em 'celulas' (CelulasVisiveis) dos blocos visiveis.
+        Retorna quantas primitivas foram desenhadas """
+    def desenharCelulas(self, nome, celulas):
+        malhas = self.malhas.get(nome, ())
+        if not malhas:
+            return 0
+        blocos = npy.nonzero(self.visiveis & celulas.retangulosMarcados(*self.janelas[nome]))[0]
+        desenhadas = 0
+        for bloco in blocos.tolist():
+            malhas[bloco].desenharCelulas(celulas)
+            desenhadas += malhas[bloco].desenhadas
+        return desenhadas
+
+    """ Libera os VBOs da malha 'nome' de todos os blocos """
+    def liberarMalha(self, nome):
+        self.janelas.pop(nome, None)
+        for malha in self.malhas.pop(nome, ()):
+            if malha is not None:
+                malha.liberar()
+
+    """ Libera os VBOs de todas as malhas """
+    def liberar(self):
+        for nome in list(self.malhas):
+            self.liberarMalha(nome)
+        self.montado = False
@@ -0,0 +1,132 @@
+# ************************************************
+#   CampoFluxo.py
+#   Campo de distancias (busca em largura sobre as
+#   celulas livres) a partir da celula do jogador.
+#   Cada inimigo segue para a celula vizinha mais
+#   proxima do jogador, contornando as paredes.
+#   A busca anda por niveis: cada nivel e expandido
+#   de uma vez com operacoes de array, e pode ser
+#   continuada no quadro seguinte quando passar do
+#   tempo reservado por quadro.
+# ************************************************
+
+import time
+
+import numpy as npy
+
+PAREDE = -2       # distancia das celulas que nao sao livres
+NAO_ALCANCADA = -1
+
+""" Classe CampoFluxo """
+class CampoFluxo:
+    def __init__(self, livre, raio=None):
+        # livre: (altura, largura) bool -> celulas por onde os inimigos andam
+        # raio:  a busca para apos 'raio' passos (None = mapa inteiro)
+        livre = npy.asarray(livre, dtype=bool)
+        self.altura, self.largura = livre.shape
+        self.raio = raio
+        total = self.altura * self.largura
+        # Um indice extra (total) funciona como parede de fora do mapa
+        self.base = npy.full(total + 1, PAREDE, dtype=npy.int32)
+        self.base[:total][livre.reshape(-1)] = NAO_ALCANCADA
+        self.vizinhos = self.tabelaVizinhos()
+        self.marca = npy.zeros(total + 1, dtype=npy.int64)
+        # Campo pronto (usado pelos inimigos) e busca em andamento
+        self.distancia = self.base.copy()
+        self.origem = None
+        self.origem_busca = None
+        self.em_calculo = None
+        self.fronteira = None
+        self.nivel = 0
+
+    """ Indices dos vizinhos norte, sul, oeste e leste de cada celula """
+    def tabelaVizinhos(self):
+        total = self.altura * self.largura
+        ys, xs = npy.divmod(npy.arange(total), self.largura)
+        vizinhos = npy.full((total + 1, 4), total, dtype=npy.int64)
+        indices = npy.arange(total)
+        vizinhos[:total, 0] = npy.where(ys > 0, indices - self.largura, total)
+        vizinhos[:total, 1] = npy.where(ys < self.altura - 1, indices + self.largura, total)
+        vizinhos[:total, 2] = npy.where(xs > 0, indices - 1, total)
+        vizinhos[:total, 3] = npy.where(xs < self.largura - 1, indices + 1, total)
+        return vizinhos
+
+    """ Chamado a cada quadro com a celula do jogador. Se ela mudou e nao
+        ha busca em andamento, comeca uma nova; a busca avanca ate gastar
+        'orcamento' segundos e so substitui o campo atual quando termina.
+        Retorna True quando um novo campo ficou pronto. """
+    def atualizar(self, x, y, orcamento=0.001):
+        if self.fronteira is None:
+            if self.origem == (x, y):
+                return False
+            self.iniciar(x, y)
+        return self.avancar(orcamento)
+
+    """ Calcula o campo inteiro a partir da celula (x, y) de uma vez """
+    def calcular(self, x, y):
+        self.iniciar(x, y)
+        self.avancar()
+
+    """ Comeca uma busca em largura a partir da celula (x, y) """
+    def iniciar(self, x, y):
+        self.origem_busca = (x, y)
+        self.em_calculo = self.base.copy()
+        self.fronteira = npy.zeros(0, dtype=npy.int64)
+        self.nivel = 0
+        if 0 <= x < self.largura and 0 <= y < self.altura:
+            inicio = y * self.largura + x
+            if self.em_calculo[inicio] == NAO_ALCANCADA:
+                self.em_calculo[inicio] = 0
+                self.fronteira = npy.array([inicio], dtype=npy.int64)
+
+    """ Expande niveis da busca ate ela terminar ou passar de 'orcamento'
+        segundos (None = sem limite). Retorna True se a busca terminou. """
+    def avancar(self, orcamento=None):
+        inicio = time.perf_counter()
+        limite = None if orcamento is None else inicio + orcamento
+        distancia = self.em_calculo
+        fronteira = self.fronteira
+        while len(fronteira) and (self.raio is None or self.nivel < self.raio):
+            self.nivel += 1
+            novos = self.vizinhos[fronteira].reshape(-1)
+            novos = novos[distancia[novos] == NAO_ALCANCADA]
+            distancia[novos] = self.nivel
+            # Tira as repeticoes (celula vizinha de duas da fronteira) sem
+            # ordenar: fica so a ultima ocorrencia de cada indice
+            ordem = npy.arange(len(novos))
+            self.marca[novos] = ordem
+            fronteira = novos[self.marca[novos] == ordem]
+            # Para antes de um nivel que passaria do limite (estimado pelo
+            # tempo do nivel que acabou de ser feito)
+            agora = time.perf_counter()
+            if limite is not None and 2 * agora - inicio > limite:
+                self.fronteira = fronteira
+                return False
+            inicio = agora
+        self.distancia = distancia
+        self.origem = self.origem_busca
+        self.fronteira = None
+        self.em_calculo = None
+        return True
+
+    """ Distancias em passos de cada celula, (altura, largura); PAREDE
+        nas paredes e NAO_ALCANCADA onde a busca nao chegou """
+    def grade(self):
+        return self.distancia[:-1].reshape(self.altura, self.largura)
+
+    """ Proximo ponto de cada inimigo: o centro da celula vizinha mais
+        perto do jogador. Retorna (alvo_x, alvo_z, segue); 'segue' e False
+        onde o campo nao serve (fora do campo, na celula do jogador ou ao
+        lado dela) e o inimigo deve ir direto ao jogador. """
+    def proximoPasso(self, xs, zs):
+        cx = npy.trunc(xs).astype(npy.int64)
+        cz = npy.trunc(zs).astype(npy.int64)
+        dentro = (cx >= 0) & (cz >= 0) & (cx < self.largura) & (cz < self.altura)
+        indices = npy.where(dentro, cz * self.largura + cx, self.altura * self.largura)
+        vizinhos = self.vizinhos[indices]
+        custos = self.distancia[vizinhos].astype(npy.int64)
+        custos[custos < 0] = npy.iinfo(npy.int64).max
+        melhor = vizinhos[npy.arange(len(indices)), npy.argmin(custos, axis=1)]
+        segue = (self.distancia[indices] > 1) & (self.distancia[melhor] >= 0)
+        alvo_z, alvo_x = npy.divmod(melhor, self.largura)
+        return alvo_x + 0.5, alvo_z + 0.5, segue
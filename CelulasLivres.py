@@ -0,0 +1,113 @@
+# ************************************************
+#   CelulasLivres.py
+#   Indice das celulas livres (piso sem ninguem em
+#   cima) mantido enquanto jogador, inimigos e
+#   capsulas entram e saem das celulas. Sortear uma
+#   celula livre custa O(1), sem varrer o mapa.
+# ************************************************
+
+import random
+
+import numpy as npy
+
+""" Classe IndiceCelulasLivres """
+class IndiceCelulasLivres:
+    def __init__(self, piso):
+        # piso: (altura, largura) bool -> celulas em que algo pode ficar
+        self.piso = npy.asarray(piso, dtype=bool)
+        # ocupacao: quantas entidades estao em cada celula
+        self.ocupacao = npy.zeros(self.piso.shape, dtype=npy.int32)
+        # celulas[:quantidade] sao as celulas livres (x, y), sem ordem;
+        # posicao[y, x] e o indice da celula nesse array (ou -1)
+        zs, xs = npy.nonzero(self.piso)
+        self.celulas = npy.stack([xs, zs], axis=1).astype(npy.int32)
+        self.quantidade = len(self.celulas)
+        self.posicao = npy.full(self.piso.shape, -1, dtype=npy.int32)
+        self.posicao[zs, xs] = npy.arange(self.quantidade, dtype=npy.int32)
+
+    def __len__(self):
+        return self.quantidade
+
+    """ Verifica se (x, y) e piso dentro do mapa """
+    def dentro(self, x, y):
+        return 0 <= y < self.piso.shape[0] and 0 <= x < self.piso.shape[1] and bool(self.piso[y, x])
+
+    """ Tira a celula do indice trocando-a com a ultima (swap-remove) """
+    def remover(self, x, y):
+        i = self.posicao[y, x]
+        if i < 0:
+            return
+        self.quantidade -= 1
+        ultima = self.celulas[self.quantidade]
+        self.celulas[i] = ultima
+        self.posicao[ultima[1], ultima[0]] = i
+        self.posicao[y, x] = -1
+
+    """ Devolve a celula ao fim do indice """
+    def inserir(self, x, y):
+        if self.posicao[y, x] >= 0:
+            return
+        self.celulas[self.quantidade] = (x, y)
+        self.posicao[y, x] = self.quantidade
+        self.quantidade += 1
+
+    """ Marca mais uma entidade na celula (x, y) """
+    def ocupar(self, x, y):
+        if not self.dentro(x, y):
+            return
+        self.ocupacao[y, x] += 1
+        if self.ocupacao[y, x] == 1:
+            self.remover(x, y)
+
+    """ Marca a saida de uma entidade da celula (x, y) """
+    def liberar(self, x, y):
+        if not self.dentro(x, y) or self.ocupacao[y, x] == 0:
+            return
+        self.ocupacao[y, x] -= 1
+        if self.ocupacao[y, x] == 0:
+            self.inserir(x, y)
+
+    """ Move uma entidade de uma celula para outra """
+    def mover(self, origem, destino):
+        if origem == destino:
+            return
+        self.liberar(*origem)
+        self.ocupar(*destino)
+
+    """ Move varias entidades de uma vez: origens e destinos (N, 2) em (x, y) """
+    def moverVarias(self, origens, destinos):
+        origens = npy.asarray(origens, dtype=npy.int64).reshape(-1, 2)
+        destinos = npy.asarray(destinos, dtype=npy.int64).reshape(-1, 2)
+        mudou = (origens != destinos).any(axis=1)
+        saidas = self.indicesNoPiso(origens[mudou])
+        entradas = self.indicesNoPiso(destinos[mudou])
+        if len(saidas) == 0 and len(entradas) == 0:
+            return
+        ocupacao = self.ocupacao.reshape(-1)
+        afetadas = npy.unique(npy.concatenate([saidas, entradas]))
+        antes = ocupacao[afetadas] > 0
+        npy.subtract.at(ocupacao, saidas, 1)
+        npy.add.at(ocupacao, entradas, 1)
+        ocupacao[afetadas] = npy.maximum(ocupacao[afetadas], 0)
+        depois = ocupacao[afetadas] > 0
+        largura = self.piso.shape[1]
+        for i in afetadas[antes & ~depois]:
+            self.inserir(int(i % largura), int(i // largura))
+        for i in afetadas[~antes & depois]:
+            self.remover(int(i % largura), int(i // largura))
+
+    """ Indices lineares das celulas (x, y) que sao piso dentro do mapa """
+    def indicesNoPiso(self, celulas):
+        altura, largura = self.piso.shape
+        x, y = celulas[:, 0], celulas[:, 1]
+        dentro = (x >= 0) & (y >= 0) & (x < largura) & (y < altura)
+        x, y = x[dentro], y[dentro]
+        no_piso = self.piso[y, x]
+        return y[no_piso] * largura + x[no_piso]
+
+    """ Sorteia uma celula livre (x, y), ou None se nao houver """
+    def sortear(self):
+        if self.quantidade == 0:
+            return None
+        x, y = self.celulas[random.randrange(self.quantidade)]
+        return int(x), int(y)
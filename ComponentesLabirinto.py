@@ -0,0 +1,78 @@
+# ************************************************
+#   ComponentesLabirinto.py
+#   Componentes conexos das celulas livres (vizinhas
+#   nos 4 lados). Cada linha do mapa e dividida em
+#   trechos contiguos de celulas livres; trechos de
+#   linhas seguidas que se tocam sao unidos com uma
+#   union-find vetorizada (ligacao ao menor rotulo
+#   e saltos de ponteiro), tudo com arrays numpy.
+# ************************************************
+
+import numpy as npy
+
+FORA = -1   # rotulo das celulas que nao sao livres
+
+""" Classe ComponentesConexos """
+class ComponentesConexos:
+    def __init__(self, livre):
+        # livre: (altura, largura) bool -> celulas por onde se anda
+        self.rotular(livre)
+
+    """ Rotula as celulas de 'livre': rotulos[y, x] e o componente da
+        celula (0, 1, ... na ordem em que aparecem no mapa) ou FORA """
+    def rotular(self, livre):
+        livre = npy.asarray(livre, dtype=bool)
+        self.altura, self.largura = livre.shape
+        # Trechos: comecam em toda celula livre cuja vizinha da esquerda nao e
+        # (ou que esta na primeira coluna), entao nenhum atravessa duas linhas
+        comeco = livre.copy()
+        comeco[:, 1:] &= ~livre[:, :-1]
+        trecho = npy.cumsum(comeco.reshape(-1)).reshape(livre.shape) - 1
+        quantidade_trechos = int(comeco.sum())
+
+        # Pares de trechos que se tocam entre uma linha e a de baixo; so a
+        # primeira coluna de cada contato conta (as seguintes repetem o par)
+        tocam = livre[:-1] & livre[1:]
+        contato = tocam.copy()
+        contato[:, 1:] &= ~tocam[:, :-1]
+        a = npy.concatenate([trecho[:-1][contato], trecho[1:][contato]])
+        b = npy.concatenate([trecho[1:][contato], trecho[:-1][contato]])
+
+        raiz = npy.arange(quantidade_trechos)
+        while len(a):
+            anterior = raiz.copy()
+            npy.minimum.at(raiz, raiz[a], raiz[b])
+            while True:
+                salto = raiz[raiz]
+                if npy.array_equal(salto, raiz):
+                    break
+                raiz = salto
+            if npy.array_equal(raiz, anterior):
+                break
+
+        # A raiz e o menor trecho do componente, entao a ordem dos rotulos
+        # segue a ordem de leitura do mapa
+        eh_raiz = raiz == npy.arange(quantidade_trechos)
+        rotulo_trecho = (npy.cumsum(eh_raiz) - 1)[raiz]
+        self.quantidade = int(eh_raiz.sum())
+        self.rotulos = npy.full(livre.shape, FORA, dtype=npy.int32)
+        self.rotulos[livre] = rotulo_trecho[trecho[livre]]
+        self.tamanhos = npy.bincount(self.rotulos[livre], minlength=self.quantidade)
+
+    """ Componente da celula (x, y), ou FORA """
+    def componente(self, x, y):
+        if not (0 <= x < self.largura and 0 <= y < self.altura):
+            return FORA
+        return int(self.rotulos[y, x])
+
+    """ Verifica se da para andar da celula 'origem' ate 'destino' (x, y) """
+    def alcancavel(self, origem, destino):
+        rotulo = self.componente(*origem)
+        return rotulo != FORA and rotulo == self.componente(*destino)
+
+    """ Mascara (altura, largura) das celulas alcancaveis a partir de (x, y) """
+    def alcancaveis(self, x, y):
+        rotulo = self.componente(x, y)
+        if rotulo == FORA:
+            return npy.zeros((self.altura, self.largura), dtype=bool)
+        return self.rotulos == rotulo
@@ -0,0 +1,121 @@
+# ************************************************
+#   GradeLabirinto.py
+#   Grade de ocupacao do labirinto: um uint8 por
+#   celula com os bits abaixo, montada uma vez ao
+#   carregar o mapa. As consultas de colisao viram
+#   uma unica leitura no array.
+# ************************************************
+
+import math
+
+import numpy as npy
+
+PAREDE = 0x01           # celula 0 do mapa
+PISO = 0x02             # celula livre (1, 2 ou 3 no mapa)
+JANELA = 0x04
+PORTA = 0x08
+OBJETO = 0x10           # objeto estatico (modelo TRI)
+BLOQUEIA_JOGADOR = 0x80 # resumo: o jogador nao pode entrar na celula
+
+FOLGA = 1e-6            # distancia deixada entre o circulo e a parede
+
+
+# Monta a grade a partir do mapa e das listas de janelas, portas e objetos
+def construirGrade(mapa, janelas, portas, objetos_estaticos):
+    tipos = npy.array(mapa, dtype=npy.int16).reshape(len(mapa), -1)
+    grade = npy.zeros(tipos.shape, dtype=npy.uint8)
+    grade[tipos == 0] |= PAREDE
+    grade[npy.isin(tipos, (1, 2, 3))] |= PISO
+    for lista, bit in ((janelas, JANELA), (portas, PORTA), (objetos_estaticos, OBJETO)):
+        for item in lista:
+            grade[item['y'], item['x']] |= bit
+    # Regra de colisao do jogador, lida por pontoBloqueado e
+    # pontosBloqueados: janela e objeto bloqueiam, porta libera, e o resto
+    # depende de a celula ser piso
+    bloqueada = ((grade & (JANELA | OBJETO)) != 0) | (((grade & PORTA) == 0) & ((grade & PISO) == 0))
+    grade[bloqueada] |= BLOQUEIA_JOGADOR
+    return grade
+
+
+# Verifica se o ponto (x, z) do mundo cai em celula que bloqueia o jogador.
+# A celula e obtida truncando as coordenadas, como int() faz; fora do
+# mapa conta como bloqueado.
+def pontoBloqueado(grade, x, z):
+    cx, cz = int(x), int(z)
+    if cx < 0 or cz < 0 or cz >= grade.shape[0] or cx >= grade.shape[1]:
+        return True
+    return bool(grade[cz, cx] & BLOQUEIA_JOGADOR)
+
+
+# Celulas (cx, cz) dos pontos, truncando como int(), e a mascara dos
+# pontos que caem dentro do mapa
+def celulasDosPontos(grade, xs, zs):
+    cx = npy.trunc(npy.asarray(xs, dtype=npy.float64)).astype(npy.int64)
+    cz = npy.trunc(npy.asarray(zs, dtype=npy.float64)).astype(npy.int64)
+    dentro = (cx >= 0) & (cz >= 0) & (cz < grade.shape[0]) & (cx < grade.shape[1])
+    return cx, cz, dentro
+
+
+# Versao vetorizada de pontoBloqueado para varios pontos de uma vez
+def pontosBloqueados(grade, xs, zs):
+    cx, cz, dentro = celulasDosPontos(grade, xs, zs)
+    bloqueados = npy.ones(cx.shape, dtype=bool)
+    bloqueados[dentro] = (grade[cz[dentro], cx[dentro]] & BLOQUEIA_JOGADOR) != 0
+    return bloqueados
+
+
+# Verifica, para varios pontos, se caem em celula de piso (a mesma regra
+# de Labirinto3D.livre: fora do mapa nao e piso)
+def pontosNoPiso(grade, xs, zs):
+    cx, cz, dentro = celulasDosPontos(grade, xs, zs)
+    piso = npy.zeros(cx.shape, dtype=bool)
+    piso[dentro] = (grade[cz[dentro], cx[dentro]] & PISO) != 0
+    return piso
+
+
+# Verifica se a celula (cx, cz) bloqueia o jogador; fora do mapa conta
+# como bloqueada
+def celulaBloqueada(grade, cx, cz):
+    if cx < 0 or cz < 0 or cz >= grade.shape[0] or cx >= grade.shape[1]:
+        return True
+    return bool(grade[cz, cx] & BLOQUEIA_JOGADOR)
+
+
+# Quanto um circulo de 'raio' centrado em (a, b) pode andar 'd' (com sinal)
+# no eixo a antes de encostar em uma celula bloqueada. 'bloqueada(ca, cb)'
+# diz se a celula bloqueia, com os eixos na mesma ordem. As colunas que o
+# circulo cruza sao visitadas em ordem (DDA em um eixo), e a busca para na
+# primeira com contato: o contato nela sempre vem antes do das seguintes.
+def avancoNoEixo(bloqueada, a, b, d, raio):
+    if d == 0:
+        return 0.0
+    passo = 1 if d > 0 else -1
+    linhas = range(math.floor(b - raio), math.floor(b + raio) + 1)
+    coluna = math.floor(a) + passo
+    ultima = math.floor(a + d + passo * raio)
+    while (ultima - coluna) * passo >= 0:
+        borda = coluna if passo > 0 else coluna + 1
+        contato = None
+        for linha in linhas:
+            # Distancia do centro a celula no outro eixo: 0 se o centro esta
+            # na faixa da linha, senao ate a aresta mais proxima (contato
+            # com o canto)
+            lateral = 0.0 if linha <= b <= linha + 1 else min(abs(b - linha), abs(b - linha - 1))
+            if lateral >= raio or not bloqueada(coluna, linha):
+                continue
+            t = abs(borda - a) - math.sqrt(raio * raio - lateral * lateral)
+            contato = t if contato is None else min(contato, t)
+        if contato is not None:
+            return passo * min(abs(d), max(contato - FOLGA, 0.0))
+        coluna += passo
+    return d
+
+
+# Move um circulo de 'raio' de (x, z) por (dx, dz) contra as celulas que
+# bloqueiam o jogador: anda primeiro em x e depois em z, cada eixo ate a
+# parede, de modo que o movimento desliza ao longo dela. Retorna a posicao
+# final (x, z).
+def moverCirculo(grade, x, z, dx, dz, raio):
+    x += avancoNoEixo(lambda cx, cz: celulaBloqueada(grade, cx, cz), x, z, dx, raio)
+    z += avancoNoEixo(lambda cz, cx: celulaBloqueada(grade, cx, cz), z, x, dz, raio)
+    return x, z
@@ -0,0 +1,86 @@
+# ************************************************
+#   HashEspacial.py
+#   Baldes de entidades por celula do mapa. As
+#   entidades sao ordenadas pela chave da celula e
+#   o trecho de cada celula e achado por busca
+#   binaria nas chaves ordenadas, entao montar os
+#   baldes custa o numero de entidades, nao o
+#   tamanho do mapa. Consultas olham so as 3x3
+#   celulas em volta.
+# ************************************************
+
+import numpy as npy
+
+# Metade da vizinhanca 3x3 (sem a propria celula): cada par de celulas
+# vizinhas aparece uma vez so
+VIZINHAS_METADE = ((1, 0), (-1, 1), (0, 1), (1, 1))
+
+""" Classe HashEspacial """
+class HashEspacial:
+    def __init__(self, largura, altura):
+        self.largura = largura
+        self.altura = altura
+        self.reconstruir((), ())
+
+    def __len__(self):
+        return len(self.ordem)
+
+    """ Distribui as entidades (xs[i], zs[i]) nos baldes das suas celulas """
+    def reconstruir(self, xs, zs):
+        xs = npy.asarray(xs, dtype=npy.float64).reshape(-1)
+        zs = npy.asarray(zs, dtype=npy.float64).reshape(-1)
+        self.cx = npy.clip(npy.trunc(xs).astype(npy.int64), 0, self.largura - 1)
+        self.cz = npy.clip(npy.trunc(zs).astype(npy.int64), 0, self.altura - 1)
+        celulas = self.cz * self.largura + self.cx
+        # Ordenacao estavel: dentro de um balde os indices ficam crescentes
+        self.ordem = npy.argsort(celulas, kind='stable')
+        self.chaves = celulas[self.ordem]
+
+    """ Posicao no array ordenado onde comeca o balde de cada celula
+        (linear) dada; o balde da celula c vai ate o inicio de c + 1 """
+    def inicio(self, celulas):
+        return npy.searchsorted(self.chaves, celulas)
+
+    """ Indices das entidades na celula (cx, cz) """
+    def naCelula(self, cx, cz):
+        if not (0 <= cx < self.largura and 0 <= cz < self.altura):
+            return self.ordem[:0]
+        celula = cz * self.largura + cx
+        inicio, fim = self.inicio([celula, celula + 1]).tolist()
+        return self.ordem[inicio:fim]
+
+    """ Indices (crescentes) das entidades nas 3x3 celulas em volta de (x, z) """
+    def perto(self, x, z):
+        cx, cz = int(x), int(z)
+        x0, x1 = max(cx - 1, 0), min(cx + 2, self.largura)
+        linhas = [vz * self.largura for vz in range(max(cz - 1, 0), min(cz + 2, self.altura))]
+        if x0 >= x1 or not linhas:
+            return self.ordem[:0]
+        # As celulas vizinhas de uma linha sao contiguas nos baldes
+        limites = self.inicio([linha + x for linha in linhas for x in (x0, x1)]).tolist()
+        trechos = [self.ordem[inicio:fim] for inicio, fim in zip(limites[0::2], limites[1::2])]
+        return npy.sort(npy.concatenate(trechos))
+
+    """ Todos os pares (i, j) de entidades na mesma celula ou em celulas
+        vizinhas, cada par uma vez. O custo e proporcional ao numero de
+        pares, que e linear enquanto cada celula tiver poucas entidades. """
+    def pares(self):
+        # Trabalha na ordem dos baldes: entidades da mesma celula sao
+        # vizinhas no array, e cada uma so forma par com as que vem depois
+        posicoes = npy.arange(len(self.ordem))
+        cx, cz = self.cx[self.ordem], self.cz[self.ordem]
+        todos_a, todos_b = [posicoes[:0]], [posicoes[:0]]
+        for ox, oz in ((0, 0),) + VIZINHAS_METADE:
+            vx, vz = cx + ox, cz + oz
+            dentro = (vx >= 0) & (vx < self.largura) & (vz < self.altura)
+            celula = (vz * self.largura + vx)[dentro]
+            origem = posicoes[dentro]
+            inicio = origem + 1 if ox == 0 and oz == 0 else self.inicio(celula)
+            vezes = self.inicio(celula + 1) - inicio
+            tem = vezes > 0
+            origem, inicio, vezes = origem[tem], inicio[tem], vezes[tem]
+            # Para cada origem, os indices inicio, inicio + 1, ... do balde
+            fim = npy.cumsum(vezes)
+            todos_a.append(npy.repeat(origem, vezes))
+            todos_b.append(npy.arange(fim[-1] if len(fim) else 0) + npy.repeat(inicio - (fim - vezes), vezes))
+        return self.ordem[npy.concatenate(todos_a)], self.ordem[npy.concatenate(todos_b)]
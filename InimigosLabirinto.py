@@ -0,0 +1,117 @@
+# ************************************************
+#   InimigosLabirinto.py
+#   Inimigos guardados como arrays numpy (um array
+#   por atributo), para que o passo de perseguicao
+#   de todos eles seja feito com poucas operacoes
+#   de array contra a grade do mapa.
+# ************************************************
+
+import numpy as npy
+
+import GradeLabirinto as GRADE
+
+# Estado de cada inimigo apos o ultimo passo
+PARADO = 0        # em cima do jogador (distancia <= 0.01), nao se move
+PERSEGUINDO = 1   # andou na direcao do jogador
+DESLIZANDO = 2    # bateu na parede e andou so em um dos eixos
+BLOQUEADO = 3     # nenhum dos dois eixos estava livre
+
+""" Classe Inimigos """
+class Inimigos:
+    VELOCIDADE = 20.0
+    DISTANCIA_CAPTURA = 0.7
+    DISTANCIA_SEPARACAO = 0.8   # duas esferas de raio 0.4 encostadas
+
+    def __init__(self, xs=(), zs=()):
+        self.definir(xs, zs)
+
+    def __len__(self):
+        return len(self.x)
+
+    """ Substitui todos os inimigos pelos das posicoes (xs, zs) """
+    def definir(self, xs, zs):
+        self.x = npy.array(xs, dtype=npy.float64).reshape(-1)
+        self.z = npy.array(zs, dtype=npy.float64).reshape(-1)
+        self.estado = npy.full(len(self.x), PARADO, dtype=npy.uint8)
+
+    """ Celulas (x, y) do mapa em que estao os inimigos, (N, 2) """
+    def celulas(self):
+        return npy.stack([npy.trunc(self.x), npy.trunc(self.z)], axis=1).astype(npy.int64)
+
+    """ Indices (crescentes) dos inimigos que alcancaram o jogador, testando
+        so os 'candidatos' (por exemplo, os de HashEspacial.perto) """
+    def alcancaramJogador(self, jogador_x, jogador_z, candidatos):
+        candidatos = npy.sort(npy.asarray(candidatos, dtype=npy.int64))
+        dx = jogador_x - self.x[candidatos]
+        dz = jogador_z - self.z[candidatos]
+        return candidatos[(dx ** 2 + dz ** 2) ** 0.5 < self.DISTANCIA_CAPTURA]
+
+    """ Avanca todos os inimigos em direcao ao jogador. Com um CampoFluxo,
+        cada inimigo vai ao centro da proxima celula do caminho (sem passar
+        dele) em vez de ir em linha reta.
+        Retorna os indices dos que alcancaram o jogador; esses nao se movem
+        e devem ser reposicionados por quem chamou. 'alcancaram' permite
+        passar esses indices ja calculados (veja alcancaramJogador). """
+    def atualizar(self, jogador_x, jogador_z, dt, grade, campo=None, alcancaram=None):
+        dx = jogador_x - self.x
+        dz = jogador_z - self.z
+        dist = (dx ** 2 + dz ** 2) ** 0.5
+        if alcancaram is None:
+            alcancaram = dist < self.DISTANCIA_CAPTURA
+        else:
+            indices = alcancaram
+            alcancaram = npy.zeros(len(self), dtype=bool)
+            alcancaram[indices] = True
+        velocidade = npy.full(len(self), self.VELOCIDADE)
+        if campo is not None:
+            alvo_x, alvo_z, segue = campo.proximoPasso(self.x, self.z)
+            dx = npy.where(segue, alvo_x - self.x, dx)
+            dz = npy.where(segue, alvo_z - self.z, dz)
+            dist = npy.where(segue, (dx ** 2 + dz ** 2) ** 0.5, dist)
+            if dt > 0:
+                velocidade = npy.where(segue, npy.minimum(velocidade, dist / dt), velocidade)
+        andam = ~alcancaram & (dist > 0.01)
+        self.estado[:] = PARADO
+
+        x, z = self.x[andam], self.z[andam]
+        novo_x = x + dx[andam] / dist[andam] * velocidade[andam] * dt
+        novo_z = z + dz[andam] / dist[andam] * velocidade[andam] * dt
+        # Mesma ordem de tentativas do codigo original: os dois eixos,
+        # depois so o x e, por ultimo, so o z
+        ambos = GRADE.pontosNoPiso(grade, novo_x, novo_z)
+        so_x = ~ambos & GRADE.pontosNoPiso(grade, novo_x, z)
+        so_z = ~ambos & ~so_x & GRADE.pontosNoPiso(grade, x, novo_z)
+        self.x[andam] = npy.where(ambos | so_x, novo_x, x)
+        self.z[andam] = npy.where(ambos | so_z, novo_z, z)
+        self.estado[andam] = npy.select([ambos, so_x | so_z], [PERSEGUINDO, DESLIZANDO], BLOQUEADO)
+        return npy.nonzero(alcancaram)[0]
+
+    """ Afasta os inimigos que estao a menos de DISTANCIA_SEPARACAO um do
+        outro, olhando so os pares de celulas vizinhas do HashEspacial
+        (montado com as posicoes atuais). Cada um anda metade da sobreposicao;
+        quem cairia fora do piso desliza em um eixo ou fica parado. """
+    def separar(self, espacial, grade):
+        a, b = espacial.pares()
+        if len(a) == 0:
+            return
+        dx = self.x[b] - self.x[a]
+        dz = self.z[b] - self.z[a]
+        dist = (dx ** 2 + dz ** 2) ** 0.5
+        perto = dist < self.DISTANCIA_SEPARACAO
+        a, b, dx, dz, dist = a[perto], b[perto], dx[perto], dz[perto], dist[perto]
+        # Inimigos exatamente no mesmo ponto se afastam numa direcao fixa
+        # que depende do par, para nao ficarem presos um no outro
+        juntos = dist < 1e-6
+        angulo = (a[juntos] * 2.399963 + b[juntos]) % (2 * npy.pi)
+        dx[juntos], dz[juntos], dist[juntos] = npy.cos(angulo), npy.sin(angulo), 1.0
+        metade = (self.DISTANCIA_SEPARACAO - npy.where(juntos, 0.0, dist)) / 2 / dist
+        empurra_x = npy.bincount(b, dx * metade, len(self)) - npy.bincount(a, dx * metade, len(self))
+        empurra_z = npy.bincount(b, dz * metade, len(self)) - npy.bincount(a, dz * metade, len(self))
+        movidos = npy.nonzero((empurra_x != 0) | (empurra_z != 0))[0]
+        x, z = self.x[movidos], self.z[movidos]
+        novo_x, novo_z = x + empurra_x[movidos], z + empurra_z[movidos]
+        ambos = GRADE.pontosNoPiso(grade, novo_x, novo_z)
+        so_x = ~ambos & GRADE.pontosNoPiso(grade, novo_x, z)
+        so_z = ~ambos & ~so_x & GRADE.pontosNoPiso(grade, x, novo_z)
+        self.x[movidos] = npy.where(ambos | so_x, novo_x, x)
+        self.z[movidos] = npy.where(ambos | so_z, novo_z, z)
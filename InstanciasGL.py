@@ -0,0 +1,159 @@
+# ************************************************
+#   InstanciasGL.py
+#   Define a classe MalhaInstanciada: uma MalhaGL
+#   desenhada muitas vezes (instancias), cada uma
+#   com deslocamento (x, y, z) e escala, com uma
+#   chamada de desenho por malha. Com GL 3.3 (ou as
+#   extensoes ARB de instancias) usa um shader minimo
+#   e glDrawArraysInstanced; sem isso, junta as
+#   copias em um unico array na CPU.
+# ************************************************
+
+from OpenGL.GL import *
+from OpenGL.GL import shaders
+import ctypes
+import numpy as npy
+
+from MalhaGL import MalhaGL
+
+# Posicao do primeiro componente (x) de cada vertice nos formatos intercalados
+INICIO_POSICAO = {GL_V3F: 0, GL_C3F_V3F: 3, GL_T2F_V3F: 2}
+
+# Maximo de vertices juntados de uma vez no caminho da CPU
+LIMITE_VERTICES_LOTE = 1 << 20
+
+SHADER_VERTICES = """
+#version 120
+attribute vec4 instancia;   // x, y, z, escala
+void main() {
+    vec4 posicao = vec4(gl_Vertex.xyz * instancia.w + instancia.xyz, 1.0);
+    gl_Position = gl_ModelViewProjectionMatrix * posicao;
+    gl_FrontColor = gl_Color;
+}
+"""
+
+SHADER_FRAGMENTOS = """
+#version 120
+void main() {
+    gl_FragColor = gl_Color;
+}
+"""
+
+""" Classe MalhaInstanciada """
+class MalhaInstanciada(MalhaGL):
+    # Shader compartilhado por todas as malhas: None = ainda nao testado,
+    # 0 = placa sem suporte a instancias (usa o caminho da CPU)
+    programa = None
+    atributo = -1
+    USAR_INSTANCIAS = True
+
+    def __init__(self, vertices, primitiva=GL_TRIANGLES, formato=GL_V3F):
+        super().__init__(vertices, primitiva, formato)
+        self.vbo_instancias = None
+        # Ultimas instancias desenhadas e o que foi montado para elas
+        self.ultimas = None
+        self.lote = None
+
+    """ Compila o shader na primeira chamada; retorna 0 se nao houver
+        suporte a instancias """
+    @classmethod
+    def programaInstancias(cls):
+        if cls.programa is not None:
+            return cls.programa
+        cls.programa = 0
+        try:
+            versao = glGetString(GL_VERSION).decode().split()[0].split('.')
+            extensoes = glGetString(GL_EXTENSIONS).decode().split()
+        except Exception:
+            return 0
+        suporta = (int(versao[0]), int(versao[1])) >= (3, 3) or (
+            'GL_ARB_instanced_arrays' in extensoes and 'GL_ARB_draw_instanced' in extensoes)
+        if not (suporta and bool(glDrawArraysInstanced) and bool(glVertexAttribDivisor)):
+            return 0
+        try:
+            cls.programa = shaders.compileProgram(
+                shaders.compileShader(SHADER_VERTICES, GL_VERTEX_SHADER),
+                shaders.compileShader(SHADER_FRAGMENTOS, GL_FRAGMENT_SHADER))
+            cls.atributo = glGetAttribLocation(cls.programa, "instancia")
+        except Exception as e:
+            print(f"Instâncias na placa indisponíveis ({e}); usando a CPU")
+            cls.programa = 0
+        return cls.programa
+
+    """ Desenha uma copia da malha para cada linha (x, y, z, escala) de
+        'instancias', com uma chamada de desenho """
+    def desenharInstancias(self, instancias):
+        instancias = npy.ascontiguousarray(instancias, dtype=npy.float32).reshape(-1, 4)
+        if self.quantidade == 0 or len(instancias) == 0:
+            return
+        if self.USAR_INSTANCIAS and self.vbo is not None and self.programaInstancias():
+            self.desenharNaPlaca(instancias)
+        else:
+            self.desenharEmLote(instancias)
+
+    """ Verifica se as instancias sao as mesmas da ultima chamada """
+    def repetidas(self, instancias):
+        if self.ultimas is not None and npy.array_equal(self.ultimas, instancias):
+            return True
+        self.ultimas = instancias.copy()
+        return False
+
+    """ Caminho da placa: as instancias vao para um VBO lido uma vez por
+        copia (divisor 1) e a malha e desenhada com glDrawArraysInstanced """
+    def desenharNaPlaca(self, instancias):
+        atributo = MalhaInstanciada.atributo
+        if self.vbo_instancias is None:
+            self.vbo_instancias = glGenBuffers(1)
+        glBindBuffer(GL_ARRAY_BUFFER, self.vbo_instancias)
+        if not self.repetidas(instancias):
+            glBufferData(GL_ARRAY_BUFFER, instancias.nbytes, instancias, GL_STREAM_DRAW)
+        glEnableVertexAttribArray(atributo)
+        glVertexAttribPointer(atributo, 4, GL_FLOAT, GL_FALSE, 0, ctypes.c_void_p(0))
+        glVertexAttribDivisor(atributo, 1)
+        glBindBuffer(GL_ARRAY_BUFFER, self.vbo)
+        glInterleavedArrays(self.formato, 0, ctypes.c_void_p(0))
+        glUseProgram(MalhaInstanciada.programa)
+        glDrawArraysInstanced(self.primitiva, 0, self.quantidade, len(instancias))
+        glUseProgram(0)
+        glVertexAttribDivisor(atributo, 0)
+        glDisableVertexAttribArray(atributo)
+        self.desligarArrays()
+        glBindBuffer(GL_ARRAY_BUFFER, 0)
+
+    """ Caminho da CPU: copia os vertices ja deslocados e escalados de todas
+        as instancias para um array so (refeito so quando elas mudam) """
+    def desenharEmLote(self, instancias):
+        por_lote = max(LIMITE_VERTICES_LOTE // self.quantidade, 1)
+        if len(instancias) > por_lote:
+            # Muitas instancias: varios lotes, sem guardar nenhum
+            self.ultimas = None
+            for inicio in range(0, len(instancias), por_lote):
+                self.desenharLote(self.montarLote(instancias[inicio:inicio + por_lote]))
+            return
+        if not self.repetidas(instancias) or self.lote is None:
+            self.lote = self.montarLote(instancias)
+        self.desenharLote(self.lote)
+
+    """ Vertices das instancias em um array intercalado so """
+    def montarLote(self, instancias):
+        inicio = INICIO_POSICAO[self.formato]
+        copias = npy.repeat(self.vertices[None], len(instancias), axis=0)
+        posicoes = copias[:, :, inicio:inicio + 3]
+        posicoes *= instancias[:, None, 3:4]
+        posicoes += instancias[:, None, 0:3]
+        return copias.reshape(-1, self.vertices.shape[1])
+
+    """ Desenha um array montado por montarLote """
+    def desenharLote(self, lote):
+        glInterleavedArrays(self.formato, 0, lote)
+        glDrawArrays(self.primitiva, 0, len(lote))
+        self.desligarArrays()
+
+    """ Libera os VBOs da malha e das instancias """
+    def liberar(self):
+        super().liberar()
+        if self.vbo_instancias is not None:
+            glDeleteBuffers(1, [self.vbo_instancias])
+            self.vbo_instancias = None
+        self.ultimas = None
+        self.lote = None
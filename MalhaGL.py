@@ -0,0 +1,57 @@
+# ************************************************
+#   MalhaGL.py
+#   Define a classe MalhaGL: um array de vertices
+#   intercalados enviado uma unica vez para um VBO
+#   e desenhado com uma chamada de glDrawArrays.
+# ************************************************
+
+from OpenGL.GL import *
+import ctypes
+import numpy as npy
+
+""" Classe MalhaGL """
+class MalhaGL:
+    def __init__(self, vertices, primitiva=GL_QUADS, formato=GL_C3F_V3F):
+        self.vertices = npy.ascontiguousarray(vertices, dtype=npy.float32)
+        self.primitiva = primitiva
+        self.formato = formato
+        self.quantidade = len(self.vertices)
+        self.vbo = None
+        if self.quantidade == 0:
+            return
+        # Se o driver nao tiver VBO, desenha direto do array em memoria
+        try:
+            self.vbo = glGenBuffers(1)
+            glBindBuffer(GL_ARRAY_BUFFER, self.vbo)
+            glBufferData(GL_ARRAY_BUFFER, self.vertices.nbytes, self.vertices, GL_STATIC_DRAW)
+            glBindBuffer(GL_ARRAY_BUFFER, 0)
+        except Exception:
+            self.vbo = None
+
+    """ Desenha todos os vertices da malha """
+    def desenhar(self):
+        if self.quantidade == 0:
+            return
+        if self.vbo is not None:
+            glBindBuffer(GL_ARRAY_BUFFER, self.vbo)
+            glInterleavedArrays(self.formato, 0, ctypes.c_void_p(0))
+        else:
+            glInterleavedArrays(self.formato, 0, self.vertices)
+        glDrawArrays(self.primitiva, 0, self.quantidade)
+        self.desligarArrays()
+        if self.vbo is not None:
+            glBindBuffer(GL_ARRAY_BUFFER, 0)
+
+    """ Desliga os arrays ligados por glInterleavedArrays """
+    def desligarArrays(self):
+        glDisableClientState(GL_VERTEX_ARRAY)
+        glDisableClientState(GL_COLOR_ARRAY)
+        glDisableClientState(GL_TEXTURE_COORD_ARRAY)
+        glDisableClientState(GL_NORMAL_ARRAY)
+
+    """ Libera o VBO da placa de video """
+    def liberar(self):
+        if self.vbo is not None:
+            glDeleteBuffers(1, [self.vbo])
+            self.vbo = None
+        self.quantidade = 0
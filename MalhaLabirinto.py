@@ -0,0 +1,239 @@
+# ************************************************
+#   MalhaLabirinto.py
+#   Gera a geometria estatica do labirinto (paredes)
+#   como arrays de vertices prontos para enviar ao OpenGL.
+#   Formato dos vertices: C3F_V3F (r, g, b, x, y, z),
+#   quatro vertices por face (GL_QUADS).
+# ************************************************
+
+import numpy as npy
+
+COR_PAREDE = (0.7, 0.7, 0.7)
+
+# Cantos de cada face de uma celula unitaria (dx, y_relativo, dz), na
+# ordem de vertices dos quadrados das paredes
+FACES_CELULA = {
+    'norte': ((0, 0, 0), (1, 0, 0), (1, 1, 0), (0, 1, 0)),
+    'sul':   ((1, 0, 1), (0, 0, 1), (0, 1, 1), (1, 1, 1)),
+    'oeste': ((0, 0, 1), (0, 0, 0), (0, 1, 0), (0, 1, 1)),
+    'leste': ((1, 0, 0), (1, 0, 1), (1, 1, 1), (1, 1, 0)),
+    'topo':  ((0, 1, 0), (1, 1, 0), (1, 1, 1), (0, 1, 1)),
+}
+
+
+# Converte o mapa (lista de listas) em matriz numpy
+def mapaParaArray(mapa):
+    if len(mapa) == 0:
+        return npy.zeros((0, 0), dtype=npy.int16)
+    return npy.array(mapa, dtype=npy.int16)
+
+
+# Gera os vertices de uma face para varios retangulos de uma vez.
+# Cada retangulo comeca na celula (x0, z0) e cobre largura x profundidade
+# celulas; para celulas isoladas largura = profundidade = 1.
+def verticesFace(x0s, z0s, face, altura, tamanho=1.0, cor=COR_PAREDE, larguras=1, profundidades=1):
+    cantos = npy.array(FACES_CELULA[face], dtype=npy.float32)
+    quantidade = len(x0s)
+    larguras = npy.broadcast_to(npy.asarray(larguras, dtype=npy.float32), (quantidade,))
+    profundidades = npy.broadcast_to(npy.asarray(profundidades, dtype=npy.float32), (quantidade,))
+    vertices = npy.empty((quantidade, 4, 6), dtype=npy.float32)
+    vertices[:, :, 0:3] = cor
+    vertices[:, :, 3] = (npy.asarray(x0s, dtype=npy.float32)[:, None] + cantos[None, :, 0] * larguras[:, None]) * tamanho
+    vertices[:, :, 4] = cantos[None, :, 1] * altura
+    vertices[:, :, 5] = (npy.asarray(z0s, dtype=npy.float32)[:, None] + cantos[None, :, 2] * profundidades[:, None]) * tamanho
+    return vertices.reshape(-1, 6)
+
+
+# Encontra as sequencias de valores verdadeiros em cada linha da mascara.
+# Retorna (linha, inicio, comprimento) de cada sequencia.
+def sequenciasPorLinha(mascara):
+    linhas, colunas = mascara.shape
+    borda = npy.zeros((linhas, 1), dtype=npy.int8)
+    diferenca = npy.diff(npy.hstack([borda, mascara.astype(npy.int8), borda]), axis=1)
+    linha_ini, inicio = npy.nonzero(diferenca == 1)
+    _, fim = npy.nonzero(diferenca == -1)
+    return linha_ini, inicio, fim - inicio
+
+
+# Agrupa celulas vizinhas da mascara em retangulos (greedy meshing):
+# primeiro junta as celulas de cada linha em sequencias e depois estende
+# cada sequencia para as linhas seguintes enquanto elas tiverem uma
+# sequencia identica. Retorna (x0, z0, largura, profundidade).
+def agruparRetangulos(mascara):
+    linhas, inicios, comprimentos = sequenciasPorLinha(mascara)
+    limites = npy.searchsorted(linhas, npy.arange(mascara.shape[0] + 1))
+    abertos = {}
+    retangulos = []
+    for z in range(mascara.shape[0] + 1):
+        atuais = set()
+        if z < mascara.shape[0]:
+            ini, fim = limites[z], limites[z + 1]
+            atuais = set(zip(inicios[ini:fim].tolist(), comprimentos[ini:fim].tolist()))
+        for chave in list(abertos):
+            if chave not in atuais:
+                z0 = abertos.pop(chave)
+                retangulos.append((chave[0], z0, chave[1], z - z0))
+        for chave in atuais:
+            abertos.setdefault(chave, z)
+    if not retangulos:
+        return (npy.zeros(0, dtype=npy.int32),) * 4
+    return tuple(npy.array(coluna, dtype=npy.int32) for coluna in zip(*retangulos))
+
+
+# Marca, para cada face, as celulas de parede em que ela fica visivel.
+# Uma face lateral so e necessaria se a celula vizinha nao for parede;
+# as faces voltadas para fora do mapa sao mantidas (aparecem na camera
+# em terceira pessoa) e o topo e sempre desenhado.
+def mascarasFacesVisiveis(grade):
+    parede = grade == 0
+    vizinha = npy.pad(parede, 1, mode='constant', constant_values=False)
+    return {
+        'norte': parede & ~vizinha[:-2, 1:-1],
+        'sul':   parede & ~vizinha[2:, 1:-1],
+        'oeste': parede & ~vizinha[1:-1, :-2],
+        'leste': parede & ~vizinha[1:-1, 2:],
+        'topo':  parede,
+    }
+
+
+# Agrupa as faces visiveis de cada direcao em retangulos maximos.
+# As faces laterais tem altura fixa, entao basta juntar as sequencias ao
+# longo da parede; o topo e agrupado nas duas direcoes.
+def retangulosFacesParedes(grade):
+    retangulos = {}
+    for face, mascara in mascarasFacesVisiveis(grade).items():
+        if face in ('norte', 'sul'):
+            zs, xs, larguras = sequenciasPorLinha(mascara)
+            retangulos[face] = (xs, zs, larguras, npy.ones_like(larguras))
+        elif face in ('oeste', 'leste'):
+            xs, zs, profundidades = sequenciasPorLinha(mascara.T)
+            retangulos[face] = (xs, zs, npy.ones_like(profundidades), profundidades)
+        else:
+            retangulos[face] = agruparRetangulos(mascara)
+    return retangulos
+
+
+# Conta as faces de parede: uma celula por vez, so as visiveis e agrupadas
+def contarFacesParedes(mapa):
+    grade = mapaParaArray(mapa)
+    total = int(npy.count_nonzero(grade == 0)) * len(FACES_CELULA)
+    visiveis = sum(int(npy.count_nonzero(m)) for m in mascarasFacesVisiveis(grade).values())
+    agrupadas = sum(len(r[0]) for r in retangulosFacesParedes(grade).values())
+    return total, visiveis, agrupadas
+
+
+# Gera a malha das paredes (celulas 0) do mapa com as faces visiveis
+# agrupadas em retangulos; o resultado visual e o mesmo de desenhar
+# as faces de cada celula separadas
+def gerarMalhaParedes(mapa, altura, tamanho=1.0, cor=COR_PAREDE):
+    return gerarMalhaParedesComRetangulos(mapa, altura, tamanho, cor)[0]
+
+
+# Como gerarMalhaParedes, mas tambem retorna as celulas de parede cobertas
+# por cada face, como (x0, z0, largura, profundidade)
+def gerarMalhaParedesComRetangulos(mapa, altura, tamanho=1.0, cor=COR_PAREDE):
+    grade = mapaParaArray(mapa)
+    partes = []
+    retangulos = []
+    for face, (xs, zs, larguras, profundidades) in retangulosFacesParedes(grade).items():
+        partes.append(verticesFace(xs, zs, face, altura, tamanho, cor, larguras, profundidades))
+        retangulos.append((xs, zs, larguras, profundidades))
+    vertices = npy.ascontiguousarray(npy.concatenate(partes))
+    return vertices, tuple(npy.concatenate(coluna) for coluna in zip(*retangulos))
+
+
+# Monta a matriz com o tipo de textura de cada celula (5 = None.png
+# quando a linha do mapa de texturas for menor que a do mapa)
+def matrizTexturasPiso(tipos_piso, largura, altura, padrao=5):
+    tipos = npy.full((altura, largura), padrao, dtype=npy.int16)
+    for y, linha in enumerate(tipos_piso[:altura]):
+        n = min(len(linha), largura)
+        tipos[y, :n] = linha[:n]
+    return tipos
+
+
+# Gera o piso inteiro como um unico array T2F_V3F (s, t, x, y, z), com um
+# quadrado por celula livre. As coordenadas de textura de cada celula vem
+# do retangulo (u0, v0, u1, v1) do seu ladrilho no atlas; celulas cujo
+# ladrilho nao esta no atlas ficam de fora.
+def gerarMalhaPiso(mapa, tipos_piso, uvs, tamanho=1.0):
+    grade = mapaParaArray(mapa)
+    if grade.size == 0 or not uvs:
+        return npy.zeros((0, 5), dtype=npy.float32)
+    altura, largura = grade.shape
+    tipos = matrizTexturasPiso(tipos_piso, largura, altura)
+    tabela = npy.full((max(max(uvs), int(tipos.max())) + 2, 4), npy.nan, dtype=npy.float32)
+    for tipo, retangulo in uvs.items():
+        tabela[tipo] = retangulo
+    tipos = npy.where(tipos < 0, len(tabela) - 1, tipos)
+    zs, xs = npy.nonzero(npy.isin(grade, (1, 2, 3)) & ~npy.isnan(tabela[tipos, 0]))
+    u0, v0, u1, v1 = tabela[tipos[zs, xs]].T
+    cantos = npy.array(((0, 0), (1, 0), (1, 1), (0, 1)), dtype=npy.float32)
+    vertices = npy.zeros((len(xs), 4, 5), dtype=npy.float32)
+    vertices[:, :, 0] = u0[:, None] + cantos[None, :, 0] * (u1 - u0)[:, None]
+    vertices[:, :, 1] = v0[:, None] + cantos[None, :, 1] * (v1 - v0)[:, None]
+    vertices[:, :, 2] = (xs[:, None] + cantos[None, :, 0]) * tamanho
+    vertices[:, :, 4] = (zs[:, None] + cantos[None, :, 1]) * tamanho
+    return vertices.reshape(-1, 5)
+
+
+# Gera uma esfera com a mesma tesselacao de gluSphere (eixo em z, fatias
+# em volta do eixo e pilhas de um polo ao outro) como triangulos soltos.
+# Formato dos vertices: V3F (x, y, z); a cor vem de glColor.
+def verticesEsfera(raio, fatias, pilhas):
+    phi, theta = npy.meshgrid(npy.pi * npy.arange(pilhas + 1) / pilhas,
+                              2.0 * npy.pi * npy.arange(fatias + 1) / fatias, indexing='ij')
+    pontos = npy.stack([raio * npy.sin(phi) * npy.sin(theta),
+                        raio * npy.sin(phi) * npy.cos(theta),
+                        raio * npy.cos(phi)], axis=-1)
+    # Cada quadrilatero entre duas pilhas e duas fatias vira dois triangulos
+    a = pontos[:-1, :-1]
+    b = pontos[1:, :-1]
+    c = pontos[1:, 1:]
+    d = pontos[:-1, 1:]
+    triangulos = npy.stack([a, b, c, a, c, d], axis=2)
+    return triangulos.reshape(-1, 3).astype(npy.float32)
+
+
+# Gera um cilindro (ou tronco de cone) com a mesma tesselacao de
+# gluCylinder: eixo em z de 0 a 'altura', raio indo de 'raio_base' a
+# 'raio_topo', sem tampas. Formato dos vertices: V3F, triangulos soltos.
+def verticesCilindro(raio_base, raio_topo, altura, fatias, pilhas):
+    fracao, theta = npy.meshgrid(npy.arange(pilhas + 1) / pilhas,
+                                 2.0 * npy.pi * npy.arange(fatias + 1) / fatias, indexing='ij')
+    raio = raio_base + (raio_topo - raio_base) * fracao
+    pontos = npy.stack([raio * npy.sin(theta), raio * npy.cos(theta), altura * fracao], axis=-1)
+    a = pontos[:-1, :-1]
+    b = pontos[1:, :-1]
+    c = pontos[1:, 1:]
+    d = pontos[:-1, 1:]
+    triangulos = npy.stack([a, b, c, a, c, d], axis=2)
+    return triangulos.reshape(-1, 3).astype(npy.float32)
+
+
+# Matriz 4x4 de translacao (como glTranslatef)
+def matrizTranslacao(x, y, z):
+    matriz = npy.eye(4)
+    matriz[:3, 3] = (x, y, z)
+    return matriz
+
+
+# Matriz 4x4 de rotacao de 'angulo' graus em torno do eixo (x, y, z),
+# como glRotatef
+def matrizRotacao(angulo, x, y, z):
+    eixo = npy.array([x, y, z], dtype=npy.float64)
+    eixo /= npy.linalg.norm(eixo)
+    c, s = npy.cos(npy.radians(angulo)), npy.sin(npy.radians(angulo))
+    ux, uy, uz = eixo
+    matriz = npy.eye(4)
+    matriz[:3, :3] = c * npy.eye(3) + s * npy.array([[0, -uz, uy], [uz, 0, -ux], [-uy, ux, 0]]) \
+        + (1 - c) * npy.outer(eixo, eixo)
+    return matriz
+
+
+# Aplica a matriz 4x4 aos vertices V3F e junta a cor: retorna C3F_V3F
+def verticesColoridos(vertices, matriz, cor):
+    coloridos = npy.empty((len(vertices), 6), dtype=npy.float32)
+    coloridos[:, 0:3] = cor
+    coloridos[:, 3:6] = vertices @ matriz[:3, :3].T + matriz[:3, 3]
+    return coloridos
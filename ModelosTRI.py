@@ -0,0 +1,316 @@
+# ************************************************
+#   ModelosTRI.py
+#   Leitura de modelos no formato .tri
+#   (uma linha por triangulo: 9 coordenadas e a cor
+#   em hexadecimal 0xRRGGBB).
+#   Os triangulos ficam em arrays numpy contiguos
+#   float32, prontos para serem enviados a um VBO.
+#   Cada modelo gera tambem niveis de detalhe mais
+#   simples (agrupamento de vertices) para longe.
+# ************************************************
+
+import io
+import mmap
+import os
+import sys
+
+import numpy as npy
+
+# Divisoes do maior lado da caixa do modelo na grade de agrupamento de
+# cada nivel de detalhe simplificado (o nivel 0 e o modelo original)
+DIVISOES_LOD = (20, 8)
+# Fracao minima da area do modelo original que um nivel simplificado deve
+# manter (pecas finas, como correntes e cercas, somem no agrupamento)
+AREA_MINIMA_LOD = 0.5
+
+""" Classe ModeloTRI """
+class ModeloTRI:
+    def __init__(self, posicoes, cores):
+        # posicoes: (N, 9) float32 -> v1, v2 e v3 de cada triangulo
+        # cores:    (N, 3) float32 -> cor RGB (0..1) de cada triangulo
+        self.posicoes = npy.ascontiguousarray(posicoes, dtype=npy.float32).reshape(-1, 9)
+        self.cores = npy.ascontiguousarray(cores, dtype=npy.float32).reshape(-1, 3)
+        # Niveis de detalhe ja prontos (lidos do pacote), ou None
+        self.niveis = None
+
+    def __len__(self):
+        return len(self.posicoes)
+
+    """ Retorna os vertices (3N, 3) do modelo """
+    def vertices(self):
+        return self.posicoes.reshape(-1, 3)
+
+    """ Monta o array intercalado C3F_V3F (cor repetida nos 3 vertices) """
+    def verticesIntercalados(self):
+        intercalados = npy.empty((len(self), 3, 6), dtype=npy.float32)
+        intercalados[:, :, 0:3] = self.cores[:, None, :]
+        intercalados[:, :, 3:6] = self.posicoes.reshape(-1, 3, 3)
+        return intercalados.reshape(-1, 6)
+
+    """ Versao simplificada por agrupamento de vertices (Rossignac e
+        Borrel): os vertices caem em uma grade com 'divisoes' celulas no
+        maior lado da caixa do modelo e os de mesma cor em cada celula
+        viram um vertice so, na media deles. Os triangulos que ficam com dois
+        vertices na mesma celula somem, assim como os repetidos; cada
+        triangulo que sobra mantem a sua cor """
+    def simplificado(self, divisoes):
+        vertices = self.vertices().astype(npy.float64)
+        if len(vertices) == 0:
+            return self
+        minimo = vertices.min(axis=0)
+        lado = float((vertices.max(axis=0) - minimo).max()) / divisoes
+        if lado <= 0.0:
+            return self
+        grade = npy.minimum(npy.floor((vertices - minimo) / lado), divisoes).astype(npy.int64)
+        # Superficies proximas de cores diferentes (como a agua sobre o
+        # fundo de uma fonte) nao se misturam
+        rgb = npy.round(self.cores * 255.0).astype(npy.int64) @ npy.array([1 << 16, 1 << 8, 1])
+        _, cor = npy.unique(rgb, return_inverse=True)
+        chaves = (grade[:, 0] * (divisoes + 1) + grade[:, 1]) * (divisoes + 1) + grade[:, 2]
+        chaves = chaves * (int(cor.max()) + 1) + npy.repeat(cor.reshape(-1), 3)
+        _, grupo = npy.unique(chaves, return_inverse=True)
+        quantos = npy.bincount(grupo)
+        representantes = npy.stack([npy.bincount(grupo, vertices[:, eixo]) for eixo in range(3)], axis=1)
+        representantes /= quantos[:, None]
+        triangulos = grupo.reshape(-1, 3)
+        inteiros = ((triangulos[:, 0] != triangulos[:, 1]) & (triangulos[:, 1] != triangulos[:, 2])
+                    & (triangulos[:, 0] != triangulos[:, 2]))
+        restantes = npy.nonzero(inteiros)[0]
+        _, primeiros = npy.unique(npy.sort(triangulos[restantes], axis=1), axis=0, return_index=True)
+        restantes = restantes[npy.sort(primeiros)]
+        return ModeloTRI(representantes[triangulos[restantes]].reshape(-1, 9), self.cores[restantes])
+
+    """ Niveis de detalhe: o proprio modelo e uma versao simplificada para
+        cada valor de 'divisoes'. Um nivel que nao ficaria menor que o
+        anterior ou que perderia area demais repete o anterior """
+    def niveisDeDetalhe(self, divisoes=DIVISOES_LOD):
+        if self.niveis is not None and tuple(divisoes) == DIVISOES_LOD:
+            return self.niveis
+        niveis = [self]
+        area = self.area()
+        for valor in divisoes:
+            simples = self.simplificado(valor)
+            aceito = 0 < len(simples) < len(niveis[-1]) and simples.area() >= AREA_MINIMA_LOD * area
+            niveis.append(simples if aceito else niveis[-1])
+        return niveis
+
+    """ Soma das areas dos triangulos """
+    def area(self):
+        v1, v2, v3 = (self.posicoes[:, i:i + 3].astype(npy.float64) for i in (0, 3, 6))
+        return float(npy.linalg.norm(npy.cross(v2 - v1, v3 - v1), axis=1).sum() / 2)
+
+    """ Copia do modelo com todos os triangulos da cor (r, g, b) """
+    def comCor(self, cor):
+        return ModeloTRI(self.posicoes, npy.broadcast_to(npy.asarray(cor, dtype=npy.float32), self.cores.shape))
+
+    """ Quantidade de bytes ocupada pelos arrays do modelo """
+    def memoria(self):
+        return self.posicoes.nbytes + self.cores.nbytes
+
+    """ Quantidade de bytes do array intercalado enviado ao VBO """
+    def memoriaVBO(self):
+        return len(self) * 3 * 6 * 4
+
+
+# Converte a cor 0xRRGGBB em (r, g, b) no intervalo 0..1 (um campo por vez)
+def corHexParaRGB(cor_hex):
+    cor_int = int(cor_hex, 16)
+    return (((cor_int >> 16) & 0xFF) / 255.0,
+            ((cor_int >> 8) & 0xFF) / 255.0,
+            (cor_int & 0xFF) / 255.0)
+
+
+# Tabela que converte um byte ASCII ('0'-'9', 'a'-'f', 'A'-'F') no valor
+# do digito hexadecimal; os demais bytes valem 255
+DIGITOS_HEX = npy.full(256, 255, dtype=npy.uint8)
+DIGITOS_HEX[npy.frombuffer(b"0123456789", dtype=npy.uint8)] = npy.arange(10)
+DIGITOS_HEX[npy.frombuffer(b"abcdef", dtype=npy.uint8)] = npy.arange(10, 16)
+DIGITOS_HEX[npy.frombuffer(b"ABCDEF", dtype=npy.uint8)] = npy.arange(10, 16)
+
+# Cada linha do .tri: 9 coordenadas e o texto da cor
+FORMATO_LINHA = npy.dtype([('posicao', npy.float64, (9,)), ('cor', 'S16')])
+
+
+# Converte uma coluna de cores "0xRRGGBB" (array de bytes) em (N, 3)
+# float32 de uma vez. Retorna tambem a mascara das cores validas; os
+# textos fora desse formato sao convertidos um a um com int(, 16).
+def coresHexParaRGB(coluna):
+    cores = npy.zeros((len(coluna), 3), dtype=npy.float32)
+    validas = npy.zeros(len(coluna), dtype=bool)
+    caracteres = coluna.astype('S16').view(npy.uint8).reshape(-1, 16)
+    prefixo = (caracteres[:, 0] == ord('0')) & ((caracteres[:, 1] == ord('x')) | (caracteres[:, 1] == ord('X')))
+    digitos = DIGITOS_HEX[caracteres[:, 2:8]]
+    padrao = prefixo & (digitos != 255).all(axis=1) & (caracteres[:, 8] == 0)
+    cores[padrao] = (digitos[padrao, 0::2].astype(npy.uint16) * 16 + digitos[padrao, 1::2]) / npy.float32(255.0)
+    validas[padrao] = True
+    for i in npy.nonzero(~padrao)[0]:
+        try:
+            cores[i] = corHexParaRGB(coluna[i].decode("ascii"))
+            validas[i] = True
+        except (ValueError, UnicodeDecodeError):
+            pass
+    return cores, validas
+
+
+# Le o arquivo linha a linha. Linhas vazias, com menos de 10 campos ou
+# com valores invalidos sao ignoradas; campos alem do decimo tambem.
+def lerLinhasTRI(dados):
+    posicoes = []
+    cores = []
+    for linha in dados.splitlines():
+        partes = linha.split()
+        if len(partes) < 10:
+            continue
+        try:
+            triangulo = [float(p) for p in partes[0:9]]
+            cor = corHexParaRGB(partes[9].decode("ascii"))
+        except (ValueError, UnicodeDecodeError):
+            continue
+        posicoes.append(triangulo)
+        cores.append(cor)
+    return (npy.array(posicoes, dtype=npy.float64).reshape(-1, 9),
+            npy.array(cores, dtype=npy.float32).reshape(-1, 3))
+
+
+# Le um arquivo .tri de uma vez so com o leitor em C do numpy (loadtxt)
+# e converte a coluna de cores em bloco. Se o arquivo tiver alguma linha
+# fora do formato, usa a leitura linha a linha, que descarta essas linhas.
+def lerArquivoTRI(caminho_arquivo):
+    with open(caminho_arquivo, 'rb') as f:
+        dados = f.read()
+    if not dados.strip():
+        return ModeloTRI(npy.zeros((0, 9)), npy.zeros((0, 3)))
+    try:
+        tabela = npy.loadtxt(io.BytesIO(dados), dtype=FORMATO_LINHA, usecols=range(10),
+                             comments=None, ndmin=1)
+    except ValueError:
+        return ModeloTRI(*lerLinhasTRI(dados))
+    if len(tabela) and npy.char.str_len(tabela['cor']).max() >= FORMATO_LINHA['cor'].itemsize:
+        # Cor longa demais para o campo (pode ter sido cortada)
+        return ModeloTRI(*lerLinhasTRI(dados))
+    cores, validas = coresHexParaRGB(tabela['cor'])
+    return ModeloTRI(tabela['posicao'][validas], cores[validas])
+
+
+# ************************************************
+#   Pacote binario de modelos (.pak)
+#   Cabecalho: 'TRIPAK', versao, quantidade de
+#              entradas e a chave dos niveis de detalhe
+#   Indice:    uma entrada ENTRADA_PACOTE por nivel de
+#              detalhe de cada modelo (os que repetem o
+#              anterior nao sao guardados)
+#   Dados:     posicoes float32 (N, 9) e cores uint8 (N, 3)
+#   O indice guarda tamanho e data do .tri de origem
+#   para saber se o pacote ficou desatualizado; os
+#   niveis so valem com os mesmos DIVISOES_LOD e
+#   AREA_MINIMA_LOD da chave.
+# ************************************************
+
+MAGICO_PACOTE = b'TRIPAK\0\0'
+VERSAO_PACOTE = 2
+CABECALHO_PACOTE = npy.dtype([('magico', 'S8'), ('versao', '<u4'), ('quantidade', '<u4'), ('lod', 'S48')])
+ENTRADA_PACOTE = npy.dtype([
+    ('nome', 'S48'), ('nivel', '<u4'), ('triangulos', '<u8'), ('posicoes', '<u8'), ('cores', '<u8'),
+    ('tamanho_origem', '<u8'), ('data_origem', '<i8'),
+])
+
+
+# Chave dos parametros que definem os niveis de detalhe
+def chaveLOD():
+    return f"{DIVISOES_LOD}:{AREA_MINIMA_LOD}".encode('utf-8')
+
+
+# Gera o pacote 'destino' com todos os .tri do diretorio e os seus niveis
+# de detalhe
+def empacotarModelos(diretorio, destino):
+    arquivos = sorted(a for a in os.listdir(diretorio) if a.endswith('.tri'))
+    entradas = []
+    blocos = []
+    for arquivo in arquivos:
+        caminho = os.path.join(diretorio, arquivo)
+        info = os.stat(caminho)
+        nome = os.path.splitext(arquivo)[0].encode('utf-8')
+        niveis = lerArquivoTRI(caminho).niveisDeDetalhe()
+        for nivel, modelo in enumerate(niveis):
+            if nivel > 0 and modelo is niveis[nivel - 1]:
+                continue
+            entradas.append((nome, nivel, len(modelo), info.st_size, info.st_mtime_ns))
+            blocos.append((modelo.posicoes.tobytes(), npy.round(modelo.cores * 255.0).astype(npy.uint8).tobytes()))
+    indice = npy.zeros(len(entradas), dtype=ENTRADA_PACOTE)
+    deslocamento = CABECALHO_PACOTE.itemsize + indice.nbytes
+    inicios = []
+    for i, ((nome, nivel, triangulos, tamanho, data), (posicoes, cores)) in enumerate(zip(entradas, blocos)):
+        deslocamento += (-deslocamento) % 16
+        indice[i] = (nome, nivel, triangulos, deslocamento, deslocamento + len(posicoes), tamanho, data)
+        inicios.append(deslocamento)
+        deslocamento += len(posicoes) + len(cores)
+    cabecalho = npy.array([(MAGICO_PACOTE, VERSAO_PACOTE, len(entradas), chaveLOD())], dtype=CABECALHO_PACOTE)
+    temporario = destino + '.tmp'
+    with open(temporario, 'wb') as f:
+        f.write(cabecalho.tobytes())
+        f.write(indice.tobytes())
+        for inicio, (posicoes, cores) in zip(inicios, blocos):
+            f.write(b'\0' * (inicio - f.tell()))
+            f.write(posicoes)
+            f.write(cores)
+    os.replace(temporario, destino)
+    return len(arquivos)
+
+
+""" Classe PacoteModelos: le um .pak mapeado em memoria """
+class PacoteModelos:
+    def __init__(self, caminho):
+        with open(caminho, 'rb') as f:
+            self.mapa = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        cabecalho = npy.frombuffer(self.mapa, dtype=CABECALHO_PACOTE, count=1)[0]
+        if cabecalho['magico'] != MAGICO_PACOTE.rstrip(b'\0') or cabecalho['versao'] != VERSAO_PACOTE:
+            raise ValueError(f"{caminho} não é um pacote de modelos válido")
+        indice = npy.frombuffer(self.mapa, dtype=ENTRADA_PACOTE, count=int(cabecalho['quantidade']),
+                                offset=CABECALHO_PACOTE.itemsize)
+        # nome -> {nivel: entrada}; os niveis simplificados so sao usados se
+        # foram gerados com os parametros atuais
+        self.com_niveis = cabecalho['lod'] == chaveLOD()
+        self.entradas_niveis = {}
+        for e in indice:
+            self.entradas_niveis.setdefault(e['nome'].decode('utf-8'), {})[int(e['nivel'])] = e
+        self.entradas = {nome: niveis[0] for nome, niveis in self.entradas_niveis.items() if 0 in niveis}
+
+    def __contains__(self, nome):
+        return nome in self.entradas
+
+    """ Verifica se o modelo do pacote corresponde ao .tri atual """
+    def atualizado(self, nome, caminho_origem):
+        entrada = self.entradas.get(nome)
+        if entrada is None or not os.path.exists(caminho_origem):
+            return False
+        info = os.stat(caminho_origem)
+        return entrada['tamanho_origem'] == info.st_size and entrada['data_origem'] == info.st_mtime_ns
+
+    """ Retorna o modelo, com os seus niveis de detalhe quando o pacote tem
+        os dos parametros atuais; as posicoes apontam direto para o arquivo
+        mapeado """
+    def modelo(self, nome):
+        modelo = self.modeloDaEntrada(self.entradas[nome])
+        if self.com_niveis:
+            niveis = [modelo]
+            for nivel in range(1, len(DIVISOES_LOD) + 1):
+                entrada = self.entradas_niveis[nome].get(nivel)
+                niveis.append(niveis[-1] if entrada is None else self.modeloDaEntrada(entrada))
+            modelo.niveis = niveis
+        return modelo
+
+    """ Modelo guardado em uma entrada do indice """
+    def modeloDaEntrada(self, entrada):
+        n = int(entrada['triangulos'])
+        posicoes = npy.frombuffer(self.mapa, dtype=npy.float32, count=n * 9,
+                                  offset=int(entrada['posicoes'])).reshape(n, 9)
+        cores = npy.frombuffer(self.mapa, dtype=npy.uint8, count=n * 3,
+                               offset=int(entrada['cores'])).reshape(n, 3)
+        return ModeloTRI(posicoes, cores / npy.float32(255.0))
+
+
+if __name__ == "__main__":
+    diretorio = sys.argv[1] if len(sys.argv) > 1 else "TRI"
+    destino = sys.argv[2] if len(sys.argv) > 2 else os.path.join(diretorio, "modelos.pak")
+    quantidade = empacotarModelos(diretorio, destino)
+    print(f"{quantidade} modelos empacotados em {destino}")
@@ -0,0 +1,458 @@
+# ************************************************
+#   PlanejadorHPA.py
+#   Busca de caminhos hierarquica (HPA*). A grade e
+#   dividida em blocos quadrados; as passagens entre
+#   blocos vizinhos viram nos de um grafo abstrato
+#   (uma por par de componentes que a borda liga),
+#   e o custo entre os nos de um mesmo bloco e
+#   calculado uma vez, com buscas em largura feitas
+#   em lote sobre todos os blocos. Num segundo nivel,
+#   os componentes de quadrados de varios blocos (as
+#   regioes) formam um grafo bem menor.
+#   Uma consulta liga origem e destino aos nos dos
+#   seus blocos, escolhe as regioes por onde passar,
+#   faz A* no grafo abstrato so dentro delas e depois
+#   refina cada trecho com A* dentro de um bloco.
+# ************************************************
+
+import collections
+import heapq
+
+import numpy as npy
+
+from ComponentesLabirinto import ComponentesConexos
+
+VIZINHOS = ((0, -1), (0, 1), (-1, 0), (1, 0))
+
+
+# A* em grade 4-conectada com heuristica de Manhattan. 'limites' restringe
+# a busca ao retangulo (x0, y0, x1, y1), com x1 e y1 exclusivos.
+# Retorna a lista de celulas (x, y) da origem ao destino, ou None.
+def aEstrela(livre, origem, destino, limites=None):
+    altura, largura = livre.shape
+    x0, y0, x1, y1 = limites if limites is not None else (0, 0, largura, altura)
+    celulas = npy.ascontiguousarray(livre, dtype=bool).reshape(-1).view(npy.uint8)
+    (ox, oy), (dx, dy) = origem, destino
+    inicio, alvo = oy * largura + ox, dy * largura + dx
+    if not (x0 <= ox < x1 and y0 <= oy < y1 and x0 <= dx < x1 and y0 <= dy < y1):
+        return None
+    if not celulas[inicio] or not celulas[alvo]:
+        return None
+    custo = {inicio: 0}
+    pai = {inicio: -1}
+    # Empates na estimativa favorecem quem ja andou mais (chega antes ao alvo)
+    aberta = [(abs(ox - dx) + abs(oy - dy), 0, inicio)]
+    while aberta:
+        _, g, atual = heapq.heappop(aberta)
+        g = -g
+        if atual == alvo:
+            return reconstruirCaminho(pai, atual, largura)
+        if g > custo[atual]:
+            continue
+        y, x = divmod(atual, largura)
+        for vx, vy in ((x, y - 1), (x, y + 1), (x - 1, y), (x + 1, y)):
+            if vx < x0 or vx >= x1 or vy < y0 or vy >= y1:
+                continue
+            vizinho = vy * largura + vx
+            if not celulas[vizinho] or g + 1 >= custo.get(vizinho, 1 << 62):
+                continue
+            custo[vizinho] = g + 1
+            pai[vizinho] = atual
+            heapq.heappush(aberta, (g + 1 + abs(vx - dx) + abs(vy - dy), -(g + 1), vizinho))
+    return None
+
+
+# Monta a lista de celulas seguindo os pais ate a origem
+def reconstruirCaminho(pai, atual, largura):
+    caminho = []
+    while atual != -1:
+        caminho.append((atual % largura, atual // largura))
+        atual = pai[atual]
+    caminho.reverse()
+    return caminho
+
+
+# Sequencias de celulas abertas em cada linha de 'abertas' (nLinhas,
+# tamanho). Retorna (linha, inicio, fim), com o fim exclusivo.
+def trechosDaBorda(abertas):
+    linhas = abertas.shape[0]
+    borda = npy.zeros((linhas, abertas.shape[1] + 2), dtype=npy.int8)
+    borda[:, 1:-1] = abertas
+    variacao = npy.diff(borda, axis=1)
+    linha, inicio = npy.nonzero(variacao == 1)
+    _, fim = npy.nonzero(variacao == -1)
+    return linha, inicio, fim
+
+
+# Rotulo de cada celula livre no componente conexo que ela forma andando so
+# dentro do seu quadrado de lado x lado celulas (unico na grade toda); as
+# paredes ficam com -1
+def componentesPorQuadrado(livre, lado):
+    altura, largura = livre.shape
+    qy, qx = -(-altura // lado), -(-largura // lado)
+    grade = npy.zeros((qy * lado, qx * lado), dtype=bool)
+    grade[:altura, :largura] = livre
+    # Quadrados empilhados em uma coluna de largura 'lado', com uma linha de
+    # parede depois de cada um: os componentes da pilha sao os dos quadrados
+    pilha = npy.zeros((qy * qx, lado + 1, lado), dtype=bool)
+    pilha[:, :lado] = grade.reshape(qy, lado, qx, lado).swapaxes(1, 2).reshape(-1, lado, lado)
+    rotulos = ComponentesConexos(pilha.reshape(-1, lado)).rotulos.reshape(-1, lado + 1, lado)[:, :lado]
+    rotulos = rotulos.reshape(qy, qx, lado, lado).swapaxes(1, 2).reshape(grade.shape)
+    return rotulos[:altura, :largura]
+
+
+""" Classe PlanejadorHPA """
+class PlanejadorHPA:
+    LIMITE_CACHE = 4096
+    LOTE_BUSCAS = 1024
+
+    def __init__(self, livre, tamanho_bloco=32, blocos_por_regiao=4):
+        if tamanho_bloco not in (8, 16, 32, 64):
+            raise ValueError("tamanho_bloco deve ser 8, 16, 32 ou 64")
+        livre = npy.asarray(livre, dtype=bool)
+        self.altura, self.largura = livre.shape
+        self.tamanho = tamanho_bloco
+        self.blocos_y = -(-self.altura // tamanho_bloco)
+        self.blocos_x = -(-self.largura // tamanho_bloco)
+        # Grade completada com paredes ate um numero inteiro de blocos
+        self.livre = npy.zeros((self.blocos_y * tamanho_bloco, self.blocos_x * tamanho_bloco), dtype=bool)
+        self.livre[:self.altura, :self.largura] = livre
+        self.cache = {}
+        self.criarNos()
+        self.ligarNos()
+        self.criarRegioes(tamanho_bloco * blocos_por_regiao)
+
+    """ Bloco (indice) de cada celula (x, y) """
+    def bloco(self, x, y):
+        return (y // self.tamanho) * self.blocos_x + x // self.tamanho
+
+    """ Retangulo (x0, y0, x1, y1) do bloco """
+    def limitesBloco(self, bloco):
+        by, bx = divmod(bloco, self.blocos_x)
+        t = self.tamanho
+        return (bx * t, by * t, bx * t + t, by * t + t)
+
+    """ Cria os nos do grafo abstrato nas passagens entre blocos. Entre os
+        trechos abertos de uma borda que ligam o mesmo par de componentes
+        dos dois blocos so o mais longo fica (os outros nao levam a lugar
+        nenhum novo, so encurtariam alguns caminhos) """
+    def criarNos(self):
+        t = self.tamanho
+        trechos = []
+        if self.blocos_x > 1:
+            # Bordas verticais: coluna final de um bloco e inicial do proximo
+            xa = npy.arange(1, self.blocos_x) * t - 1
+            abertas = (self.livre[:, xa] & self.livre[:, xa + 1]).T
+            linha, inicio, fim = trechosDaBorda(abertas.reshape(-1, t))
+            borda, bloco_y = divmod(linha, self.blocos_y)
+            um = npy.ones(len(linha), dtype=npy.int64)
+            trechos.append((xa[borda], bloco_y * t + inicio, npy.zeros_like(um), um, fim - inicio))
+        if self.blocos_y > 1:
+            # Bordas horizontais: linha final de um bloco e inicial do proximo
+            ya = npy.arange(1, self.blocos_y) * t - 1
+            abertas = self.livre[ya, :] & self.livre[ya + 1, :]
+            linha, inicio, fim = trechosDaBorda(abertas.reshape(-1, t))
+            borda, bloco_x = divmod(linha, self.blocos_x)
+            um = npy.ones(len(linha), dtype=npy.int64)
+            trechos.append((bloco_x * t + inicio, ya[borda], um, npy.zeros_like(um), fim - inicio))
+        largura = self.livre.shape[1]
+        if trechos:
+            # Cada trecho: primeira celula (x, y) do lado do primeiro bloco,
+            # direcao (ux, uy) ao longo da borda e comprimento; o outro bloco
+            # fica a um passo na direcao perpendicular (uy, ux)
+            x, y, ux, uy, comprimento = (npy.concatenate(c) for c in zip(*trechos))
+            rotulos = componentesPorQuadrado(self.livre, t)
+            de, para = rotulos[y, x], rotulos[y + ux, x + uy]
+            ordem = npy.lexsort((-comprimento, para, de))
+            primeiro = npy.ones(len(ordem), dtype=bool)
+            primeiro[1:] = (de[ordem][1:] != de[ordem][:-1]) | (para[ordem][1:] != para[ordem][:-1])
+            fica = ordem[primeiro]
+            # Um no no meio de cada trecho que fica, de cada lado da borda
+            pos = (comprimento[fica] - 1) // 2
+            ax, ay = x[fica] + pos * ux[fica], y[fica] + pos * uy[fica]
+            bx, by = ax + uy[fica], ay + ux[fica]
+        else:
+            ax = ay = bx = by = npy.zeros(0, dtype=npy.int64)
+            rotulos = npy.zeros(self.livre.shape, dtype=npy.int32)
+        # Uma celula pode ser passagem de duas bordas: um no por celula
+        celulas, inverso = npy.unique(npy.concatenate([ay * largura + ax, by * largura + bx]),
+                                      return_inverse=True)
+        self.no_y, self.no_x = npy.divmod(celulas, largura)
+        self.no_componente = rotulos.reshape(-1)[celulas]
+        self.no_bloco = (self.no_y // t) * self.blocos_x + self.no_x // t
+        self.no_de_celula = {int(c): i for i, c in enumerate(celulas)}
+        self.arestas_passagem = inverso.reshape(2, -1)
+
+    """ Custos entre os nos de cada bloco (busca em largura em lote) e
+        montagem do grafo abstrato em formato compacto (CSR) """
+    def ligarNos(self):
+        t = self.tamanho
+        quantidade = len(self.no_x)
+        blocos = self.livre.reshape(self.blocos_y, t, self.blocos_x, t).swapaxes(1, 2).reshape(-1, t, t)
+        # Cada linha de um bloco vira uma palavra de t bits (bit x = celula x)
+        linhas = npy.packbits(blocos, axis=2, bitorder='little').view(f'<u{t // 8}')[:, :, 0]
+        ordem = npy.argsort(self.no_bloco, kind='stable')
+        por_bloco = npy.bincount(self.no_bloco, minlength=self.blocos_x * self.blocos_y)
+        primeiro = npy.concatenate([[0], npy.cumsum(por_bloco)])
+        origens, destinos, custos = [], [], []
+        for inicio in range(0, quantidade, self.LOTE_BUSCAS):
+            nos = npy.arange(inicio, min(inicio + self.LOTE_BUSCAS, quantidade))
+            # Pares (no, outro no do mesmo bloco)
+            vezes = por_bloco[self.no_bloco[nos]]
+            lote = npy.repeat(npy.arange(len(nos)), vezes)
+            deslocamento = npy.arange(len(lote)) - npy.repeat(npy.cumsum(vezes) - vezes, vezes)
+            outros = ordem[primeiro[self.no_bloco[nos]].repeat(vezes) + deslocamento]
+            # Nos de componentes diferentes do bloco nunca se alcancam
+            mesmo = self.no_componente[nos[lote]] == self.no_componente[outros]
+            lote, outros = lote[mesmo], outros[mesmo]
+            custo = self.buscasNosBlocos(linhas[self.no_bloco[nos]], self.no_x[nos] % t, self.no_y[nos] % t,
+                                         lote, self.no_x[outros] % t, self.no_y[outros] % t)
+            ligados = (custo > 0)
+            origens.append(nos[lote[ligados]])
+            destinos.append(outros[ligados])
+            custos.append(custo[ligados])
+        a, b = self.arestas_passagem
+        origens += [a, b]
+        destinos += [b, a]
+        custos += [npy.ones(len(a), dtype=npy.int32)] * 2
+        origens = npy.concatenate(origens).astype(npy.int64)
+        destinos = npy.concatenate(destinos).astype(npy.int64)
+        custos = npy.concatenate(custos).astype(npy.int64)
+        ordem = npy.argsort(origens, kind='stable')
+        self.inicio_arestas = npy.concatenate([[0], npy.cumsum(npy.bincount(origens, minlength=quantidade))])
+        self.arestas_destino = destinos[ordem]
+        self.arestas_custo = custos[ordem]
+        self.componente = self.componentesAbstratos(origens[ordem], self.arestas_destino)
+        # Copias em listas para a busca abstrata (acesso mais rapido em Python)
+        self.lista_x = self.no_x.tolist()
+        self.lista_y = self.no_y.tolist()
+        self.lista_inicio = self.inicio_arestas.tolist()
+
+    """ Segundo nivel: cada componente conexo de um quadrado de 'lado'
+        celulas (uma regiao) vira um no, ligado aos das regioes vizinhas
+        onde chegam as passagens do primeiro nivel. Os nos do primeiro
+        nivel de uma regiao sao os que se ligam por arestas que nao saem do
+        quadrado. O custo entre duas regioes e a distancia de Manhattan
+        entre os centros dos seus nos; a busca nesse grafo so escolhe por
+        quais regioes a busca abstrata pode passar """
+    def criarRegioes(self, lado):
+        quadrado = (self.no_y // lado) * (-(-self.livre.shape[1] // lado)) + self.no_x // lado
+        origens = npy.repeat(npy.arange(len(self.no_x)), npy.diff(self.inicio_arestas))
+        dentro = quadrado[origens] == quadrado[self.arestas_destino]
+        rotulo = self.componentesAbstratos(origens[dentro], self.arestas_destino[dentro])
+        raizes, self.no_regiao = npy.unique(rotulo, return_inverse=True)
+        quantidade = len(raizes)
+        nos = npy.bincount(self.no_regiao, minlength=quantidade)
+        centro_x = npy.bincount(self.no_regiao, self.no_x, quantidade) / nos
+        centro_y = npy.bincount(self.no_regiao, self.no_y, quantidade) / nos
+        a, b = self.no_regiao[self.arestas_passagem]
+        a, b = a[a != b], b[a != b]
+        pares = npy.unique(npy.concatenate([a * quantidade + b, b * quantidade + a]))
+        origens, destinos = npy.divmod(pares, quantidade)
+        por_regiao = npy.bincount(origens, minlength=quantidade)
+        self.regiao_inicio = npy.concatenate([[0], npy.cumsum(por_regiao)]).tolist()
+        self.regiao_destino = destinos.tolist()
+        self.regiao_custo = (npy.abs(centro_x[origens] - centro_x[destinos]) +
+                             npy.abs(centro_y[origens] - centro_y[destinos])).tolist()
+        self.regiao_x, self.regiao_y = centro_x.tolist(), centro_y.tolist()
+        self.lista_regiao = self.no_regiao.tolist()
+
+    """ A* no grafo de regioes, da regiao 'inicio' ate 'alvo'. Retorna o
+        conjunto das regioes do caminho e das vizinhas delas (folga para a
+        busca abstrata cortar caminho) ou None """
+    def buscaRegioes(self, inicio, alvo):
+        ax, ay = self.regiao_x[alvo], self.regiao_y[alvo]
+        regiao_x, regiao_y = self.regiao_x, self.regiao_y
+        custo = {inicio: 0.0}
+        pai = {inicio: None}
+        aberta = [(abs(regiao_x[inicio] - ax) + abs(regiao_y[inicio] - ay), 0.0, inicio)]
+        while aberta:
+            _, g, atual = heapq.heappop(aberta)
+            g = -g
+            if g > custo[atual]:
+                continue
+            if atual == alvo:
+                regioes = set()
+                while atual is not None:
+                    regioes.add(atual)
+                    regioes.update(self.regiao_destino[self.regiao_inicio[atual]:self.regiao_inicio[atual + 1]])
+                    atual = pai[atual]
+                return regioes
+            for i in range(self.regiao_inicio[atual], self.regiao_inicio[atual + 1]):
+                vizinho = self.regiao_destino[i]
+                novo = g + self.regiao_custo[i]
+                if novo < custo.get(vizinho, npy.inf):
+                    custo[vizinho] = novo
+                    pai[vizinho] = atual
+                    heapq.heappush(aberta, (novo + abs(regiao_x[vizinho] - ax) + abs(regiao_y[vizinho] - ay),
+                                            -novo, vizinho))
+        return None
+
+    """ Rotulo da componente conexa de cada no do grafo abstrato com as
+        arestas (origens, destinos), nos dois sentidos: cada
+        aresta pendura a raiz de um lado na do outro (menor rotulo) e os
+        rotulos saltam direto para a raiz, ate nada mudar """
+    def componentesAbstratos(self, origens, destinos):
+        rotulo = npy.arange(len(self.no_x))
+        while True:
+            anterior = rotulo.copy()
+            npy.minimum.at(rotulo, rotulo[origens], rotulo[destinos])
+            while True:
+                raiz = rotulo[rotulo]
+                if npy.array_equal(raiz, rotulo):
+                    break
+                rotulo = raiz
+            if npy.array_equal(rotulo, anterior):
+                return rotulo
+
+    """ Busca em largura simultanea em varios blocos, cada uma a partir da
+        celula local (xs[i], ys[i]). Os blocos vem com uma palavra de bits
+        por linha (B, t), e cada nivel da busca e feito com deslocamentos de
+        bits. Retorna o custo ate cada alvo (alvos_lote, alvos_x, alvos_y),
+        ou -1 onde nao alcancou; para assim que todos os alvos forem vistos. """
+    def buscasNosBlocos(self, linhas, xs, ys, alvos_lote, alvos_x, alvos_y):
+        tipo = linhas.dtype.type
+        um = tipo(1)
+        visitadas = npy.zeros(linhas.shape, dtype=tipo)
+        visitadas[npy.arange(len(linhas)), ys] = um << xs.astype(tipo)
+        fronteira = visitadas.copy()
+        bits_alvo = um << alvos_x.astype(tipo)
+        custo = npy.full(len(alvos_lote), -1, dtype=npy.int32)
+        custo[(visitadas[alvos_lote, alvos_y] & bits_alvo) != 0] = 0
+        pendentes = custo < 0
+        nivel = 0
+        while pendentes.any() and fronteira.any():
+            nivel += 1
+            vizinhas = (fronteira << um) | (fronteira >> um)
+            vizinhas[:, 1:] |= fronteira[:, :-1]
+            vizinhas[:, :-1] |= fronteira[:, 1:]
+            fronteira = vizinhas & linhas & ~visitadas
+            visitadas |= fronteira
+            vistos = pendentes & ((fronteira[alvos_lote, alvos_y] & bits_alvo) != 0)
+            custo[vistos] = nivel
+            pendentes &= ~vistos
+        return custo
+
+    """ Distancias da celula (x, y) ate os nos do proprio bloco, andando so
+        dentro do bloco. Retorna {no: custo} e, se 'alvo' for dado e estiver
+        no bloco, tambem o custo ate ele (ou None). """
+    def ligarAoBloco(self, x, y, alvo=None):
+        x0, y0, x1, y1 = self.limitesBloco(self.bloco(x, y))
+        distancia = {(x, y): 0}
+        fila = collections.deque([(x, y)])
+        while fila:
+            cx, cy = fila.popleft()
+            for dx, dy in VIZINHOS:
+                vx, vy = cx + dx, cy + dy
+                if x0 <= vx < x1 and y0 <= vy < y1 and self.livre[vy, vx] and (vx, vy) not in distancia:
+                    distancia[(vx, vy)] = distancia[(cx, cy)] + 1
+                    fila.append((vx, vy))
+        largura = self.livre.shape[1]
+        nos = {}
+        for (cx, cy), custo in distancia.items():
+            no = self.no_de_celula.get(cy * largura + cx)
+            if no is not None:
+                nos[no] = custo
+        return nos, (distancia.get(alvo) if alvo is not None else None)
+
+    """ A* no grafo abstrato. 'saidas' e 'chegadas' ligam origem e destino
+        aos nos dos seus blocos ({no: custo}); se 'regioes' for dado, so
+        passa por nos dessas regioes. Retorna a lista de nos do caminho ou
+        None. """
+    def buscaAbstrata(self, saidas, chegadas, destino, regioes=None):
+        dx, dy = destino
+        no_x, no_y, no_regiao = self.lista_x, self.lista_y, self.lista_regiao
+        CHEGADA = -1
+        custo = {}
+        pai = {}
+        aberta = []
+        for no, g in saidas.items():
+            if g < custo.get(no, 1 << 62):
+                custo[no] = g
+                pai[no] = None
+                aberta.append((g + abs(no_x[no] - dx) + abs(no_y[no] - dy), -g, no))
+        heapq.heapify(aberta)
+        while aberta:
+            _, g, atual = heapq.heappop(aberta)
+            g = -g
+            if g > custo[atual]:
+                continue
+            if atual == CHEGADA:
+                caminho = []
+                atual = pai[CHEGADA]
+                while atual is not None:
+                    caminho.append(atual)
+                    atual = pai[atual]
+                caminho.reverse()
+                return caminho
+            if atual in chegadas:
+                total = g + chegadas[atual]
+                if total < custo.get(CHEGADA, 1 << 62):
+                    custo[CHEGADA] = total
+                    pai[CHEGADA] = atual
+                    heapq.heappush(aberta, (total, -total, CHEGADA))
+            inicio, fim = self.lista_inicio[atual], self.lista_inicio[atual + 1]
+            for vizinho, passo in zip(self.arestas_destino[inicio:fim].tolist(),
+                                      self.arestas_custo[inicio:fim].tolist()):
+                if regioes is not None and no_regiao[vizinho] not in regioes:
+                    continue
+                if g + passo < custo.get(vizinho, 1 << 62):
+                    custo[vizinho] = g + passo
+                    pai[vizinho] = atual
+                    heapq.heappush(aberta, (g + passo + abs(no_x[vizinho] - dx)
+                                            + abs(no_y[vizinho] - dy), -(g + passo), vizinho))
+        return None
+
+    """ Pontos de passagem (celulas) do caminho entre origem e destino, sem
+        refinar os trechos dentro dos blocos, ou None se nao houver caminho.
+        O caminho abstrato e guardado por (bloco de origem, bloco de destino)
+        e reaproveitado nas consultas seguintes entre os mesmos blocos (nesse
+        caso pode nao ser o mais curto). """
+    def pontosDePassagem(self, origem, destino):
+        (ox, oy), (dx, dy) = origem, destino
+        if not (0 <= ox < self.largura and 0 <= oy < self.altura and
+                0 <= dx < self.largura and 0 <= dy < self.altura):
+            return None
+        if not (self.livre[oy, ox] and self.livre[dy, dx]):
+            return None
+        # No mesmo bloco, se der para ir por dentro dele, nem usa o grafo
+        mesmo_bloco = self.bloco(ox, oy) == self.bloco(dx, dy)
+        saidas, direto = self.ligarAoBloco(ox, oy, destino if mesmo_bloco else None)
+        if direto is not None:
+            return [origem, destino] if origem != destino else [origem]
+        chegadas, _ = self.ligarAoBloco(dx, dy)
+        # Sem componente em comum, nao ha caminho (evita varrer o grafo todo)
+        if not ({self.componente[n] for n in saidas} & {self.componente[n] for n in chegadas}):
+            return None
+        chave = (self.bloco(ox, oy), self.bloco(dx, dy))
+        nos = self.cache.get(chave)
+        if nos is None or nos[0] not in saidas or nos[-1] not in chegadas:
+            # Primeiro escolhe as regioes pelas quais passar e so entao busca
+            # os nos dentro delas (os de cada lado estao em uma regiao so)
+            regioes = self.buscaRegioes(self.lista_regiao[next(iter(saidas))],
+                                        self.lista_regiao[next(iter(chegadas))])
+            nos = self.buscaAbstrata(saidas, chegadas, destino, regioes)
+            if nos is None:
+                return None
+            if len(self.cache) >= self.LIMITE_CACHE:
+                self.cache.clear()
+            self.cache[chave] = nos
+        return [origem] + [(self.lista_x[n], self.lista_y[n]) for n in nos] + [destino]
+
+    """ Caminho completo (lista de celulas) entre origem e destino, ou None """
+    def caminho(self, origem, destino):
+        pontos = self.pontosDePassagem(origem, destino)
+        if pontos is None or len(pontos) == 1:
+            return pontos
+        caminho = [pontos[0]]
+        for a, b in zip(pontos, pontos[1:]):
+            if a == b:
+                continue
+            if abs(a[0] - b[0]) + abs(a[1] - b[1]) == 1:
+                caminho.append(b)
+                continue
+            trecho = aEstrela(self.livre, a, b, self.limitesBloco(self.bloco(*a)))
+            if trecho is None:
+                return None
+            caminho.extend(trecho[1:])
+        return caminho
@@ -29,6 +29,8 @@ from OpenGL.GLU import *
 from Ponto import Ponto
 import numpy as np
 from PIL import Image
+import AtlasTexturas as ATLAS
+import os
 #from scipy.misc import imread
 
 import time
@@ -113,3 +115,34 @@ def UseTexture (NroDaTextura: int):
         glEnable (GL_TEXTURE_2D)
         glBindTexture(GL_TEXTURE_2D, Texturas[NroDaTextura])
 
+
+# **********************************************************************
+# LoadTextureAtlas
+# Carrega varias imagens de um diretorio como uma unica textura (atlas).
+# Retorna o numero da textura (para usar em UseTexture) e um dicionario
+# com o retangulo (u0, v0, u1, v1) de cada imagem dentro do atlas.
+# O atlas montado fica salvo em 'cache' (por padrao, um nome tirado da
+# lista de imagens) e e reaproveitado nas proximas execucoes enquanto as
+# imagens nao mudarem.
+# **********************************************************************
+def LoadTextureAtlas(diretorio, nomes, cache=None):
+    caminhos = {nome: os.path.join(diretorio, nome) for nome in nomes}
+    if cache is None:
+        cache = ATLAS.nomeCacheAtlas(nomes)
+    image, uvs = ATLAS.carregarAtlas(caminhos, os.path.join(diretorio, cache))
+
+    glEnable ( GL_TEXTURE_2D )
+    texture = glGenTextures(1)
+    glPixelStorei(GL_UNPACK_ALIGNMENT, 1)
+    glBindTexture(GL_TEXTURE_2D, texture)
+    glTexParameteri(GL_TEXTURE_2D, GL_TEXTURE_WRAP_S, GL_CLAMP_TO_EDGE)
+    glTexParameteri(GL_TEXTURE_2D, GL_TEXTURE_WRAP_T, GL_CLAMP_TO_EDGE)
+    glTexParameteri(GL_TEXTURE_2D, GL_TEXTURE_MIN_FILTER, GL_LINEAR)
+    glTexParameteri(GL_TEXTURE_2D, GL_TEXTURE_MAG_FILTER, GL_LINEAR)
+    glTexImage2D(GL_TEXTURE_2D, 0, GL_RGBA, image.size[0], image.size[1], 0, GL_RGBA, GL_UNSIGNED_BYTE, image.tobytes())
+
+    global Texturas
+    Texturas += [texture]
+    print ("Atlas ", diretorio, " carregado com ", len(uvs), " imagens.")
+
+    return len(Texturas) - 1, uvs
@@ -0,0 +1,477 @@
+# ************************************************
+#   VisibilidadeLabirinto.py
+#   Conjuntos de celulas potencialmente visiveis
+#   (PVS): para cada celula, as celulas que podem
+#   ser vistas de algum ponto dentro dela. Calculado uma vez por mapa com leques de
+#   raios (DDA na grade, muitos raios por operacao
+#   de array), dividido entre processos e guardado
+#   em cache no disco pela chave do mapa. O cache
+#   e gerado fora do jogo, com
+#       python VisibilidadeLabirinto.py [mapa]
+#   Tambem define RaiosLabirinto, o leque de raios
+#   da camera lancado a cada quadro (como no
+#   Wolfenstein 3D), e MalhaPorCelula, que desenha
+#   so as primitivas que cobrem algumas celulas.
+# ************************************************
+
+import hashlib
+import multiprocessing
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor
+
+from OpenGL.GL import *
+import ctypes
+import numpy as npy
+
+from MalhaGL import MalhaGL
+
+VERSAO_PVS = 1
+RAIOS = 512             # direcoes por ponto de amostra
+RECUO_AMOSTRA = 0.02    # distancia dos pontos de amostra as bordas da celula
+LOTE_FONTES = 64        # celulas de origem por lote de raios
+LIMITE_CELULAS = 1 << 16
+
+# Pontos de amostra dentro da celula (centro e os quatro cantos recuados)
+AMOSTRAS = ((0.5, 0.5), (RECUO_AMOSTRA, RECUO_AMOSTRA), (1 - RECUO_AMOSTRA, RECUO_AMOSTRA),
+            (RECUO_AMOSTRA, 1 - RECUO_AMOSTRA), (1 - RECUO_AMOSTRA, 1 - RECUO_AMOSTRA))
+
+
+# Gera a chave que identifica o mapa e os parametros do calculo
+def chavePVS(opaco):
+    opaco = npy.ascontiguousarray(opaco, dtype=bool)
+    texto = f"{VERSAO_PVS}:{RAIOS}:{AMOSTRAS}:{opaco.shape}".encode("utf-8")
+    return hashlib.sha1(texto + npy.packbits(opaco).tobytes()).hexdigest()
+
+
+# Celulas atravessadas pelos raios que saem das celulas 'fontes' (indices
+# lineares) ate sairem do mapa ou baterem em uma celula diferente da fonte,
+# que tambem conta como vista: os raios de uma celula livre param na
+# primeira parede, e os de dentro de uma parede (a camera pode ter o plano
+# de corte dentro dela, e as paredes nao tem faces internas) param na
+# primeira celula livre. Retorna os pares (fonte, celula) sem repeticao, como
+# chaves fonte * total + celula, marcados em uma matriz (fonte do lote x celula).
+def raiosDoLote(opaco, fontes):
+    altura, largura = opaco.shape
+    total = altura * largura
+    opaco_linear = opaco.reshape(-1)
+    opaca = npy.repeat(opaco_linear[fontes], len(AMOSTRAS) * RAIOS)
+    angulos = 2.0 * npy.pi * (npy.arange(RAIOS) + 0.5) / RAIOS
+    dir_x, dir_z = npy.cos(angulos), npy.sin(angulos)
+    amostras = npy.array(AMOSTRAS)
+    fz, fx = npy.divmod(fontes, largura)
+    # Um raio por (fonte, amostra, direcao)
+    quantos = len(amostras) * RAIOS
+    fonte = npy.repeat(npy.arange(len(fontes)), quantos)
+    x = npy.repeat(fx, quantos) + npy.tile(npy.repeat(amostras[:, 0], RAIOS), len(fontes))
+    z = npy.repeat(fz, quantos) + npy.tile(npy.repeat(amostras[:, 1], RAIOS), len(fontes))
+    dx = npy.tile(dir_x, len(fontes) * len(amostras))
+    dz = npy.tile(dir_z, len(fontes) * len(amostras))
+
+    # Estado do DDA: celula atual, passo e distancia (em t) ate a proxima
+    # borda vertical e horizontal
+    cx, cz = npy.floor(x).astype(npy.int64), npy.floor(z).astype(npy.int64)
+    passo_x = npy.where(dx > 0, 1, -1)
+    passo_z = npy.where(dz > 0, 1, -1)
+    with npy.errstate(divide='ignore'):
+        delta_x = npy.abs(1.0 / dx)
+        delta_z = npy.abs(1.0 / dz)
+    proximo_x = npy.where(dx > 0, cx + 1 - x, x - cx) * delta_x
+    proximo_z = npy.where(dz > 0, cz + 1 - z, z - cz) * delta_z
+
+    vistos = npy.zeros((len(fontes), total), dtype=bool)
+    vistos[npy.arange(len(fontes)), fontes] = True
+    while len(fonte):
+        anda_x = proximo_x < proximo_z
+        cx = cx + npy.where(anda_x, passo_x, 0)
+        cz = cz + npy.where(anda_x, 0, passo_z)
+        proximo_x = proximo_x + npy.where(anda_x, delta_x, 0.0)
+        proximo_z = proximo_z + npy.where(anda_x, 0.0, delta_z)
+        dentro = (cx >= 0) & (cz >= 0) & (cx < largura) & (cz < altura)
+        celula = cz * largura + cx
+        vistos[fonte[dentro], celula[dentro]] = True
+        # Continuam so os raios que ainda estao no mapa, em celula do mesmo tipo da fonte
+        segue = dentro & (opaco_linear[npy.where(dentro, celula, 0)] == opaca)
+        fonte, opaca, cx, cz = fonte[segue], opaca[segue], cx[segue], cz[segue]
+        passo_x, passo_z = passo_x[segue], passo_z[segue]
+        delta_x, delta_z = delta_x[segue], delta_z[segue]
+        proximo_x, proximo_z = proximo_x[segue], proximo_z[segue]
+    locais, celulas = npy.nonzero(vistos)
+    return fontes[locais].astype(npy.int64) * total + celulas
+
+
+# Calcula o PVS de todas as celulas de 'opaco' ((altura, largura) bool,
+# True nas paredes). Retorna (inicio, celulas) no formato CSR: as celulas
+# vistas da celula i (indice linear) sao celulas[inicio[i]:inicio[i + 1]].
+# Entre celulas livres a visibilidade e simetrica, entao cada par visto de
+# um lado tambem vale do outro; isso cobre frestas que os raios de um lado perdem.
+def calcularPVS(opaco, processos=None):
+    opaco = npy.ascontiguousarray(opaco, dtype=bool)
+    total = opaco.size
+    fontes = npy.arange(total)
+    lotes = [fontes[i:i + LOTE_FONTES] for i in range(0, len(fontes), LOTE_FONTES)]
+    processos = processos or os.cpu_count() or 1
+    if processos > 1 and len(lotes) > 1:
+        with ProcessPoolExecutor(max_workers=processos,
+                                 mp_context=multiprocessing.get_context("spawn")) as executor:
+            partes = list(executor.map(raiosDoLote, [opaco] * len(lotes), lotes))
+    else:
+        partes = [raiosDoLote(opaco, lote) for lote in lotes]
+    pares = npy.concatenate(partes) if partes else npy.zeros(0, dtype=npy.int64)
+    origem, destino = npy.divmod(pares, total)
+    livre = ~opaco.reshape(-1)
+    volta = livre[origem] & livre[destino]
+    pares = npy.unique(npy.concatenate([pares, destino[volta] * total + origem[volta]]))
+    origem, destino = npy.divmod(pares, total)
+    inicio = npy.searchsorted(origem, npy.arange(total + 1)).astype(npy.int64)
+    return inicio, destino.astype(npy.int32)
+
+
+# Celulas de onde partem os raios da tela de uma camera em (x, z) olhando
+# na horizontal na direcao 'angulo' (graus, 0 = +z): as do trecho do plano
+# de corte proximo (o que fica antes dele nao e desenhado, entao paredes
+# ali nao tapam nada) e a da propria camera
+def celulasDaCamera(x, z, angulo, perto, campo_visao, aspecto, tamanho=1.0):
+    rad = npy.radians(angulo)
+    frente_x, frente_z = npy.sin(rad), npy.cos(rad)
+    meia_largura = perto * npy.tan(npy.radians(campo_visao / 2)) * aspecto
+    lado = npy.linspace(-meia_largura, meia_largura, int(meia_largura * 8 / tamanho) + 2)
+    xs = npy.append(x + frente_x * perto + frente_z * lado, x)
+    zs = npy.append(z + frente_z * perto - frente_x * lado, z)
+    return npy.floor(xs / tamanho).astype(npy.int64), npy.floor(zs / tamanho).astype(npy.int64)
+
+
+""" Classe PVSLabirinto """
+class PVSLabirinto:
+    def __init__(self, opaco, inicio, celulas):
+        self.altura, self.largura = opaco.shape
+        self.inicio = inicio
+        self.celulas = celulas
+        self.vistas_de_fora = None
+
+    """ Le o PVS do cache em 'arquivo_cache', ou None se ele nao existir
+        ou for de outro mapa """
+    @classmethod
+    def ler(cls, opaco, arquivo_cache):
+        opaco = npy.ascontiguousarray(opaco, dtype=bool)
+        try:
+            with npy.load(arquivo_cache) as dados:
+                if str(dados["chave"]) == chavePVS(opaco):
+                    return cls(opaco, dados["inicio"], dados["celulas"])
+        except (OSError, KeyError, ValueError):
+            pass
+        return None
+
+    """ Le o PVS do cache em 'arquivo_cache' quando ele corresponde ao mapa,
+        ou calcula e salva. Retorna None para mapas grandes demais. """
+    @classmethod
+    def carregar(cls, opaco, arquivo_cache=None, processos=None):
+        opaco = npy.ascontiguousarray(opaco, dtype=bool)
+        if opaco.size > LIMITE_CELULAS:
+            return None
+        if arquivo_cache is not None:
+            pvs = cls.ler(opaco, arquivo_cache)
+            if pvs is not None:
+                return pvs
+        chave = chavePVS(opaco)
+        inicio, celulas = calcularPVS(opaco, processos)
+        if arquivo_cache is not None:
+            try:
+                with open(arquivo_cache, "wb") as f:
+                    npy.savez_compressed(f, chave=chave, inicio=inicio, celulas=celulas)
+            except OSError as e:
+                print(f"Aviso: não foi possível salvar o PVS em cache: {e}")
+        return cls(opaco, inicio, celulas)
+
+    """ Indices lineares das celulas visiveis da celula (x, z) """
+    def visiveisDe(self, x, z):
+        celula = z * self.largura + x
+        return self.celulas[self.inicio[celula]:self.inicio[celula + 1]]
+
+    """ Mascara (altura * largura) das celulas visiveis de fora do mapa:
+        os raios que vem de fora entram por alguma celula da borda """
+    def visiveisDeFora(self):
+        if self.vistas_de_fora is None:
+            borda = npy.zeros((self.altura, self.largura), dtype=bool)
+            borda[[0, -1], :] = True
+            borda[:, [0, -1]] = True
+            self.vistas_de_fora = npy.zeros(self.altura * self.largura, dtype=bool)
+            for celula in npy.nonzero(borda.reshape(-1))[0].tolist():
+                self.vistas_de_fora[self.celulas[self.inicio[celula]:self.inicio[celula + 1]]] = True
+        return self.vistas_de_fora
+
+    """ Mascara (altura, largura) das celulas visiveis de alguma das
+        celulas (xs, zs), aumentada em 'margem' celulas para os lados """
+    def mascara(self, xs, zs, margem=1):
+        xs = npy.atleast_1d(npy.asarray(xs, dtype=npy.int64))
+        zs = npy.atleast_1d(npy.asarray(zs, dtype=npy.int64))
+        dentro = (xs >= 0) & (zs >= 0) & (xs < self.largura) & (zs < self.altura)
+        mascara = npy.zeros(self.altura * self.largura, dtype=bool)
+        if not dentro.all():
+            mascara |= self.visiveisDeFora()
+        for celula in npy.unique(zs[dentro] * self.largura + xs[dentro]).tolist():
+            mascara[self.celulas[self.inicio[celula]:self.inicio[celula + 1]]] = True
+        return aumentarMascara(mascara.reshape(self.altura, self.largura), margem)
+
+
+# Aumenta a mascara (altura, largura) em 'margem' celulas para todos os
+# lados, nas duas direcoes uma de cada vez (inclui as diagonais)
+def aumentarMascara(mascara, margem=1):
+    for _ in range(margem):
+        larga = mascara.copy()
+        larga[1:] |= mascara[:-1]
+        larga[:-1] |= mascara[1:]
+        mascara = larga.copy()
+        mascara[:, 1:] |= larga[:, :-1]
+        mascara[:, :-1] |= larga[:, 1:]
+    return mascara
+
+
+# Tabela de somas acumuladas (altura + 1, largura + 1) da mascara
+def tabelaDeSomas(mascara):
+    altura, largura = mascara.shape
+    soma = npy.zeros((altura + 1, largura + 1), dtype=npy.int32)
+    soma[1:, 1:] = npy.asarray(mascara, dtype=npy.int32).cumsum(axis=0).cumsum(axis=1)
+    return soma
+
+
+# Verifica quais retangulos de celulas [x0, x1) x [z0, z1) tem alguma
+# celula marcada em 'mascara' ((altura, largura) bool), com a tabela de
+# somas acumuladas da mascara
+def retangulosMarcados(mascara, x0, z0, x1, z1, soma=None):
+    if soma is None:
+        soma = tabelaDeSomas(mascara)
+    return (soma[z1, x1] - soma[z0, x1] - soma[z1, x0] + soma[z0, x0]) > 0
+
+
+""" Classe CelulasVisiveis """
+class CelulasVisiveis:
+    def __init__(self, mascara, x0, z0, largura, altura):
+        # 'mascara' cobre so a janela do mapa (largura, altura) que comeca
+        # na celula (x0, z0); fora dela nada e visivel
+        self.mascara = npy.asarray(mascara, dtype=bool)
+        self.x0, self.z0 = x0, z0
+        self.largura, self.altura = largura, altura
+        self.soma = None
+
+    """ Quantidade de celulas marcadas """
+    def quantidade(self):
+        return int(npy.count_nonzero(self.mascara))
+
+    """ Copia com 'margem' celulas de folga em volta de cada celula
+        marcada (a janela cresce junto, sem passar das bordas do mapa) """
+    def aumentadas(self, margem=1):
+        x0, z0 = max(self.x0 - margem, 0), max(self.z0 - margem, 0)
+        x1 = min(self.x0 + self.mascara.shape[1] + margem, self.largura)
+        z1 = min(self.z0 + self.mascara.shape[0] + margem, self.altura)
+        mascara = npy.zeros((max(z1 - z0, 0), max(x1 - x0, 0)), dtype=bool)
+        mascara[self.z0 - z0:self.z0 - z0 + self.mascara.shape[0],
+                self.x0 - x0:self.x0 - x0 + self.mascara.shape[1]] = self.mascara
+        return CelulasVisiveis(aumentarMascara(mascara, margem), x0, z0, self.largura, self.altura)
+
+    """ Mascara das celulas (xs, zs) que estao marcadas """
+    def contem(self, xs, zs):
+        xs = npy.asarray(xs, dtype=npy.int64) - self.x0
+        zs = npy.asarray(zs, dtype=npy.int64) - self.z0
+        altura, largura = self.mascara.shape
+        dentro = (xs >= 0) & (zs >= 0) & (xs < largura) & (zs < altura)
+        if not dentro.any():
+            return dentro
+        return dentro & self.mascara[npy.where(dentro, zs, 0), npy.where(dentro, xs, 0)]
+
+    """ Verifica quais retangulos de celulas [x0, x1) x [z0, z1) do mapa
+        tem alguma celula marcada; a tabela de somas da janela e montada
+        na primeira consulta """
+    def retangulosMarcados(self, x0, z0, x1, z1):
+        altura, largura = self.mascara.shape
+        if self.soma is None:
+            self.soma = tabelaDeSomas(self.mascara)
+        recorte = [npy.clip(npy.asarray(valor) - origem, 0, limite) for valor, origem, limite in
+                   ((x0, self.x0, largura), (z0, self.z0, altura), (x1, self.x0, largura), (z1, self.z0, altura))]
+        return retangulosMarcados(self.mascara, *recorte, soma=self.soma)
+
+
+""" Classe MalhaPorCelula """
+class MalhaPorCelula(MalhaGL):
+    def __init__(self, vertices, retangulos, primitiva, formato, por_primitiva):
+        # Cada primitiva cobre o retangulo de celulas (x0, z0, largura,
+        # profundidade) dado em 'retangulos'; elas sao ordenadas por linha
+        # e coluna, para que as de celulas vizinhas fiquem juntas no VBO
+        vertices = npy.asarray(vertices, dtype=npy.float32)
+        grupos = vertices.reshape(-1, por_primitiva, vertices.shape[1])
+        x0, z0, larguras, profundidades = (npy.asarray(r, dtype=npy.int64) for r in retangulos)
+        ordem = npy.lexsort((x0, z0))
+        super().__init__(grupos[ordem].reshape(-1, vertices.shape[1]), primitiva, formato)
+        self.retangulos = (x0[ordem], z0[ordem], (x0 + larguras)[ordem], (z0 + profundidades)[ordem])
+        self.por_primitiva = por_primitiva
+        self.desenhadas = 0
+
+    """ Desenha so as primitivas com alguma celula marcada em 'celulas'
+        (CelulasVisiveis), juntando as seguidas em um trecho so, com uma
+        chamada de glMultiDrawArrays """
+    def desenharCelulas(self, celulas):
+        marcadas = celulas.retangulosMarcados(*self.retangulos)
+        # Bordas dos trechos de primitivas marcadas seguidas
+        bordas = npy.diff(npy.concatenate([[False], marcadas, [False]]).astype(npy.int8))
+        primeiros = npy.nonzero(bordas == 1)[0]
+        contagens = npy.nonzero(bordas == -1)[0] - primeiros
+        self.desenhadas = int(contagens.sum())
+        if self.quantidade == 0 or len(primeiros) == 0:
+            return
+        primeiros = npy.ascontiguousarray(primeiros * self.por_primitiva, dtype=npy.int32)
+        contagens = npy.ascontiguousarray(contagens * self.por_primitiva, dtype=npy.int32)
+        if self.vbo is not None:
+            glBindBuffer(GL_ARRAY_BUFFER, self.vbo)
+            glInterleavedArrays(self.formato, 0, ctypes.c_void_p(0))
+        else:
+            glInterleavedArrays(self.formato, 0, self.vertices)
+        glMultiDrawArrays(self.primitiva, primeiros, contagens, len(primeiros))
+        self.desligarArrays()
+        if self.vbo is not None:
+            glBindBuffer(GL_ARRAY_BUFFER, 0)
+
+
+
+""" Classe RaiosLabirinto """
+class RaiosLabirinto:
+    # Tipos das celulas da grade
+    LIVRE, PAREDE, FORA = 0, 1, 2
+
+    def __init__(self, opaco):
+        # Grade com um anel de celulas "fora" em volta do mapa: um raio que
+        # sai do mapa para na primeira delas, sem testar os limites
+        self.altura, self.largura = opaco.shape
+        self.grade = npy.full((self.altura + 2, self.largura + 2), self.FORA, dtype=npy.int8)
+        self.grade[1:-1, 1:-1] = npy.where(opaco, self.PAREDE, self.LIVRE)
+        self.raios = 320    # raios por quadro no maximo, espalhados pela tela
+        self.trecho = 4     # cruzamentos por eixo na primeira volta
+
+    """ Celulas vistas por uma camera em (x, z) olhando na horizontal na
+        direcao 'angulo' (graus, 0 = +z), com um raio por coluna da tela ate
+        'raios' deles; em telas mais largas os raios ficam espacados por
+        igual na largura e a folga de uma celula das CelulasVisiveis cobre
+        quase tudo entre eles (so frestas mais finas que o espaco entre dois
+        raios podem ficar de fora). Cada raio passa pelo centro da sua
+        coluna e para na primeira face (troca de piso para parede ou de
+        parede para piso) depois do plano de corte proximo ('perto', medido
+        na direcao da camera; o que esta antes dele nao e desenhado, entao o
+        raio comeca nele, as vezes dentro de uma parede) ou ao sair do mapa.
+        Retorna as CelulasVisiveis atravessadas do plano de corte ate essa
+        face, incluindo as duas que ela separa (sem folga), em uma janela do
+        tamanho da caixa delas """
+    def celulasVistas(self, x, z, angulo, perto, campo_visao, aspecto, colunas, tamanho=1.0):
+        linhas, linha = self.grade.shape
+        grade = self.grade.reshape(-1)
+        rad = npy.radians(angulo)
+        frente_x, frente_z = npy.sin(rad), npy.cos(rad)
+        # Direcao de cada raio com componente 1 para a frente: o parametro
+        # t do raio e a profundidade na camera
+        colunas = min(colunas, self.raios)
+        tela = (2.0 * (npy.arange(colunas) + 0.5) / colunas - 1.0) * npy.tan(npy.radians(campo_visao / 2)) * aspecto
+        dx = (frente_x - frente_z * tela) / tamanho
+        dz = (frente_z + frente_x * tela) / tamanho
+        dx[dx == 0] = 1e-12
+        dz[dz == 0] = 1e-12
+        # Cada raio comeca onde cruza o plano de corte: na sua coluna, o que
+        # esta antes dele nao e desenhado. Dali em diante o raio para ao
+        # entrar em uma celula de tipo diferente da primeira
+        px, pz = x / tamanho, z / tamanho
+        px, pz = px + perto * dx, pz + perto * dz
+        cx0 = npy.clip(npy.floor(px), -1, self.largura)
+        cz0 = npy.clip(npy.floor(pz), -1, self.altura)
+        inicio = (cz0.astype(npy.intp) + 1) * linha + cx0.astype(npy.intp) + 1
+        tipo_inicio = grade[inicio]
+        # Os que comecam fora do mapa nao veem nada
+        dentro = tipo_inicio != self.FORA
+        if not dentro.any():
+            return CelulasVisiveis(npy.zeros((0, 0), dtype=bool), 0, 0, self.largura, self.altura)
+        dx, dz, px, pz, cx0, cz0 = dx[dentro], dz[dentro], px[dentro], pz[dentro], cx0[dentro], cz0[dentro]
+        tipo_inicio = tipo_inicio[dentro]
+        vistas = [inicio[dentro]]
+
+        # Os cruzamentos com as bordas de cada eixo sao progressoes em t: o
+        # i-esimo cruzamento vertical leva a coluna cx0 + passo * (i + 1),
+        # na linha dada por quantos cruzamentos horizontais vieram antes
+        # dele (e vice-versa). As contas sao em float32, com um raio por
+        # coluna dos arrays (k, raios); so o indice linear da celula e
+        # montado em inteiros, que em mapas grandes passa de 2^24.
+        # Os raios andam em trechos de k cruzamentos por eixo, dobrando a
+        # cada volta, e saem dos arrays quando param.
+        delta_x, delta_z = npy.abs(1.0 / dx), npy.abs(1.0 / dz)
+        primeiro_x = (npy.where(dx > 0, cx0 + 1 - px, px - cx0) * delta_x).astype(npy.float32)
+        primeiro_z = (npy.where(dz > 0, cz0 + 1 - pz, pz - cz0) * delta_z).astype(npy.float32)
+        delta_x, delta_z = delta_x.astype(npy.float32), delta_z.astype(npy.float32)
+        passo_x = npy.where(dx > 0, 1, -1).astype(npy.float32)
+        passo_z = npy.where(dz > 0, 1, -1).astype(npy.float32)
+        base_x, base_z = (cx0 + 1).astype(npy.float32), (cz0 + 1).astype(npy.float32)
+        feitos_x = npy.zeros(len(dx), dtype=npy.float32)
+        feitos_z = npy.zeros(len(dx), dtype=npy.float32)
+        raios = npy.arange(len(dx))
+        infinito = npy.float32(npy.inf)
+        k = self.trecho
+        while len(raios):
+            passos = npy.arange(k, dtype=npy.float32)[:, None]
+            i_x = feitos_x + passos
+            i_z = feitos_z + passos
+            tx = primeiro_x + i_x * delta_x
+            tz = primeiro_z + i_z * delta_z
+            # So os cruzamentos ate o fim do trecho mais curto estao completos
+            limite = npy.minimum(tx[-1], tz[-1])
+            antes_z = npy.maximum(npy.floor((tx - primeiro_z) / delta_z) + 1, 0)
+            antes_x = npy.maximum(npy.floor((tz - primeiro_x) / delta_x) + 1, 0)
+            t = npy.concatenate([tx, tz])
+            # Coluna e linha (na grade com o anel) da celula em que cada
+            # cruzamento entra; os alem do limite podem cair fora da grade
+            cx = npy.concatenate([base_x + passo_x * (i_x + 1), base_x + passo_x * antes_x])
+            cz = npy.concatenate([base_z + passo_z * antes_z, base_z + passo_z * (i_z + 1)])
+            npy.clip(cx, 0, linha - 1, out=cx)
+            npy.clip(cz, 0, linhas - 1, out=cz)
+            celula = cz.astype(npy.intp) * linha + cx.astype(npy.intp)
+            validos = t <= limite
+            tipo = grade[celula]
+            para = validos & ((tipo == self.FORA) | (tipo != tipo_inicio[raios]))
+            fim = npy.where(para, t, infinito).min(axis=0)
+            vistas.append(celula[validos & (t <= fim)])
+            seguem = fim == infinito
+            feitos_x = (feitos_x + npy.count_nonzero(tx <= limite, axis=0))[seguem]
+            feitos_z = (feitos_z + npy.count_nonzero(tz <= limite, axis=0))[seguem]
+            primeiro_x, primeiro_z = primeiro_x[seguem], primeiro_z[seguem]
+            delta_x, delta_z = delta_x[seguem], delta_z[seguem]
+            passo_x, passo_z = passo_x[seguem], passo_z[seguem]
+            base_x, base_z = base_x[seguem], base_z[seguem]
+            raios = raios[seguem]
+            k *= 2
+
+        # So a caixa das celulas do mapa que os raios marcaram (sem o anel
+        # de fora) e devolvida
+        vz, vx = npy.divmod(npy.concatenate(vistas), linha)
+        dentro = (vx > 0) & (vz > 0) & (vx <= self.largura) & (vz <= self.altura)
+        vx, vz = vx[dentro] - 1, vz[dentro] - 1
+        x0, z0 = int(vx.min()), int(vz.min())
+        janela = npy.zeros((int(vz.max()) + 1 - z0, int(vx.max()) + 1 - x0), dtype=bool)
+        janela[vz - z0, vx - x0] = True
+        return CelulasVisiveis(janela, x0, z0, self.largura, self.altura)
+
+
+# Le do arquivo de mapa do jogo a mascara (altura, largura) das paredes
+# (celulas do tipo 0), as unicas que tapam a visao
+def opacoDoMapa(nome_arquivo):
+    with open(nome_arquivo, "r") as f:
+        linhas = f.read().split("\n")
+    largura, altura = map(int, linhas[0].split())
+    opaco = npy.zeros((altura, largura), dtype=bool)
+    for z in range(altura):
+        for x, valor in enumerate(linhas[z + 1].split()[:largura]):
+            opaco[z, x] = int(valor.split(":")[0]) == 0
+    return opaco
+
+
+if __name__ == "__main__":
+    mapa = sys.argv[1] if len(sys.argv) > 1 else "mapa_labirinto_texturas.txt"
+    destino = mapa + ".pvs.npz"
+    opaco = opacoDoMapa(mapa)
+    if opaco.size > LIMITE_CELULAS:
+        print(f"Mapa {opaco.shape[1]}x{opaco.shape[0]} grande demais para o PVS; o jogo usa os raios da câmera")
+    else:
+        pvs = PVSLabirinto.carregar(opaco, destino)
+        print(f"PVS de {mapa}: {len(pvs.celulas)} pares de células visíveis em {destino}")
@@ -0,0 +1,93 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Medição do desenho de muitas esferas iguais (como inimigos e cápsulas):
+uma chamada por esfera (glTranslatef + display list), todas juntas em um
+array na CPU e por instâncias na placa (glDrawArraysInstanced).
+
+Precisa de janela OpenGL. Para rodar no renderizador por software do Mesa
+(llvmpipe):
+    LIBGL_ALWAYS_SOFTWARE=1 python benchmark_instancias.py
+    LIBGL_ALWAYS_SOFTWARE=1 python benchmark_instancias.py 1000 10000
+"""
+
+import sys
+import time
+
+import numpy as npy
+from OpenGL.GL import *
+from OpenGL.GLU import *
+from OpenGL.GLUT import *
+
+import MalhaLabirinto as MALHA
+from InstanciasGL import MalhaInstanciada
+
+QUANTIDADES = (100, 1000, 10000)
+QUADROS = 5
+
+
+# Tempo médio de um quadro (limpa, desenha e espera a placa terminar)
+def cronometrarQuadros(desenhar, quadros=QUADROS):
+    desenhar()
+    glFinish()
+    inicio = time.perf_counter()
+    for _ in range(quadros):
+        glClear(GL_COLOR_BUFFER_BIT | GL_DEPTH_BUFFER_BIT)
+        desenhar()
+        glFinish()
+    return (time.perf_counter() - inicio) / quadros
+
+
+def main():
+    quantidades = [int(q) for q in sys.argv[1:]] or QUANTIDADES
+    glutInit()
+    glutInitDisplayMode(GLUT_DOUBLE | GLUT_RGBA | GLUT_DEPTH)
+    glutInitWindowSize(640, 480)
+    glutCreateWindow(b"Instancias")
+    glutHideWindow()
+    glEnable(GL_DEPTH_TEST)
+    glMatrixMode(GL_PROJECTION)
+    gluPerspective(60.0, 640 / 480, 0.1, 500.0)
+    glMatrixMode(GL_MODELVIEW)
+    gluLookAt(50.0, 150.0, -40.0, 50.0, 0.0, 50.0, 0.0, 1.0, 0.0)
+    glColor3f(1.0, 0.0, 0.0)
+
+    lista = glGenLists(1)
+    glNewList(lista, GL_COMPILE)
+    gluSphere(gluNewQuadric(), 0.4, 16, 16)
+    glEndList()
+    malha = MalhaInstanciada(MALHA.verticesEsfera(0.4, 16, 16))
+    placa = bool(MalhaInstanciada.programaInstancias())
+
+    print(f"OpenGL {glGetString(GL_VERSION).decode()} ({glGetString(GL_RENDERER).decode()})")
+    print("Esferas de 16x16 fatias (ms por quadro):")
+    gerador = npy.random.default_rng(0)
+    for quantidade in quantidades:
+        instancias = npy.column_stack([gerador.uniform(0, 100, quantidade), npy.full(quantidade, 0.5),
+                                       gerador.uniform(0, 100, quantidade), npy.ones(quantidade)])
+
+        def umaPorUma():
+            for x, y, z, _ in instancias.tolist():
+                glPushMatrix()
+                glTranslatef(x, y, z)
+                glCallList(lista)
+                glPopMatrix()
+
+        # As posições mudam a cada quadro, como as dos inimigos: o lote da
+        # CPU é montado de novo toda vez
+        def emLote():
+            malha.ultimas = None
+            malha.desenharInstancias(instancias)
+
+        MalhaInstanciada.USAR_INSTANCIAS = False
+        t_cpu = cronometrarQuadros(emLote)
+        MalhaInstanciada.USAR_INSTANCIAS = True
+        t_placa = cronometrarQuadros(lambda: malha.desenharInstancias(instancias)) if placa else None
+        t_uma = cronometrarQuadros(umaPorUma)
+        texto_placa = f"{t_placa * 1000:8.2f}" if placa else "   (sem suporte)"
+        print(f"  {quantidade:6d} esferas: uma por uma {t_uma * 1000:8.2f}  "
+              f"lote na CPU {t_cpu * 1000:8.2f}  instâncias {texto_placa}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,702 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Medições de desempenho das rotinas do Labirinto 3D que não dependem de
+janela OpenGL.
+
+Uso:
+    python benchmark_labirinto.py            (roda todas as medições)
+    python benchmark_labirinto.py tri        (roda só a medição 'tri')
+"""
+
+import collections
+import glob
+import os
+import random
+import sys
+import tempfile
+import time
+
+import numpy as npy
+
+import GradeLabirinto as GRADE
+import BlocosLabirinto as BLOCOS
+import MalhaLabirinto as MALHA
+import ModelosTRI as TRI
+import PlanejadorHPA as HPA
+from CampoFluxo import CampoFluxo
+from CelulasLivres import IndiceCelulasLivres
+from ComponentesLabirinto import ComponentesConexos
+from HashEspacial import HashEspacial
+from InimigosLabirinto import Inimigos
+from VisibilidadeLabirinto import PVSLabirinto, RaiosLabirinto, CelulasVisiveis, celulasDaCamera, opacoDoMapa
+
+DIRETORIO = os.path.dirname(os.path.abspath(__file__))
+
+
+# Executa 'funcao' algumas vezes e retorna o menor tempo em segundos
+def cronometrar(funcao, repeticoes=5):
+    melhor = float("inf")
+    for _ in range(repeticoes):
+        inicio = time.perf_counter()
+        funcao()
+        melhor = min(melhor, time.perf_counter() - inicio)
+    return melhor
+
+
+# Leitor .tri original (linha a linha, um dicionário por triângulo),
+# mantido aqui apenas como referência de tempo e de resultado
+def lerTRILinhaALinha(caminho_arquivo):
+    triangulos = []
+    with open(caminho_arquivo, 'r') as f:
+        for linha in f:
+            linha = linha.strip()
+            if not linha:
+                continue
+            partes = linha.split()
+            if len(partes) < 10:
+                continue
+            try:
+                v1 = [float(partes[0]), float(partes[1]), float(partes[2])]
+                v2 = [float(partes[3]), float(partes[4]), float(partes[5])]
+                v3 = [float(partes[6]), float(partes[7]), float(partes[8])]
+                cor_int = int(partes[9], 16)
+                cor = [((cor_int >> 16) & 0xFF) / 255.0, ((cor_int >> 8) & 0xFF) / 255.0, (cor_int & 0xFF) / 255.0]
+                triangulos.append({'v1': v1, 'v2': v2, 'v3': v3, 'cor': cor})
+            except:
+                continue
+    return triangulos
+
+
+# Compara o leitor numpy com o leitor linha a linha em todos os .tri
+def benchTRI():
+    arquivos = sorted(glob.glob(os.path.join(DIRETORIO, "TRI", "*.tri")))
+    total = 0
+    for caminho in arquivos:
+        antigo = lerTRILinhaALinha(caminho)
+        novo = TRI.lerArquivoTRI(caminho)
+        posicoes = npy.array([t['v1'] + t['v2'] + t['v3'] for t in antigo], dtype=npy.float32).reshape(-1, 9)
+        cores = npy.array([t['cor'] for t in antigo], dtype=npy.float32).reshape(-1, 3)
+        if not (npy.array_equal(posicoes, novo.posicoes) and npy.array_equal(cores, novo.cores)):
+            print(f"  DIFERENÇA em {os.path.basename(caminho)}")
+        total += len(novo)
+    t_antigo = cronometrar(lambda: [lerTRILinhaALinha(c) for c in arquivos])
+    t_novo = cronometrar(lambda: [TRI.lerArquivoTRI(c) for c in arquivos])
+    print(f"Leitura de {len(arquivos)} arquivos .tri ({total} triângulos):")
+    print(f"  linha a linha: {t_antigo * 1000:8.1f} ms")
+    print(f"  numpy:         {t_novo * 1000:8.1f} ms  ({t_antigo / t_novo:.1f}x)")
+
+
+# Níveis de detalhe dos modelos .tri: triângulos e área mantidos em cada
+# nível e tempo da simplificação
+def benchLOD():
+    arquivos = sorted(glob.glob(os.path.join(DIRETORIO, "TRI", "*.tri")))
+    modelos = {os.path.splitext(os.path.basename(c))[0]: TRI.lerArquivoTRI(c) for c in arquivos}
+    print(f"Níveis de detalhe (divisões {TRI.DIVISOES_LOD}, área mínima {TRI.AREA_MINIMA_LOD:.0%}):")
+    totais = npy.zeros(len(TRI.DIVISOES_LOD) + 1, dtype=npy.int64)
+    for nome, modelo in modelos.items():
+        niveis = modelo.niveisDeDetalhe()
+        totais += [len(nivel) for nivel in niveis]
+        area = modelo.area() or 1.0
+        texto = "  ".join(f"{len(nivel):5d} ({nivel.area() / area:4.0%})" for nivel in niveis)
+        print(f"  {nome:22s} {texto}")
+    t_niveis = cronometrar(lambda: [modelo.niveisDeDetalhe() for modelo in modelos.values()], 3)
+    print(f"  total: {' / '.join(str(t) for t in totais)} triângulos, "
+          f"simplificação de todos em {t_niveis * 1000:.1f} ms")
+
+
+# Compara a leitura dos .tri em texto (com a simplificação dos níveis de
+# detalhe) com o pacote binário mapeado em memória, que já traz os níveis
+def benchPacote():
+    diretorio = os.path.join(DIRETORIO, "TRI")
+    arquivos = sorted(glob.glob(os.path.join(diretorio, "*.tri")))
+    nomes = [os.path.splitext(os.path.basename(c))[0] for c in arquivos]
+    with tempfile.TemporaryDirectory() as temporario:
+        destino = os.path.join(temporario, "modelos.pak")
+        t_empacotar = cronometrar(lambda: TRI.empacotarModelos(diretorio, destino), 1)
+
+        def pelo_pacote():
+            pacote = TRI.PacoteModelos(destino)
+            return [pacote.modelo(n).niveisDeDetalhe() for n, c in zip(nomes, arquivos) if pacote.atualizado(n, c)]
+
+        if len(pelo_pacote()) != len(arquivos):
+            print("  pacote desatualizado")
+        t_texto = cronometrar(lambda: [TRI.lerArquivoTRI(c).niveisDeDetalhe() for c in arquivos])
+        t_pacote = cronometrar(pelo_pacote)
+    print(f"Carga de {len(arquivos)} modelos:")
+    print(f"  gerar pacote:          {t_empacotar * 1000:8.1f} ms")
+    print(f"  texto (.tri) e níveis: {t_texto * 1000:8.1f} ms")
+    print(f"  pacote (.pak):         {t_pacote * 1000:8.1f} ms  ({t_texto / t_pacote:.1f}x)")
+
+
+# Gera um mapa aleatório com paredes, janelas, portas e objetos
+def mapaAleatorio(largura, altura, semente=0, paredes=0.3, especiais=0.002):
+    gerador = npy.random.default_rng(semente)
+    mapa = npy.where(gerador.random((altura, largura)) < paredes, 0, 1)
+    listas = {'janelas': [], 'portas': [], 'objetos': []}
+    for nome in listas:
+        quantidade = int(largura * altura * especiais)
+        for x, y in zip(gerador.integers(0, largura, quantidade), gerador.integers(0, altura, quantidade)):
+            mapa[y, x] = 1
+            listas[nome].append({'x': int(x), 'y': int(y)})
+    return mapa.tolist(), listas['janelas'], listas['portas'], listas['objetos']
+
+
+# Verificação de colisão original: varre as listas de janelas, objetos e
+# portas para cada um dos cinco pontos
+def colisaoLinear(mapa, janelas, portas, objetos, pos_x, pos_z):
+    altura, largura = len(mapa), len(mapa[0])
+    for px, pz in ((pos_x, pos_z), (pos_x + 0.2, pos_z), (pos_x - 0.2, pos_z),
+                   (pos_x, pos_z + 0.2), (pos_x, pos_z - 0.2)):
+        if any(j['x'] == int(px) and j['y'] == int(pz) for j in janelas):
+            return True
+        if any(o['x'] == int(px) and o['y'] == int(pz) for o in objetos):
+            return True
+        if any(p['x'] == int(px) and p['y'] == int(pz) for p in portas):
+            continue
+        x, z = int(px), int(pz)
+        if x < 0 or x >= largura or z < 0 or z >= altura or mapa[z][x] not in (1, 2, 3):
+            return True
+    return False
+
+
+# Verificações de colisão por segundo em um mapa 1000x1000
+def benchColisao():
+    mapa, janelas, portas, objetos = mapaAleatorio(1000, 1000)
+    grade = GRADE.construirGrade(mapa, janelas, portas, objetos)
+    gerador = npy.random.default_rng(1)
+    posicoes = gerador.uniform(-1.0, 1001.0, (2000, 2)).tolist()
+
+    def pelaGrade(px, pz):
+        return any(GRADE.pontoBloqueado(grade, x, z) for x, z in
+                   ((px, pz), (px + 0.2, pz), (px - 0.2, pz), (px, pz + 0.2), (px, pz - 0.2)))
+
+    amostra = posicoes[:200]
+    esperado = [colisaoLinear(mapa, janelas, portas, objetos, x, z) for x, z in amostra]
+    if esperado != [pelaGrade(x, z) for x, z in amostra]:
+        print("  DIFERENÇA entre a grade e a verificação linear")
+    t_linear = cronometrar(lambda: [colisaoLinear(mapa, janelas, portas, objetos, x, z) for x, z in amostra], 1)
+    t_grade = cronometrar(lambda: [pelaGrade(x, z) for x, z in posicoes])
+    xs = npy.array(posicoes)[:, 0]
+    zs = npy.array(posicoes)[:, 1]
+    t_vetor = cronometrar(lambda: GRADE.pontosBloqueados(grade, xs, zs))
+    print(f"Colisão em mapa 1000x1000 ({len(janelas)} janelas, {len(portas)} portas, {len(objetos)} objetos):")
+    print(f"  listas:          {len(amostra) / t_linear:12.0f} verificações/s")
+    print(f"  grade:           {len(posicoes) / t_grade:12.0f} verificações/s")
+    print(f"  grade (numpy):   {len(posicoes) / t_vetor:12.0f} pontos/s")
+
+
+# Passos do jogador (0.5 de comprimento, como com dt = 0.05) em direções
+# aleatórias: cinco pontos testados no destino (aceita ou recusa o passo)
+# contra o círculo varrido, que anda até a parede e desliza
+def benchVarredura():
+    mapa, janelas, portas, objetos = mapaAleatorio(1000, 1000, paredes=0.35)
+    grade = GRADE.construirGrade(mapa, janelas, portas, objetos)
+    livres = npy.argwhere((grade & GRADE.BLOQUEIA_JOGADOR) == 0)
+    gerador = npy.random.default_rng(4)
+    celulas = livres[gerador.choice(len(livres), 2000, replace=False)]
+    angulos = gerador.uniform(0.0, 2 * npy.pi, len(celulas))
+    passos = [(x + 0.5, z + 0.5, 0.5 * npy.sin(a), 0.5 * npy.cos(a))
+              for (z, x), a in zip(celulas.tolist(), angulos.tolist())]
+
+    def cincoPontos(x, z, dx, dz):
+        nx, nz = x + dx, z + dz
+        if any(GRADE.pontoBloqueado(grade, px, pz) for px, pz in
+               ((nx, nz), (nx + 0.2, nz), (nx - 0.2, nz), (nx, nz + 0.2), (nx, nz - 0.2))):
+            return x, z
+        return nx, nz
+
+    consultas = [0]
+    original = GRADE.celulaBloqueada
+
+    def contando(grade, cx, cz):
+        consultas[0] += 1
+        return original(grade, cx, cz)
+
+    GRADE.celulaBloqueada = contando
+    finais = [GRADE.moverCirculo(grade, x, z, dx, dz, 0.2) for x, z, dx, dz in passos]
+    GRADE.celulaBloqueada = original
+    andaram_pontos = sum(cincoPontos(*p) != p[:2] for p in passos)
+    andaram = sum(f != p[:2] for f, p in zip(finais, passos))
+    distancia = sum(((f[0] - p[0]) ** 2 + (f[1] - p[1]) ** 2) ** 0.5 for f, p in zip(finais, passos))
+    t_pontos = cronometrar(lambda: [cincoPontos(*p) for p in passos])
+    t_varrido = cronometrar(lambda: [GRADE.moverCirculo(grade, *p, 0.2) for p in passos])
+    print(f"Passos do jogador em mapa 1000x1000 ({len(passos)} passos de 0.5):")
+    print(f"  cinco pontos:    {t_pontos / len(passos) * 1e6:6.2f} us/passo, 5 consultas, "
+          f"{andaram_pontos} passos aceitos")
+    print(f"  círculo varrido: {t_varrido / len(passos) * 1e6:6.2f} us/passo, "
+          f"{consultas[0] / len(passos):.1f} consultas, {andaram} passos com movimento "
+          f"(média {distancia / len(passos):.2f} de 0.5)")
+
+
+# Matrizes de gluPerspective e gluLookAt (para testar o frustum sem OpenGL)
+def matrizPerspectiva(fovy, aspecto, perto, longe):
+    f = 1.0 / npy.tan(npy.radians(fovy) / 2)
+    return npy.array([[f / aspecto, 0, 0, 0], [0, f, 0, 0],
+                      [0, 0, (longe + perto) / (perto - longe), 2 * longe * perto / (perto - longe)],
+                      [0, 0, -1, 0]])
+
+
+def matrizOlhar(olho, alvo, cima):
+    frente = npy.asarray(alvo, dtype=npy.float64) - olho
+    frente /= npy.linalg.norm(frente)
+    lado = npy.cross(frente, cima)
+    lado /= npy.linalg.norm(lado)
+    cima = npy.cross(lado, frente)
+    matriz = npy.eye(4)
+    matriz[0, :3], matriz[1, :3], matriz[2, :3] = lado, cima, -frente
+    matriz[:3, 3] = -matriz[:3, :3] @ olho
+    return matriz
+
+
+# Teste dos blocos de 16x16 células contra o frustum da câmera em primeira
+# pessoa, em um mapa 1024x1024 (4096 blocos)
+def benchBlocos():
+    blocos = BLOCOS.BlocosLabirinto(1024, 1024, 2.7)
+    projecao = matrizPerspectiva(45, 1240 / 800, 5.0, 2000.0)
+    gerador = npy.random.default_rng(5)
+    cameras = []
+    for _ in range(50):
+        x, z = gerador.uniform(0, 1024, 2)
+        angulo = gerador.uniform(0, 2 * npy.pi)
+        olho = npy.array([x, 2.35, z])
+        alvo = olho + [npy.sin(angulo) * 5, 0.0, npy.cos(angulo) * 5]
+        cameras.append(BLOCOS.planosDoFrustum(projecao, matrizOlhar(olho, alvo, [0.0, 1.0, 0.0])))
+    desenhados = []
+    for planos in cameras:
+        blocos.atualizarVisiveis(planos)
+        desenhados.append(blocos.desenhados)
+    t_teste = cronometrar(lambda: [blocos.atualizarVisiveis(p) for p in cameras]) / len(cameras)
+    print(f"Blocos de {BLOCOS.TAMANHO_BLOCO}x{BLOCOS.TAMANHO_BLOCO} em mapa 1024x1024 ({len(blocos)} blocos), "
+          f"câmera em primeira pessoa:")
+    print(f"  teste do frustum: {t_teste * 1000:.3f} ms/quadro, "
+          f"{npy.mean(desenhados):.0f} blocos desenhados em média ({npy.mean(desenhados) / len(blocos):.1%})")
+
+
+# Sorteio de célula livre original: varre o mapa inteiro a cada chamada
+def sortearVarrendo(mapa, evitar):
+    livres = [(x, y) for y, linha in enumerate(mapa) for x, c in enumerate(linha)
+              if c in (1, 2, 3) and (x, y) not in evitar]
+    return random.choice(livres) if livres else None
+
+
+# Reposicionamentos por segundo em um mapa 1000x1000 com 1000 entidades
+def benchCelulas():
+    mapa, janelas, portas, objetos = mapaAleatorio(1000, 1000)
+    grade = GRADE.construirGrade(mapa, janelas, portas, objetos)
+    t_indice_novo = cronometrar(lambda: IndiceCelulasLivres((grade & GRADE.PISO) != 0), 1)
+    indice = IndiceCelulasLivres((grade & GRADE.PISO) != 0)
+    entidades = []
+    for _ in range(1000):
+        cel = indice.sortear()
+        indice.ocupar(*cel)
+        entidades.append(cel)
+    evitar = set(entidades)
+    t_varrendo = cronometrar(lambda: sortearVarrendo(mapa, evitar), 1)
+
+    def reposicionar():
+        for i in range(len(entidades)):
+            cel = indice.sortear()
+            indice.mover(entidades[i], cel)
+            entidades[i] = cel
+
+    t_indice = cronometrar(reposicionar) / len(entidades)
+    print(f"Sorteio de célula livre em mapa 1000x1000 ({len(indice)} livres):")
+    print(f"  montar índice:   {t_indice_novo * 1000:10.1f} ms (uma vez por mapa)")
+    print(f"  varrendo o mapa: {1 / t_varrendo:12.1f} sorteios/s")
+    print(f"  índice:          {1 / t_indice:12.0f} sorteios/s")
+
+
+# Passo original dos inimigos: um dicionário por inimigo, em Python puro.
+# Retorna os índices dos que alcançaram o jogador (sem reposicioná-los).
+def passoInimigosLinear(inimigos, mapa, jogador_x, jogador_z, dt):
+    altura, largura = len(mapa), len(mapa[0])
+
+    def livre(x, y):
+        return 0 <= x < largura and 0 <= y < altura and mapa[y][x] in (1, 2, 3)
+
+    alcancaram = []
+    for i, inimigo in enumerate(inimigos):
+        dx = jogador_x - inimigo['x']
+        dz = jogador_z - inimigo['z']
+        dist = (dx**2 + dz**2) ** 0.5
+        if dist < 0.7:
+            alcancaram.append(i)
+            continue
+        if dist > 0.01:
+            novo_x = inimigo['x'] + dx / dist * 20.0 * dt
+            novo_z = inimigo['z'] + dz / dist * 20.0 * dt
+            if livre(int(novo_x), int(novo_z)):
+                inimigo['x'] = novo_x
+                inimigo['z'] = novo_z
+            elif livre(int(novo_x), int(inimigo['z'])):
+                inimigo['x'] = novo_x
+            elif livre(int(inimigo['x']), int(novo_z)):
+                inimigo['z'] = novo_z
+    return alcancaram
+
+
+# Passos de perseguição com 10, 1 mil e 100 mil inimigos em um mapa 1000x1000
+def benchInimigos():
+    mapa, janelas, portas, objetos = mapaAleatorio(1000, 1000)
+    grade = GRADE.construirGrade(mapa, janelas, portas, objetos)
+    livres = npy.argwhere((grade & GRADE.PISO) != 0)
+    gerador = npy.random.default_rng(2)
+    jogador_x, jogador_z, dt = 500.5, 500.5, 0.02
+    print("Passo dos inimigos em mapa 1000x1000:")
+    for quantidade in (10, 1000, 100000):
+        celulas = livres[gerador.choice(len(livres), quantidade, replace=False)]
+        xs = celulas[:, 1] + gerador.uniform(0.05, 0.95, quantidade)
+        zs = celulas[:, 0] + gerador.uniform(0.05, 0.95, quantidade)
+        lista = [{'x': float(x), 'y': 0.0, 'z': float(z)} for x, z in zip(xs, zs)]
+        inimigos = Inimigos(xs, zs)
+        # A distância em Python ('** 0.5' via pow) pode diferir no último bit
+        # da raiz do numpy, então as posições são comparadas com tolerância
+        for _ in range(3):
+            esperado = passoInimigosLinear(lista, mapa, jogador_x, jogador_z, dt)
+            obtido = inimigos.atualizar(jogador_x, jogador_z, dt, grade)
+            if (esperado != obtido.tolist()
+                    or not npy.allclose([e['x'] for e in lista], inimigos.x, rtol=0.0, atol=1e-9)
+                    or not npy.allclose([e['z'] for e in lista], inimigos.z, rtol=0.0, atol=1e-9)):
+                print(f"  DIFERENÇA com {quantidade} inimigos")
+                break
+        t_lista = cronometrar(lambda: passoInimigosLinear(lista, mapa, jogador_x, jogador_z, dt), 1)
+        t_arrays = cronometrar(lambda: inimigos.atualizar(jogador_x, jogador_z, dt, grade))
+        print(f"  {quantidade:6d} inimigos: lista {t_lista * 1000:9.3f} ms  "
+              f"arrays {t_arrays * 1000:8.3f} ms  ({t_lista / t_arrays:.1f}x)")
+
+
+# Pares (i, j), i < j, a menos de 'distancia' um do outro, comparando todos
+def paresProximosTodos(xs, zs, distancia):
+    dx = xs[:, None] - xs[None, :]
+    dz = zs[:, None] - zs[None, :]
+    i, j = npy.nonzero(npy.triu((dx ** 2 + dz ** 2) ** 0.5 < distancia, 1))
+    return set(zip(i.tolist(), j.tolist()))
+
+
+def benchHash():
+    mapa, janelas, portas, objetos = mapaAleatorio(1000, 1000)
+    grade = GRADE.construirGrade(mapa, janelas, portas, objetos)
+    livres = npy.argwhere((grade & GRADE.PISO) != 0)
+    gerador = npy.random.default_rng(3)
+    jogador_x, jogador_z = 500.5, 500.5
+    espacial = HashEspacial(1000, 1000)
+    print("Contatos com baldes por célula em mapa 1000x1000:")
+    for quantidade in (1000, 100000):
+        celulas = livres[gerador.choice(len(livres), quantidade, replace=False)]
+        xs = celulas[:, 1] + gerador.uniform(0.05, 0.95, quantidade)
+        zs = celulas[:, 0] + gerador.uniform(0.05, 0.95, quantidade)
+        # Alguns em volta do jogador, para o teste de contato achar algo
+        xs[:20] = jogador_x + gerador.uniform(-1.5, 1.5, 20)
+        zs[:20] = jogador_z + gerador.uniform(-1.5, 1.5, 20)
+        inimigos = Inimigos(xs, zs)
+
+        def todos():
+            return npy.nonzero(((jogador_x - xs) ** 2 + (jogador_z - zs) ** 2) ** 0.5
+                               < Inimigos.DISTANCIA_CAPTURA)[0]
+
+        def pelosBaldes():
+            espacial.reconstruir(xs, zs)
+            return inimigos.alcancaramJogador(jogador_x, jogador_z, espacial.perto(jogador_x, jogador_z))
+
+        if todos().tolist() != pelosBaldes().tolist():
+            print(f"  DIFERENÇA no contato com {quantidade} entidades")
+        espacial.reconstruir(xs, zs)
+        t_todos = cronometrar(todos)
+        t_montar = cronometrar(lambda: espacial.reconstruir(xs, zs))
+        t_perto = cronometrar(lambda: inimigos.alcancaramJogador(jogador_x, jogador_z,
+                                                                 espacial.perto(jogador_x, jogador_z)))
+        print(f"  {quantidade:6d} entidades: contato testando todas {t_todos * 1000:7.3f} ms  "
+              f"montar baldes {t_montar * 1000:7.3f} ms  consulta 3x3 {t_perto * 1000:6.3f} ms")
+
+        a, b = espacial.pares()
+        dist = ((xs[a] - xs[b]) ** 2 + (zs[a] - zs[b]) ** 2) ** 0.5
+        perto = dist < Inimigos.DISTANCIA_SEPARACAO
+        proximos = set(zip(npy.minimum(a, b)[perto].tolist(), npy.maximum(a, b)[perto].tolist()))
+        if quantidade <= 1000 and proximos != paresProximosTodos(xs, zs, Inimigos.DISTANCIA_SEPARACAO):
+            print(f"  DIFERENÇA nos pares com {quantidade} entidades")
+        t_pares = cronometrar(espacial.pares)
+        t_separar = cronometrar(lambda: inimigos.separar(espacial, grade))
+        print(f"  {'':6s}            {len(a)} pares vizinhos ({len(proximos)} encostados): "
+              f"pares {t_pares * 1000:7.3f} ms  separar {t_separar * 1000:7.3f} ms")
+
+
+# Busca em largura de referência, uma célula por vez
+def distanciasBFS(livre, x0, y0):
+    altura, largura = livre.shape
+    distancia = npy.full(livre.shape, -1, dtype=npy.int64)
+    distancia[y0, x0] = 0
+    fila = collections.deque([(x0, y0)])
+    while fila:
+        x, y = fila.popleft()
+        for vx, vy in ((x, y - 1), (x, y + 1), (x - 1, y), (x + 1, y)):
+            if 0 <= vx < largura and 0 <= vy < altura and livre[vy, vx] and distancia[vy, vx] < 0:
+                distancia[vy, vx] = distancia[y, x] + 1
+                fila.append((vx, vy))
+    return distancia
+
+
+# Rótulos de referência: uma busca em largura por componente, célula a
+# célula, na ordem de leitura do mapa
+def componentesBFS(livre):
+    altura, largura = livre.shape
+    rotulos = npy.full(livre.shape, -1, dtype=npy.int64)
+    quantidade = 0
+    for y0, x0 in npy.argwhere(livre).tolist():
+        if rotulos[y0, x0] >= 0:
+            continue
+        rotulos[y0, x0] = quantidade
+        fila = collections.deque([(x0, y0)])
+        while fila:
+            x, y = fila.popleft()
+            for vx, vy in ((x, y - 1), (x, y + 1), (x - 1, y), (x + 1, y)):
+                if 0 <= vx < largura and 0 <= vy < altura and livre[vy, vx] and rotulos[vy, vx] < 0:
+                    rotulos[vy, vx] = quantidade
+                    fila.append((vx, vy))
+        quantidade += 1
+    return rotulos
+
+
+def benchComponentes():
+    mapa, janelas, portas, objetos = mapaAleatorio(1000, 1000, paredes=0.4)
+    grade = GRADE.construirGrade(mapa, janelas, portas, objetos)
+    livre = (grade & GRADE.BLOQUEIA_JOGADOR) == 0
+    print("Componentes conexos:")
+    inicio = time.perf_counter()
+    esperado = componentesBFS(livre)
+    t_bfs = time.perf_counter() - inicio
+    componentes = ComponentesConexos(livre)
+    if not npy.array_equal(esperado, componentes.rotulos):
+        print("  DIFERENÇA nos rótulos")
+    t_arrays = cronometrar(lambda: ComponentesConexos(livre))
+    print(f"  aleatório 1000x1000 ({componentes.quantidade} componentes, maior com "
+          f"{componentes.tamanhos.max()} células): busca célula a célula {t_bfs * 1000:8.1f} ms  "
+          f"trechos {t_arrays * 1000:6.1f} ms ({t_bfs / t_arrays:.0f}x)")
+    livre = mapaSalas(4096)
+    t_salas = cronometrar(lambda: ComponentesConexos(livre), 1)
+    componentes = ComponentesConexos(livre)
+    print(f"  salas 4096x4096 ({componentes.quantidade} componentes): trechos {t_salas * 1000:6.1f} ms")
+
+
+# Campo de distâncias em um mapa 256x256: cálculo inteiro e dividido em
+# quadros com 1 ms de orçamento cada
+def benchCampo():
+    mapa, janelas, portas, objetos = mapaAleatorio(256, 256)
+    livre = (GRADE.construirGrade(mapa, janelas, portas, objetos) & GRADE.PISO) != 0
+    campo = CampoFluxo(livre)
+    ys, xs = npy.nonzero(livre)
+    x0, y0 = int(xs[len(xs) // 2]), int(ys[len(ys) // 2])
+    campo.calcular(x0, y0)
+    obtido = npy.where(campo.grade() < 0, -1, campo.grade())
+    if not npy.array_equal(obtido, distanciasBFS(livre, x0, y0)):
+        print("  DIFERENÇA entre o campo e a busca de referência")
+    t_python = cronometrar(lambda: distanciasBFS(livre, x0, y0), 1)
+    t_inteiro = cronometrar(lambda: campo.calcular(x0, y0))
+
+    def emQuadros():
+        tempos = []
+        campo.origem = None
+        while True:
+            inicio = time.perf_counter()
+            pronto = campo.atualizar(x0, y0, orcamento=0.001)
+            tempos.append(time.perf_counter() - inicio)
+            if pronto:
+                return tempos
+
+    tempos = min((emQuadros() for _ in range(5)), key=max)
+    print(f"Campo de distâncias em mapa 256x256 ({int(obtido.max())} níveis):")
+    print(f"  busca em Python:      {t_python * 1000:8.2f} ms")
+    print(f"  busca por níveis:     {t_inteiro * 1000:8.2f} ms")
+    print(f"  em quadros de 1 ms:   {len(tempos)} quadros, pior quadro {max(tempos) * 1000:.2f} ms")
+
+
+# Gera um mapa de salas (paredes a cada 'periodo' células, com portas)
+# e obstáculos espalhados; retorna a grade booleana das células livres
+def mapaSalas(tamanho, semente=0, periodo=11, portas=0.12, obstaculos=0.08):
+    gerador = npy.random.default_rng(semente)
+    indices = npy.arange(tamanho)
+    parede = ((indices % periodo) == 0)[None, :] | ((indices % periodo) == 0)[:, None]
+    parede &= gerador.random((tamanho, tamanho)) >= portas
+    parede |= gerador.random((tamanho, tamanho)) < obstaculos
+    return ~parede
+
+
+# HPA* contra A* direto na grade, em mapas de salas de 1024x1024 e 4096x4096
+def benchHPA():
+    for tamanho, consultas_diretas in ((1024, 5), (4096, 2)):
+        livre = mapaSalas(tamanho)
+        inicio = time.perf_counter()
+        planejador = HPA.PlanejadorHPA(livre)
+        t_preparo = time.perf_counter() - inicio
+        gerador = npy.random.default_rng(3)
+        ys, xs = npy.nonzero(livre)
+        sorteio = gerador.choice(len(xs), (20, 2))
+        consultas = [((int(xs[a]), int(ys[a])), (int(xs[b]), int(ys[b]))) for a, b in sorteio]
+        inicio = time.perf_counter()
+        caminhos = [planejador.caminho(o, d) for o, d in consultas]
+        t_hpa = (time.perf_counter() - inicio) / len(consultas)
+        t_cache = cronometrar(lambda: [planejador.caminho(o, d) for o, d in consultas], 1) / len(consultas)
+        inicio = time.perf_counter()
+        diretos = [HPA.aEstrela(livre, o, d) for o, d in consultas[:consultas_diretas]]
+        t_direto = (time.perf_counter() - inicio) / consultas_diretas
+        razoes = [len(c) / len(r) for c, r in zip(caminhos, diretos) if c is not None and r is not None]
+        print(f"Caminhos em mapa de salas {tamanho}x{tamanho} ({len(planejador.no_x)} nós abstratos, "
+              f"{len(planejador.regiao_x)} regiões):")
+        print(f"  preparo HPA*:       {t_preparo:8.2f} s")
+        print(f"  A* direto:          {t_direto * 1000:8.1f} ms/consulta ({consultas_diretas} consultas)")
+        print(f"  HPA*:               {t_hpa * 1000:8.1f} ms/consulta")
+        print(f"  HPA* (em cache):    {t_cache * 1000:8.1f} ms/consulta")
+        if razoes:
+            print(f"  comprimento HPA*/A*: {max(razoes):.3f} no pior caso")
+
+
+# Labirinto perfeito (busca em profundidade aleatória) com corredores de
+# uma célula entre 'nos' x 'nos' encontros: True nas células livres
+def mapaCorredores(nos, semente=0):
+    gerador = random.Random(semente)
+    livre = npy.zeros((2 * nos + 1, 2 * nos + 1), dtype=bool)
+    livre[1, 1] = True
+    pilha = [(0, 0)]
+    while pilha:
+        x, z = pilha[-1]
+        vizinhos = [(x + dx, z + dz) for dx, dz in ((1, 0), (-1, 0), (0, 1), (0, -1))
+                    if 0 <= x + dx < nos and 0 <= z + dz < nos and not livre[2 * (z + dz) + 1, 2 * (x + dx) + 1]]
+        if not vizinhos:
+            pilha.pop()
+            continue
+        nx, nz = gerador.choice(vizinhos)
+        livre[z + nz + 1, x + nx + 1] = True
+        livre[2 * nz + 1, 2 * nx + 1] = True
+        pilha.append((nx, nz))
+    return livre
+
+
+# Retangulos de celulas [x0, x1) x [z0, z1) cobertos pelos quadrados das
+# paredes e do piso do mapa, com o bloco de cada um
+def quadradosDoMapa(livre):
+    altura, largura = livre.shape
+    _, (x0, z0, larguras, profundidades) = MALHA.gerarMalhaParedesComRetangulos(livre.astype(int), 2.7)
+    zs, xs = npy.nonzero(livre)
+    x0, z0 = npy.concatenate([x0, xs]), npy.concatenate([z0, zs])
+    x1 = x0 + npy.concatenate([larguras, npy.ones_like(xs)])
+    z1 = z0 + npy.concatenate([profundidades, npy.ones_like(zs)])
+    # Como em BlocosLabirinto.adicionarMalha, cada quadrado fica no bloco do seu centro
+    bloco_quadrado = BLOCOS.BlocosLabirinto(largura, altura).blocosDosPontos((x0 + x1) / 2, (z0 + z1) / 2,
+                                                                            limitar=True)
+    return x0, z0, x1, z1, bloco_quadrado
+
+
+# PVS: tempo do cálculo e do cache e quantos quadrados do piso e das
+# paredes são desenhados em primeira pessoa só com os blocos no frustum e
+# com os blocos e o PVS juntos
+def benchPVS():
+    projecao = matrizPerspectiva(45, 1240 / 800, 5.0, 2000.0)
+    for nome, livre in (("corredores 65x65", mapaCorredores(32)), ("salas 64x64", mapaSalas(64))):
+        altura, largura = livre.shape
+        inicio = time.perf_counter()
+        with tempfile.TemporaryDirectory() as pasta:
+            arquivo = os.path.join(pasta, "mapa.pvs.npz")
+            pvs = PVSLabirinto.carregar(~livre, arquivo)
+            t_calculo = time.perf_counter() - inicio
+            t_cache = cronometrar(lambda: PVSLabirinto.carregar(~livre, arquivo), 3)
+        x0, z0, x1, z1, bloco_quadrado = quadradosDoMapa(livre)
+        zs, xs = npy.nonzero(livre)
+        blocos = BLOCOS.BlocosLabirinto(largura, altura, 2.7)
+        gerador = npy.random.default_rng(6)
+        so_blocos, com_pvs, tempos = [], [], []
+        for indice in gerador.choice(len(xs), 100):
+            x, z = xs[indice] + gerador.uniform(0.2, 0.8), zs[indice] + gerador.uniform(0.2, 0.8)
+            angulo = gerador.uniform(0, 360)
+            olho = npy.array([x, 2.35, z])
+            alvo = olho + [npy.sin(npy.radians(angulo)) * 5, 0.0, npy.cos(npy.radians(angulo)) * 5]
+            blocos.atualizarVisiveis(BLOCOS.planosDoFrustum(projecao, matrizOlhar(olho, alvo, [0.0, 1.0, 0.0])))
+            inicio = time.perf_counter()
+            celulas = CelulasVisiveis(pvs.mascara(*celulasDaCamera(x, z, angulo, 5.0, 45, 1240 / 800)), 0, 0,
+                                      largura, altura)
+            tempos.append(time.perf_counter() - inicio)
+            so_blocos.append(npy.count_nonzero(blocos.visiveis[bloco_quadrado]))
+            com_pvs.append(npy.count_nonzero(blocos.visiveis[bloco_quadrado] &
+                                             celulas.retangulosMarcados(x0, z0, x1, z1)))
+        total = len(x0)
+        print(f"PVS em mapa de {nome} ({int(livre.sum())} células livres):")
+        print(f"  cálculo: {t_calculo:.2f} s com {os.cpu_count()} processo(s), leitura do cache: {t_cache * 1000:.1f} ms, "
+              f"{npy.diff(pvs.inicio)[livre.reshape(-1)].mean():.0f} células vistas por célula livre")
+        print(f"  quadrados desenhados (de {total}): só blocos {npy.mean(so_blocos):.0f} "
+              f"({npy.mean(so_blocos) / total:.1%}), blocos e PVS {npy.mean(com_pvs):.0f} "
+              f"({npy.mean(com_pvs) / total:.1%}), máscara por quadro {npy.mean(tempos) * 1000:.3f} ms")
+
+
+# Leque de raios da camera (em uma tela de 1240 pixels) no lugar do PVS:
+# tempo por quadro (raios e folga de uma célula, que só tocam a janela do
+# mapa alcançada) e quadrados desenhados; no mapa do jogo, confere se a
+# média cabe no orçamento de 1 ms
+def benchRaios():
+    projecao = matrizPerspectiva(45, 1240 / 800, 5.0, 2000.0)
+    opaco = opacoDoMapa(os.path.join(DIRETORIO, "mapa_labirinto_texturas.txt"))
+    jogo = f"do jogo {opaco.shape[1]}x{opaco.shape[0]}"
+    medias = {}
+    for nome, livre in ((jogo, ~opaco), ("corredores 65x65", mapaCorredores(32)), ("salas 64x64", mapaSalas(64)),
+                        ("aleatório 256x256", MALHA.mapaParaArray(mapaAleatorio(256, 256, 7)[0]) != 0),
+                        ("aleatório 1024x1024", MALHA.mapaParaArray(mapaAleatorio(1024, 1024, 7)[0]) != 0)):
+        altura, largura = livre.shape
+        raios = RaiosLabirinto(~livre)
+        x0, z0, x1, z1, bloco_quadrado = quadradosDoMapa(livre)
+        blocos = BLOCOS.BlocosLabirinto(largura, altura, 2.7)
+        zs, xs = npy.nonzero(livre)
+        gerador = npy.random.default_rng(6)
+        so_blocos, com_raios, tempos, vistas = [], [], [], []
+        for indice in gerador.choice(len(xs), 100):
+            x, z = xs[indice] + gerador.uniform(0.2, 0.8), zs[indice] + gerador.uniform(0.2, 0.8)
+            angulo = gerador.uniform(0, 360)
+            olho = npy.array([x, 2.35, z])
+            alvo = olho + [npy.sin(npy.radians(angulo)) * 5, 0.0, npy.cos(npy.radians(angulo)) * 5]
+            blocos.atualizarVisiveis(BLOCOS.planosDoFrustum(projecao, matrizOlhar(olho, alvo, [0.0, 1.0, 0.0])))
+            inicio = time.perf_counter()
+            celulas = raios.celulasVistas(x, z, angulo, 5.0, 45, 1240 / 800, 1240)
+            aumentadas = celulas.aumentadas()
+            tempos.append(time.perf_counter() - inicio)
+            vistas.append(celulas.quantidade())
+            so_blocos.append(npy.count_nonzero(blocos.visiveis[bloco_quadrado]))
+            com_raios.append(npy.count_nonzero(blocos.visiveis[bloco_quadrado] &
+                                               aumentadas.retangulosMarcados(x0, z0, x1, z1)))
+        total = len(x0)
+        medias[nome] = npy.mean(tempos)
+        print(f"Raios da câmera em mapa {'de ' * (nome != jogo)}{nome} ({min(1240, raios.raios)} raios, "
+              f"{npy.mean(vistas):.0f} células vistas):")
+        print(f"  raios por quadro: média {npy.mean(tempos) * 1000:.3f} ms, pior {npy.max(tempos) * 1000:.3f} ms; "
+              f"quadrados desenhados (de {total}): só blocos {npy.mean(so_blocos) / total:.1%}, "
+              f"blocos e raios {npy.mean(com_raios) / total:.1%}")
+    print(f"Orçamento de 1 ms por quadro no mapa {jogo}: média {medias[jogo] * 1000:.3f} ms, "
+          f"{'OK' if medias[jogo] < 0.001 else 'ESTOUROU'}")
+
+
+MEDICOES = {
+    'tri': benchTRI,
+    'lod': benchLOD,
+    'pacote': benchPacote,
+    'colisao': benchColisao,
+    'celulas': benchCelulas,
+    'inimigos': benchInimigos,
+    'campo': benchCampo,
+    'hpa': benchHPA,
+    'hash': benchHash,
+    'componentes': benchComponentes,
+    'varredura': benchVarredura,
+    'blocos': benchBlocos,
+    'pvs': benchPVS,
+    'raios': benchRaios,
+}
+
+
+def main():
+    nomes = sys.argv[1:] or list(MEDICOES)
+    for nome in nomes:
+        if nome not in MEDICOES:
+            print(f"Medição desconhecida: {nome} (opções: {', '.join(MEDICOES)})")
+            continue
+        MEDICOES[nome]()
+        print()
+
+
+if __name__ == "__main__":
+    main()
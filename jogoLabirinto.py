@@ -4,9 +4,22 @@ from OpenGL.GLUT import *
 import time
 import math
 import numpy as npy
-from PIL import Image
 import os
-import random
+from concurrent.futures import ThreadPoolExecutor
+import MalhaLabirinto as MALHA
+import AtlasTexturas as ATLAS
+import ModelosTRI as TRI
+import GradeLabirinto as GRADE
+from CelulasLivres import IndiceCelulasLivres
+from ComponentesLabirinto import ComponentesConexos, FORA
+from InimigosLabirinto import Inimigos
+from CampoFluxo import CampoFluxo
+from PlanejadorHPA import PlanejadorHPA
+from HashEspacial import HashEspacial
+from MalhaGL import MalhaGL
+from InstanciasGL import MalhaInstanciada
+import BlocosLabirinto as BLOCOS
+from VisibilidadeLabirinto import PVSLabirinto, RaiosLabirinto, CelulasVisiveis, LIMITE_CELULAS, celulasDaCamera
 
 class Labirinto3D:
     def __init__(self, largura=1240, altura=800):
@@ -27,18 +40,48 @@ class Labirinto3D:
 
         # Estado do mundo e objetos
         self.TAMANHO_CELULA = 1.0
+        self.ALTURA_PAREDE = 2.7
         self.mapa = []
         self.mapa_largura = 0
         self.mapa_altura = 0
+        self.grade = None
+        self.celulas_livres = None
+        self.componentes = None
+        self.campo_fluxo = None
+        self.planejador = None
+        self.hash_inimigos = HashEspacial(1, 1)
+        self.hash_capsulas = HashEspacial(1, 1)
         self.janelas = []
         self.portas = []
-        self.inimigos = []
+        self.inimigos = Inimigos()
         self.objetos_estaticos = []
         self.capsulas = []
         self.modelos_tri = {}  
+        self.malhas_tri = {}        # nome -> uma malha por nível de detalhe
+        self.malhas_tri_cores = {}  # nome -> as mesmas, com uma cor por nível
         self.objetos_tri = []  
-        self.texturas_piso = {}  
+        self.textura_piso = None
+        self.uvs_piso = {}
         self.mapa_tipos_piso = []  
+        # Piso e paredes divididos em blocos testados contra a câmera
+        self.blocos = BLOCOS.BlocosLabirinto(0, 0)
+        # Células visíveis de cada célula (PVS) e leque de raios da câmera
+        # para a primeira pessoa, com piso e paredes separados por célula.
+        # O modo ('pvs', 'raios' ou 'blocos', só o frustum) troca com a tecla 4
+        self.pvs = None
+        self.raios = None
+        self.modo_visibilidade = 'pvs'
+        self.celulas_visiveis = None
+        self.tempo_visibilidade = 0.0
+        # O boneco é uma malha só, e as esferas de inimigos e cápsulas são
+        # malhas desenhadas por instâncias
+        self.malha_jogador = None
+        self.malha_inimigo = None
+        self.malha_capsula = None
+        self.instancias_tri = None
+        self.tri_dentro_celulas = {}
+        self.cores_cantos_piso = {}
+        self.tom_paredes = (1.0, 1.0, 1.0)
         self.nomes_texturas = {
             0: 'CROSS.png',
             1: 'DL.png',
@@ -58,6 +101,7 @@ class Labirinto3D:
         self.energia = 100.0
         self.pontos = 0
         self.posicao_jogador = npy.array([0.5, 0.85, 0.5], dtype=float)
+        self.raio_jogador = 0.2
 
         # Escalas dos modelos 3D
         self.escalas_modelos = {
@@ -66,21 +110,14 @@ class Labirinto3D:
             'street_oil_light': 0.01 , "tent_a": 0.005
         }
 
-        # Carrega modelos 3D
-        self.carregarModeloTRI('TRI/barrel.tri', 'barrel')
-        self.carregarModeloTRI('TRI/well.tri', 'well')
-        self.carregarModeloTRI('TRI/dead_tree_d.tri', 'dead_tree_d')
-        self.carregarModeloTRI('TRI/pine_c.tri', 'pine_c')
-        self.carregarModeloTRI('TRI/fountain_b.tri', 'fountain_b')
-        self.carregarModeloTRI('TRI/fire_cage.tri', 'fire_cage')
-        self.carregarModeloTRI('TRI/box.tri', 'box')
-        self.carregarModeloTRI('TRI/fence.tri', 'fence')
-        self.carregarModeloTRI('TRI/street_oil_light.tri', 'street_oil_light')
-        self.carregarModeloTRI('TRI/tent_a.tri', 'tent_a')
-
-        # Carrega mapa e texturas
-        self.carregarMapa("mapa_labirinto_texturas.txt")
-        self.carregarTexturasPiso()
+        # Modelos 3D: carregados sob demanda, só os que o mapa usa
+        # (do pacote binário quando ele estiver atualizado)
+        self.diretorio_modelos = 'TRI'
+        self.pacote_modelos = self.abrirPacoteModelos(os.path.join(self.diretorio_modelos, 'modelos.pak'))
+
+        # Carrega mapa, texturas e modelos
+        self.preCarregarAssets("mapa_labirinto_texturas.txt")
+        self.construirMalhaJogador()
         
         # Instancia elementos dinâmicos
         self.instanciarInimigos(10)
@@ -92,6 +129,16 @@ class Labirinto3D:
         self.espaco_pressionado = False
         self.modo_camera = 1
         self.alvo_camera = 1
+        self.campo_visao = 45.0
+        self.plano_perto = 5.0
+        self.plano_longe = 2000.0
+        self.posicao_camera = npy.zeros(3)
+        # Níveis de detalhe dos modelos TRI: distância da câmera a partir da
+        # qual cada nível simplificado é usado. Com 'cores_lod' (tecla 5)
+        # cada nível é desenhado com uma cor, para conferir as trocas
+        self.distancias_lod = (20.0, 45.0)
+        self.cores_lod = False
+        self.objetos_por_nivel = []
 
         # Configura callbacks GLUT
         glutDisplayFunc(self.loopPrincipal)
@@ -120,6 +167,11 @@ class Labirinto3D:
             self.modo_camera = 1
         elif key == b'3':
             self.alvo_camera = (self.alvo_camera + 1) % 2
+        elif key == b'4':
+            modos = ('pvs', 'raios', 'blocos')
+            self.modo_visibilidade = modos[(modos.index(self.modo_visibilidade) + 1) % len(modos)]
+        elif key == b'5':
+            self.cores_lod = not self.cores_lod
 
     # Lida com soltar de teclas normais
     def teclaNormalSolta(self, key, x, y):
@@ -145,7 +197,9 @@ class Labirinto3D:
     def verificarCapturaCapsulas(self):
         jogador_x = self.posicao_jogador[0]
         jogador_z = self.posicao_jogador[2]
-        for i in range(len(self.capsulas) - 1, -1, -1):
+        # Só as cápsulas nas 3x3 células em volta do jogador podem estar a
+        # distância <= 1 dele
+        for i in self.hash_capsulas.perto(jogador_x, jogador_z)[::-1]:
             cap = self.capsulas[i]
             dx = jogador_x - cap["x"]
             dz = jogador_z - cap["z"]
@@ -158,154 +212,229 @@ class Labirinto3D:
 
     # Posiciona inimigos em células livres
     def instanciarInimigos(self, quantidade):
-        self.inimigos = []
-        livres = []
-        jogador_cel = (int(self.posicao_jogador[0]), int(self.posicao_jogador[2]))
-        for y in range(self.mapa_altura):
-            for x in range(self.mapa_largura):
-                if self.livre(x, y) and (x, y) != jogador_cel:
-                    livres.append((x, y))
-        caps = set((int(c['x']), int(c['z'])) for c in self.capsulas)
-        livres = [p for p in livres if p not in caps]
-        random.shuffle(livres)
+        for x, y in self.inimigos.celulas():
+            self.celulas_livres.liberar(int(x), int(y))
+        celulas = []
         for i in range(quantidade):
-            if i < len(livres):
-                pos = livres[i]
-                self.inimigos.append({
-                    'x': pos[0] + 0.5,
-                    'y': 0.0,
-                    'z': pos[1] + 0.5
-                })
-
-    # Seleciona uma célula livre aleatória
-    def escolherCelulaLivreAleatoria(self, avoid_positions=None):
-            livres = []
-            for y in range(self.mapa_altura):
-                for x in range(self.mapa_largura):
-                    if self.livre(x, y):
-                        if avoid_positions and (x, y) in avoid_positions:
-                            continue
-                        livres.append((x, y))
-            if not livres:
-                return None
-            return random.choice(livres)
+            cel = self.escolherCelulaLivreAleatoria()
+            if cel is None:
+                break
+            self.celulas_livres.ocupar(*cel)
+            celulas.append(cel)
+        self.inimigos.definir([x + 0.5 for x, _ in celulas], [y + 0.5 for _, y in celulas])
+
+    # Célula (x, y) do mapa em que está uma entidade
+    def celulaDe(self, entidade):
+        return (int(entidade['x']), int(entidade['z']))
+
+    # Célula (x, y) do mapa em que está o jogador
+    def celulaJogador(self):
+        return (int(self.posicao_jogador[0]), int(self.posicao_jogador[2]))
+
+    # Seleciona uma célula livre aleatória (sem jogador, inimigo ou cápsula)
+    def escolherCelulaLivreAleatoria(self):
+        return self.celulas_livres.sortear()
 
     # Posiciona cápsulas
     def instanciarCapsulas(self, quantidade):
         while len(self.capsulas) < quantidade:
-            avoid = set()
-            jogador_cel = (int(self.posicao_jogador[0]), int(self.posicao_jogador[2]))
-            avoid.add(jogador_cel)
-            for c in self.capsulas:
-                avoid.add((int(c['x']), int(c['z'])))
-            for inim in self.inimigos:
-                avoid.add((int(inim['x']), int(inim['z'])))
-            cel = self.escolherCelulaLivreAleatoria(avoid_positions=avoid)
+            cel = self.escolherCelulaLivreAleatoria()
             if cel is None:
                 break
+            self.celulas_livres.ocupar(*cel)
             self.capsulas.append({
                 'x': cel[0] + 0.5,
                 'y': 0.0,
                 'z': cel[1] + 0.5
             })
+        self.atualizarHashCapsulas()
+
+    # Refaz os baldes por célula das cápsulas
+    def atualizarHashCapsulas(self):
+        self.hash_capsulas.reconstruir([cap['x'] for cap in self.capsulas],
+                                       [cap['z'] for cap in self.capsulas])
 
-    # Carrega as texturas do piso
-    def carregarTexturasPiso(self):
+    # Lê as imagens do piso e monta o atlas (não usa OpenGL)
+    def decodificarTexturasPiso(self):
         caminho_texturas = os.path.join(os.path.dirname(__file__), "TexturaAsfalto")
-        for tipo_id, nome_arquivo in self.nomes_texturas.items():
-            caminho_completo = os.path.join(caminho_texturas, nome_arquivo)
-            if not os.path.exists(caminho_completo):
-                continue
-            img = Image.open(caminho_completo).convert("RGBA")
-            img_data = img.tobytes()
-            textura_id = glGenTextures(1)
-            glBindTexture(GL_TEXTURE_2D, textura_id)
-            glTexParameteri(GL_TEXTURE_2D, GL_TEXTURE_WRAP_S, GL_REPEAT)
-            glTexParameteri(GL_TEXTURE_2D, GL_TEXTURE_WRAP_T, GL_REPEAT)
-            glTexParameteri(GL_TEXTURE_2D, GL_TEXTURE_MIN_FILTER, GL_LINEAR)
-            glTexParameteri(GL_TEXTURE_2D, GL_TEXTURE_MAG_FILTER, GL_LINEAR)
-            glTexImage2D(GL_TEXTURE_2D, 0, GL_RGBA, img.width, img.height, 0, GL_RGBA, GL_UNSIGNED_BYTE, img_data)
-            self.texturas_piso[tipo_id] = textura_id
-
-    # Verifica se a posição é passável
-    def ehPassavel(self, pos_x, pos_z):
-        if int(pos_x) < 0 or int(pos_x) >= self.mapa_largura or int(pos_z) < 0 or int(pos_z) >= self.mapa_altura:
-            return False        
-        return self.livre(int(pos_x), int(pos_z))
+        caminhos = {tipo_id: os.path.join(caminho_texturas, nome_arquivo)
+                    for tipo_id, nome_arquivo in self.nomes_texturas.items()}
+        return ATLAS.carregarAtlas(caminhos, os.path.join(caminho_texturas, "atlas_cache.png"))
+
+    # Envia o atlas do piso para a placa de vídeo
+    def enviarTexturasPiso(self, img, uvs):
+        self.uvs_piso = uvs
+        img_data = img.tobytes()
+        textura_id = glGenTextures(1)
+        glBindTexture(GL_TEXTURE_2D, textura_id)
+        glTexParameteri(GL_TEXTURE_2D, GL_TEXTURE_WRAP_S, GL_CLAMP_TO_EDGE)
+        glTexParameteri(GL_TEXTURE_2D, GL_TEXTURE_WRAP_T, GL_CLAMP_TO_EDGE)
+        glTexParameteri(GL_TEXTURE_2D, GL_TEXTURE_MIN_FILTER, GL_LINEAR)
+        glTexParameteri(GL_TEXTURE_2D, GL_TEXTURE_MAG_FILTER, GL_LINEAR)
+        glTexImage2D(GL_TEXTURE_2D, 0, GL_RGBA, img.width, img.height, 0, GL_RGBA, GL_UNSIGNED_BYTE, img_data)
+        self.textura_piso = textura_id
+        self.cores_cantos_piso = ATLAS.corCantosLadrilhos(img, self.uvs_piso)
+
+    # Executa uma etapa de carga e registra o tempo gasto
+    def medirAsset(self, nome, funcao, *args):
+        inicio = time.perf_counter()
+        resultado = funcao(*args)
+        self.tempos_assets.append((nome, time.perf_counter() - inicio))
+        return resultado
+
+    # Carrega mapa, texturas e modelos. A leitura das imagens e dos modelos
+    # roda em paralelo em um pool de threads; só o envio para a placa de
+    # vídeo acontece aqui, na thread do OpenGL.
+    def preCarregarAssets(self, arquivo_mapa):
+        self.tempos_assets = []
+        inicio = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=os.cpu_count() or 4) as executor:
+            atlas = executor.submit(self.medirAsset, "atlas do piso", self.decodificarTexturasPiso)
+            self.medirAsset("mapa e modelos", self.carregarMapa, arquivo_mapa, executor)
+            self.medirAsset("envio do atlas", self.enviarTexturasPiso, *atlas.result())
+        for nome, modelo in self.modelos_tri.items():
+            if modelo is not None:
+                self.medirAsset(f"níveis e envio de {nome}", self.malhasModeloTRI, nome)
+        for nome, tempo in self.tempos_assets:
+            print(f"  {nome}: {tempo * 1000:.1f} ms")
+        print(f"Assets carregados em {(time.perf_counter() - inicio) * 1000:.1f} ms")
+
+    # Abre o pacote binário de modelos (gerado com 'python ModelosTRI.py')
+    def abrirPacoteModelos(self, caminho_pacote):
+        if not os.path.exists(caminho_pacote):
+            return None
+        try:
+            return TRI.PacoteModelos(caminho_pacote)
+        except (OSError, ValueError) as e:
+            print(f"Pacote de modelos ignorado: {e}")
+            return None
+
+    # Lê um modelo TRI do pacote ou do arquivo texto (não usa OpenGL).
+    # Retorna (modelo, origem) ou None se o arquivo não existir.
+    def lerModeloTRI(self, caminho_arquivo):
+        nome_pacote = os.path.splitext(os.path.basename(caminho_arquivo))[0]
+        if self.pacote_modelos is not None and self.pacote_modelos.atualizado(nome_pacote, caminho_arquivo):
+            return self.pacote_modelos.modelo(nome_pacote), "pacote"
+        if os.path.exists(caminho_arquivo):
+            return TRI.lerArquivoTRI(caminho_arquivo), "texto"
+        return None
+
+    # Guarda o modelo lido no cache de modelos
+    def registrarModeloTRI(self, nome_modelo, lido):
+        for malhas in (self.malhas_tri, self.malhas_tri_cores):
+            for malha in malhas.pop(nome_modelo, ()):
+                malha.liberar()
+        if lido is None:
+            self.modelos_tri[nome_modelo] = None
+            return False
+        modelo, origem = lido
+        self.modelos_tri[nome_modelo] = modelo
+        print(f"Modelo {nome_modelo} ({origem}): {len(modelo)} triângulos, "
+              f"{modelo.memoria() / 1024:.1f} KB em arrays, {modelo.memoriaVBO() / 1024:.1f} KB no VBO")
+        return True
 
     # Carrega modelo TRI
     def carregarModeloTRI(self, caminho_arquivo, nome_modelo):
         try:
-            if not os.path.exists(caminho_arquivo):
-                return False
-            triangulos = []
-            with open(caminho_arquivo, 'r') as f:
-                for linha in f:
-                    linha = linha.strip()
-                    if not linha:
-                        continue
-                    partes = linha.split()
-                    if len(partes) < 10:
-                        continue
-                    try:
-                        v1 = [float(partes[0]), float(partes[1]), float(partes[2])]
-                        v2 = [float(partes[3]), float(partes[4]), float(partes[5])]
-                        v3 = [float(partes[6]), float(partes[7]), float(partes[8])]
-                        cor_hex = partes[9] if len(partes) > 9 else "0xFFFFFF"
-                        cor_int = int(cor_hex, 16)
-                        r = ((cor_int >> 16) & 0xFF) / 255.0
-                        g = ((cor_int >> 8) & 0xFF) / 255.0
-                        b = (cor_int & 0xFF) / 255.0
-                        cor = [r, g, b]
-                        triangulos.append({
-                            'v1': v1, 'v2': v2, 'v3': v3, 'cor': cor
-                        })
-                    except:
-                        continue
-            self.modelos_tri[nome_modelo] = triangulos
-            return True
+            return self.registrarModeloTRI(nome_modelo, self.lerModeloTRI(caminho_arquivo))
         except Exception as e:
             print(f"Falha ao carregar modelo TRI: {e}")
             return False
 
-    # Reposiciona cápsula coletada
-    def reposicionarCapsula(self, indice):
-        avoid = set()
-        jogador_cel = (int(self.posicao_jogador[0]), int(self.posicao_jogador[2]))
-        avoid.add(jogador_cel)
-        for c in self.capsulas:
-            avoid.add((int(c['x']), int(c['z'])))
-        for inim in self.inimigos:
-            avoid.add((int(inim['x']), int(inim['z'])))
-        cel = self.escolherCelulaLivreAleatoria(avoid_positions=avoid)
+    # Caminho do arquivo .tri de um modelo
+    def caminhoModeloTRI(self, nome_modelo):
+        return os.path.join(self.diretorio_modelos, f"{nome_modelo}.tri")
+
+    # Retorna o modelo TRI pelo nome, carregando de TRI/<nome>.tri na primeira vez
+    def obterModeloTRI(self, nome_modelo):
+        if nome_modelo not in self.modelos_tri:
+            self.carregarModeloTRI(self.caminhoModeloTRI(nome_modelo), nome_modelo)
+        return self.modelos_tri.get(nome_modelo)
+
+    # Retorna os VBOs dos níveis de detalhe de um modelo (do original ao
+    # mais simples), simplificando e enviando para a placa de vídeo na
+    # primeira vez. Níveis repetidos usam a mesma malha
+    def malhasModeloTRI(self, nome_modelo):
+        malhas = self.malhas_tri.get(nome_modelo)
+        if malhas is None:
+            niveis = self.modelos_tri[nome_modelo].niveisDeDetalhe()
+            enviadas = {}
+            for nivel in niveis:
+                if id(nivel) not in enviadas:
+                    enviadas[id(nivel)] = MalhaInstanciada(nivel.verticesIntercalados(), GL_TRIANGLES, GL_C3F_V3F)
+            malhas = [enviadas[id(nivel)] for nivel in niveis]
+            self.malhas_tri[nome_modelo] = malhas
+            print(f"Níveis de {nome_modelo}: " + "/".join(str(len(nivel)) for nivel in niveis) + " triângulos")
+        return malhas
+
+    # Cópias das malhas de um modelo com todos os triângulos da cor do seu
+    # nível (verde, amarelo e vermelho, do mais detalhado ao mais simples)
+    def malhasCoresLOD(self, nome_modelo):
+        malhas = self.malhas_tri_cores.get(nome_modelo)
+        if malhas is None:
+            cores = ((0.0, 1.0, 0.0), (1.0, 1.0, 0.0), (1.0, 0.0, 0.0))
+            niveis = self.modelos_tri[nome_modelo].niveisDeDetalhe()
+            malhas = [MalhaInstanciada(nivel.comCor(cores[min(i, len(cores) - 1)]).verticesIntercalados(),
+                                       GL_TRIANGLES, GL_C3F_V3F) for i, nivel in enumerate(niveis)]
+            self.malhas_tri_cores[nome_modelo] = malhas
+        return malhas
+
+    # Carrega apenas os modelos referenciados pelos objetos estáticos do mapa.
+    # Com um executor, os arquivos são lidos em paralelo.
+    def carregarModelosDoMapa(self, executor=None):
+        nomes = sorted(set(obj['tipo'] for obj in self.objetos_estaticos if obj['tipo']))
+        pendentes = [nome for nome in nomes if nome not in self.modelos_tri]
+        if executor is not None:
+            leituras = {nome: executor.submit(self.medirAsset, f"modelo {nome}", self.lerModeloTRI,
+                                              self.caminhoModeloTRI(nome)) for nome in pendentes}
+            for nome in pendentes:
+                try:
+                    self.registrarModeloTRI(nome, leituras[nome].result())
+                except Exception as e:
+                    print(f"Falha ao carregar modelo TRI: {e}")
+        for nome in nomes:
+            if self.obterModeloTRI(nome) is None:
+                print(f"Modelo {nome} não encontrado em {self.diretorio_modelos}")
+        print(f"Modelos usados pelo mapa: {len(nomes)}")
+
+    # Move uma entidade para o centro de uma célula livre sorteada
+    def reposicionarEntidade(self, entidade):
+        cel = self.escolherCelulaLivreAleatoria()
         if cel is None:
             return
-        self.capsulas[indice]['x'] = cel[0] + 0.5
-        self.capsulas[indice]['z'] = cel[1] + 0.5
-
-    # Reposiciona inimigo após colisão
-    def reposicionarInimigoAleatorio(self, inimigo):
-        avoid = set()
-        jogador_cel = (int(self.posicao_jogador[0]), int(self.posicao_jogador[2]))
-        avoid.add(jogador_cel)
-        for c in self.capsulas:
-            avoid.add((int(c['x']), int(c['z'])))
-        for inim in self.inimigos:
-            avoid.add((int(inim['x']), int(inim['z'])))
-        cel = self.escolherCelulaLivreAleatoria(avoid_positions=avoid)
+        self.celulas_livres.mover(self.celulaDe(entidade), cel)
+        entidade['x'] = cel[0] + 0.5
+        entidade['z'] = cel[1] + 0.5
+
+    # Reposiciona cápsula coletada
+    def reposicionarCapsula(self, indice):
+        self.reposicionarEntidade(self.capsulas[indice])
+        self.atualizarHashCapsulas()
+
+    # Reposiciona o inimigo 'indice' após colisão
+    def reposicionarInimigoAleatorio(self, indice):
+        cel = self.escolherCelulaLivreAleatoria()
         if cel is None:
             return
-        inimigo['x'] = cel[0] + 0.5
-        inimigo['z'] = cel[1] + 0.5
+        anterior = (int(self.inimigos.x[indice]), int(self.inimigos.z[indice]))
+        self.celulas_livres.mover(anterior, cel)
+        self.inimigos.x[indice] = cel[0] + 0.5
+        self.inimigos.z[indice] = cel[1] + 0.5
 
     # Carrega a estrutura do mapa
-    def carregarMapa(self, nome_arquivo):
+    def carregarMapa(self, nome_arquivo, executor=None):
         try:
             with open(nome_arquivo, 'r', encoding="utf-8") as f:
                 linhas = f.readlines()
             largura, altura = map(int, linhas[0].split())
             self.mapa_largura = largura
             self.mapa_altura = altura
+            self.mapa = []
+            self.mapa_tipos_piso = []
+            self.janelas = []
+            self.portas = []
+            self.objetos_estaticos = []
+            self.capsulas = []
             def normalizar(linha):
                 linha = linha.replace("\t", " ")
                 while "  " in linha:
@@ -359,15 +488,86 @@ class Labirinto3D:
 
                 self.mapa.append(linha_mapa)
                 self.mapa_tipos_piso.append(linha_texturas)
+            self.grade = GRADE.construirGrade(self.mapa, self.janelas, self.portas, self.objetos_estaticos)
+            self.inimigos = Inimigos()
+            self.atualizarComponentes()
+            self.hash_inimigos = HashEspacial(self.mapa_largura, self.mapa_altura)
+            self.hash_capsulas = HashEspacial(self.mapa_largura, self.mapa_altura)
+            self.atualizarHashCapsulas()
+            self.campo_fluxo = CampoFluxo((self.grade & GRADE.PISO) != 0)
+            self.campo_fluxo.calcular(*self.celulaJogador())
+            self.planejador = PlanejadorHPA((self.grade & GRADE.PISO) != 0)
+            self.carregarPVS(nome_arquivo)
             print(f"Mapa carregado: {self.mapa_largura}x{self.mapa_altura}")
+            total, visiveis, agrupadas = MALHA.contarFacesParedes(self.mapa)
+            print(f"Malha de paredes: {total} faces -> {visiveis} visíveis -> {agrupadas} agrupadas")
             self.converterTRI()
+            self.carregarModelosDoMapa(executor)
+            self.invalidarMalhas()
         except Exception as e:
             print(f"Erro ao carregar mapa: {e}")
             raise
 
+    # Prepara a grade do leque de raios e lê do cache ao lado do mapa as
+    # células visíveis de cada célula (só as paredes tapam a visão). O cache
+    # é gerado fora do jogo; sem ele, a primeira pessoa usa os raios
+    def carregarPVS(self, nome_arquivo):
+        inicio = time.perf_counter()
+        opaco = MALHA.mapaParaArray(self.mapa) == 0
+        self.raios = RaiosLabirinto(opaco)
+        self.pvs = PVSLabirinto.ler(opaco, nome_arquivo + ".pvs.npz")
+        if self.pvs is not None:
+            print(f"PVS: {len(self.pvs.celulas)} pares de células visíveis "
+                  f"({(time.perf_counter() - inicio) * 1000:.1f} ms)")
+        elif opaco.size <= LIMITE_CELULAS:
+            print(f"PVS: cache ausente ou de outro mapa, usando os raios da câmera "
+                  f"(gere com: python VisibilidadeLabirinto.py {nome_arquivo})")
+
+    # Descarta a geometria estática (reconstruída no próximo desenho)
+    def invalidarMalhas(self):
+        self.blocos.liberar()
+        self.blocos = BLOCOS.BlocosLabirinto(self.mapa_largura, self.mapa_altura, self.ALTURA_PAREDE)
+
+    # Monta piso e paredes de cada bloco e inclui os objetos TRI nas caixas
+    # dos blocos (o piso vem antes porque define o tom das paredes)
+    def construirBlocos(self):
+        self.construirMalhaPiso()
+        self.construirMalhaParedes()
+        for obj_tri in self.objetos_tri:
+            modelo = self.obterModeloTRI(obj_tri['modelo']) if obj_tri['modelo'] else None
+            if modelo is None or len(modelo) == 0:
+                continue
+            vertices = modelo.vertices()
+            posicao = npy.array([obj_tri['x'], obj_tri['y'], obj_tri['z']])
+            bloco = self.blocos.blocosDosPontos([obj_tri['x']], [obj_tri['z']], limitar=True)
+            self.blocos.incluirCaixas(bloco, [posicao + vertices.min(axis=0) * obj_tri['escala']],
+                                      [posicao + vertices.max(axis=0) * obj_tri['escala']])
+        self.blocos.montado = True
+
+    # Monta a malha das paredes uma única vez e envia para a placa de vídeo
+    def construirMalhaParedes(self):
+        cor = tuple(c * t for c, t in zip(MALHA.COR_PAREDE, self.tom_paredes))
+        vertices, retangulos = MALHA.gerarMalhaParedesComRetangulos(self.mapa, self.ALTURA_PAREDE,
+                                                                    self.TAMANHO_CELULA, cor)
+        self.blocos.adicionarMalha('paredes', vertices, GL_QUADS, GL_C3F_V3F, 4, 3, retangulos)
+
+    # Monta o piso inteiro em um único lote usando o atlas de texturas
+    def construirMalhaPiso(self):
+        vertices = MALHA.gerarMalhaPiso(self.mapa, self.mapa_tipos_piso, self.uvs_piso, self.TAMANHO_CELULA)
+        centros = vertices.reshape(-1, 4, 5)[:, :, 2:5].mean(axis=1) / self.TAMANHO_CELULA
+        xs, zs = npy.floor(centros[:, 0]).astype(int), npy.floor(centros[:, 2]).astype(int)
+        self.blocos.adicionarMalha('piso', vertices, GL_QUADS, GL_T2F_V3F, 4, 2, (xs, zs, 1, 1))
+        # As paredes eram desenhadas moduladas pelo canto do ladrilho da
+        # última célula do piso; mantém o mesmo tom sem trocar de textura
+        tipos = MALHA.matrizTexturasPiso(self.mapa_tipos_piso, self.mapa_largura, self.mapa_altura)
+        livres = [tipos[y][x] for y in range(self.mapa_altura) for x in range(self.mapa_largura)
+                  if self.livre(x, y) and tipos[y][x] in self.cores_cantos_piso]
+        self.tom_paredes = self.cores_cantos_piso[livres[-1]] if livres else (1.0, 1.0, 1.0)
+
     # Converte objetos estáticos para renderização TRI
     def converterTRI(self):
         self.objetos_tri = []
+        self.instancias_tri = None
         for obj in self.objetos_estaticos:
             modelo = obj['tipo']
             escala = self.escalas_modelos.get(modelo, 1.0)
@@ -379,6 +579,34 @@ class Labirinto3D:
                 'escala': escala
             })
 
+    # Caminho entre dois pontos do mundo (centros das células do caminho),
+    # ou None se não houver
+    def planejarCaminho(self, origem_x, origem_z, destino_x, destino_z):
+        celulas = self.planejador.caminho((int(origem_x), int(origem_z)), (int(destino_x), int(destino_z)))
+        if celulas is None:
+            return None
+        return [(x + 0.5, z + 0.5) for x, z in celulas]
+
+    # Rotula as regiões conexas por onde o jogador anda (portas contam como
+    # passagem) e refaz o índice de células livres só com o piso da região
+    # do jogador, para nada aparecer onde ele não consegue chegar. Deve ser
+    # chamado de novo quando portas ou paredes mudarem na grade
+    def atualizarComponentes(self):
+        self.componentes = ComponentesConexos((self.grade & GRADE.BLOQUEIA_JOGADOR) == 0)
+        piso = (self.grade & GRADE.PISO) != 0
+        if self.componentes.componente(*self.celulaJogador()) != FORA:
+            piso &= self.componentes.alcancaveis(*self.celulaJogador())
+        self.celulas_livres = IndiceCelulasLivres(piso)
+        self.celulas_livres.ocupar(*self.celulaJogador())
+        for cap in self.capsulas:
+            self.celulas_livres.ocupar(*self.celulaDe(cap))
+        for x, y in self.inimigos.celulas():
+            self.celulas_livres.ocupar(int(x), int(y))
+
+    # Verifica se dá para andar da célula (x, y) de origem até a de destino
+    def alcancavel(self, origem, destino):
+        return self.componentes.alcancavel(origem, destino)
+
     # Verifica se a célula é livre
     def livre(self, x, y):
         if x < 0 or x >= self.mapa_largura or y < 0 or y >= self.mapa_altura:
@@ -386,29 +614,6 @@ class Labirinto3D:
         celula = self.mapa[int(y)][int(x)]
         return celula in [1, 2, 3]
 
-    # Verifica colisão do jogador
-    def verificarColisao(self, pos_x, pos_z):
-        pontos = [
-            (pos_x, pos_z),
-            (pos_x + 0.2, pos_z),
-            (pos_x - 0.2, pos_z),
-            (pos_x, pos_z + 0.2),
-            (pos_x, pos_z - 0.2),
-        ]
-        for px, pz in pontos:
-            janela = any(janela['x'] == int(px) and janela['y'] == int(pz) for janela in self.janelas)
-            if janela:
-                return True
-            objeto = any(obj['x'] == int(px) and obj['y'] == int(pz) for obj in self.objetos_estaticos)
-            if objeto:
-                return True
-            porta = any(porta['x'] == int(px) and porta['y'] == int(pz) for porta in self.portas)
-            if porta:
-                continue
-            if not self.ehPassavel(px, pz):
-                return True
-        return False
-    
     # Atualiza posição e energia do jogador
     def atualizarMovimento(self, dt):
         if dt <= 0:
@@ -419,154 +624,114 @@ class Labirinto3D:
             return
         deslocamento = 10.0 * dt
         rad = math.radians(self.angulo_rotacao)
-        nova_x = self.posicao_jogador[0] + deslocamento * math.sin(rad)
-        nova_z = self.posicao_jogador[2] + deslocamento * math.cos(rad)
         self.energia -= 1.0 * dt
         if self.energia < 0:
             self.energia = 0
-        if not self.verificarColisao(nova_x, nova_z):
-            self.posicao_jogador[0] = nova_x
-            self.posicao_jogador[2] = nova_z
+        # Anda até a parede e desliza ao longo dela, em vez de recusar o passo
+        nova_x, nova_z = GRADE.moverCirculo(self.grade, self.posicao_jogador[0], self.posicao_jogador[2],
+                                            deslocamento * math.sin(rad), deslocamento * math.cos(rad),
+                                            self.raio_jogador)
+        anterior = self.celulaJogador()
+        self.posicao_jogador[0] = nova_x
+        self.posicao_jogador[2] = nova_z
+        self.celulas_livres.mover(anterior, self.celulaJogador())
 
-    # Desenha o piso com texturas
+    # Desenha o piso com texturas (um único bind do atlas)
     def desenharPisoComTexturas(self):
 
         glPolygonOffset(1.0, 1.0)
-    
+        if not self.blocos.montado:
+            self.construirBlocos()
         glEnable(GL_TEXTURE_2D)
         glTexEnvi(GL_TEXTURE_ENV, GL_TEXTURE_ENV_MODE, GL_MODULATE)
-        for y in range(self.mapa_altura):
-            for x in range(self.mapa_largura):
-                if not self.livre(x, y):
-                    continue
-                tipo_texto = self.mapa_tipos_piso[y][x] if y < len(self.mapa_tipos_piso) and x < len(self.mapa_tipos_piso[y]) else 5
-                textura_id = self.texturas_piso.get(tipo_texto, None)
-                if textura_id is None:
-                    continue
-                glBindTexture(GL_TEXTURE_2D, textura_id)
-                glEnable(GL_TEXTURE_2D)
-                glColor3f(1.0, 1.0, 1.0)
-                cx = x + 0.5
-                cz = y + 0.5
-                tamanho = self.TAMANHO_CELULA / 2.0
-                glBegin(GL_QUADS)
-                glTexCoord2f(0.0, 0.0); glVertex3f(cx - tamanho, 0.00, cz - tamanho)
-                glTexCoord2f(1.0, 0.0); glVertex3f(cx + tamanho, 0.00, cz - tamanho)
-                glTexCoord2f(1.0, 1.0); glVertex3f(cx + tamanho, 0.00, cz + tamanho)
-                glTexCoord2f(0.0, 1.0); glVertex3f(cx - tamanho, 0.00, cz + tamanho)
-                glEnd()
+        glColor3f(1.0, 1.0, 1.0)
+        glBindTexture(GL_TEXTURE_2D, self.textura_piso)
+        self.desenharMalhaEstatica('piso')
         glDisable(GL_TEXTURE_2D)
 
-    def desenharParede(self, x, z, altura, espessura, face_norte=True, face_sul=True,
-                       face_leste=True, face_oeste=True):
-        cx = x + 0.5
-        cz = z + 0.5
-        tamanho = self.TAMANHO_CELULA
-        esp = espessura / 2
-        glColor3f(0.7, 0.7, 0.7)
-        
-        # Lados verticais (código existente)
-        if face_norte:
-            glBegin(GL_QUADS)
-            glVertex3f(cx - tamanho/2, 0, cz - tamanho/2)
-            glVertex3f(cx + tamanho/2, 0, cz - tamanho/2)
-            glVertex3f(cx + tamanho/2, altura, cz - tamanho/2)
-            glVertex3f(cx - tamanho/2, altura, cz - tamanho/2)
-            glEnd()
-        if face_sul:
-            glBegin(GL_QUADS)
-            glVertex3f(cx + tamanho/2, 0, cz + tamanho/2)
-            glVertex3f(cx - tamanho/2, 0, cz + tamanho/2)
-            glVertex3f(cx - tamanho/2, altura, cz + tamanho/2)
-            glVertex3f(cx + tamanho/2, altura, cz + tamanho/2)
-            glEnd()
-        if face_oeste:
-            glBegin(GL_QUADS)
-            glVertex3f(cx - tamanho/2, 0, cz + tamanho/2)
-            glVertex3f(cx - tamanho/2, 0, cz - tamanho/2)
-            glVertex3f(cx - tamanho/2, altura, cz - tamanho/2)
-            glVertex3f(cx - tamanho/2, altura, cz + tamanho/2)
-            glEnd()
-        if face_leste:
-            glBegin(GL_QUADS)
-            glVertex3f(cx + tamanho/2, 0, cz - tamanho/2)
-            glVertex3f(cx + tamanho/2, 0, cz + tamanho/2)
-            glVertex3f(cx + tamanho/2, altura, cz + tamanho/2)
-            glVertex3f(cx + tamanho/2, altura, cz - tamanho/2)
-            glEnd()
-
-        # NOVO: Desenha a face superior (o topo da parede)
-        glBegin(GL_QUADS)
-        glVertex3f(cx - tamanho/2, altura, cz - tamanho/2)
-        glVertex3f(cx + tamanho/2, altura, cz - tamanho/2)
-        glVertex3f(cx + tamanho/2, altura, cz + tamanho/2)
-        glVertex3f(cx - tamanho/2, altura, cz + tamanho/2)
-        glEnd()
+    # Desenha a malha estática 'nome' dos blocos dentro do volume de visão:
+    # só as células visíveis quando há PVS ou raios para a câmera atual
+    def desenharMalhaEstatica(self, nome):
+        if self.celulas_visiveis is not None:
+            self.blocos.desenharCelulas(nome, self.celulas_visiveis)
+        else:
+            self.blocos.desenhar(nome)
+
+    # Verifica se a célula (x, z) pode aparecer na tela
+    def celulaVisivel(self, x, z):
+        if not self.blocos.celulaVisivel(x, z):
+            return False
+        return self.celulas_visiveis is None or bool(self.celulas_visiveis.contem(int(x), int(z)))
+
+    # Máscara dos pontos (x, z) do mundo que podem aparecer na tela; sem
+    # 'usar_pvs' (objetos que passam por cima das paredes), só o frustum conta
+    def pontosVisiveis(self, xs, zs, usar_pvs=True):
+        visiveis = self.blocos.pontosVisiveis(xs, zs)
+        if self.celulas_visiveis is None or not usar_pvs or not visiveis.any():
+            return visiveis
+        cx = npy.clip(npy.floor(npy.asarray(xs) / self.TAMANHO_CELULA).astype(int), 0, self.mapa_largura - 1)
+        cz = npy.clip(npy.floor(npy.asarray(zs) / self.TAMANHO_CELULA).astype(int), 0, self.mapa_altura - 1)
+        return visiveis & self.celulas_visiveis.contem(cx, cz)
 
     # Desenha o labirinto
     def desenharLabirinto(self):
         self.desenharPisoComTexturas()
-        for y in range(self.mapa_altura):
-            for x in range(self.mapa_largura):
-                if self.mapa[y][x] == 0:
-                    glEnable(GL_TEXTURE_2D)
-                    self.desenharParede(x, y, 2.7, 0.25)
-                    glDisable(GL_TEXTURE_2D)
+        self.desenharMalhaEstatica('paredes')
         for janela in self.janelas:
-            self.desenharJanela(janela['x'], janela['y'], janela['altura'])
+            if self.celulaVisivel(janela['x'], janela['y']):
+                self.desenharJanela(janela['x'], janela['y'], janela['altura'])
         for porta in self.portas:
-            self.desenharPorta(porta['x'], porta['y'], porta['altura'])
-        for obj_tri in self.objetos_tri:
-            self.desenharModeloTRI(obj_tri)
-        for cap in self.capsulas:
-            self.desenharCapsula(cap)
-        for inimigo in self.inimigos:
-            self.desenharInimigo(inimigo)
+            if self.celulaVisivel(porta['x'], porta['y']):
+                self.desenharPorta(porta['x'], porta['y'], porta['altura'])
+        self.desenharModelosTRI()
+        self.desenharCapsulas()
+        self.desenharInimigos()
 
-    # Desenha inimigo 
-    def desenharInimigo(self, inimigo):
-        glPushMatrix()
-        glTranslatef(inimigo['x'], inimigo['y'] + 0.5, inimigo['z'])
+    # Desenha todos os inimigos (uma chamada de desenho)
+    def desenharInimigos(self):
+        if len(self.inimigos) == 0:
+            return
+        if self.malha_inimigo is None:
+            self.malha_inimigo = MalhaInstanciada(MALHA.verticesEsfera(0.4, 16, 16))
+        quantidade = len(self.inimigos)
+        instancias = npy.column_stack([self.inimigos.x, npy.full(quantidade, 0.5),
+                                       self.inimigos.z, npy.ones(quantidade)])
+        instancias = instancias[self.pontosVisiveis(self.inimigos.x, self.inimigos.z)]
         glColor3f(1.0, 0.0, 0.0)
-        quad = gluNewQuadric()
-        gluSphere(quad, 0.4, 16, 16)
-        glPopMatrix()
+        self.malha_inimigo.desenharInstancias(instancias)
 
-    # Desenha cápsula 
-    def desenharCapsula(self, cap):
-        glPushMatrix()
-        glTranslatef(cap['x'], cap['y'] + 0.6, cap['z'])
+    # Desenha todas as cápsulas (uma chamada de desenho)
+    def desenharCapsulas(self):
+        if not self.capsulas:
+            return
+        if self.malha_capsula is None:
+            self.malha_capsula = MalhaInstanciada(MALHA.verticesEsfera(0.4, 10, 12))
+        instancias = npy.array([(cap['x'], cap['y'] + 0.6, cap['z'], 1.0) for cap in self.capsulas])
+        instancias = instancias[self.pontosVisiveis(instancias[:, 0], instancias[:, 2])]
         glColor3f(0.0, 1.0, 0.0)
-        quad = gluNewQuadric()
-        gluSphere(quad, 0.4, 10, 12)
-        glPopMatrix()
+        self.malha_capsula.desenharInstancias(instancias)
 
-    # Movimenta inimigos em direção ao jogador
+    # Movimenta inimigos em direção ao jogador (todos de uma vez), seguindo
+    # o campo de distâncias, que só é refeito quando o jogador muda de célula.
+    # O contato com o jogador e a separação entre inimigos usam os baldes
+    # por célula, então só inimigos em células vizinhas são comparados
     def atualizarInimigos(self, dt):
-        for inimigo in self.inimigos:
-            dx = self.posicao_jogador[0] - inimigo['x']
-            dz = self.posicao_jogador[2] - inimigo['z']
-            dist = (dx**2 + dz**2) ** 0.5
-            if dist < 0.7:
-                quantidade_roubada = 20.0
-                roubado = min(self.energia, quantidade_roubada)
-                self.energia -= roubado
-                self.pontos -= 5
-                self.reposicionarInimigoAleatorio(inimigo)
-                continue
-            if dist > 0.01:
-                dir_x = dx / dist
-                dir_z = dz / dist
-                novo_x = inimigo['x'] + dir_x * 20.0 * dt
-                novo_z = inimigo['z'] + dir_z * 20.0 * dt
-                if self.livre(int(novo_x), int(novo_z)):
-                    inimigo['x'] = novo_x
-                    inimigo['z'] = novo_z
-                else:
-                    if self.livre(int(novo_x), int(inimigo['z'])):
-                        inimigo['x'] = novo_x
-                    elif self.livre(int(inimigo['x']), int(novo_z)):
-                        inimigo['z'] = novo_z
+        jogador_x, jogador_z = self.posicao_jogador[0], self.posicao_jogador[2]
+        self.campo_fluxo.atualizar(*self.celulaJogador())
+        anteriores = self.inimigos.celulas()
+        self.hash_inimigos.reconstruir(self.inimigos.x, self.inimigos.z)
+        alcancaram = self.inimigos.alcancaramJogador(jogador_x, jogador_z,
+                                                     self.hash_inimigos.perto(jogador_x, jogador_z))
+        self.inimigos.atualizar(jogador_x, jogador_z, dt, self.grade, self.campo_fluxo, alcancaram)
+        self.hash_inimigos.reconstruir(self.inimigos.x, self.inimigos.z)
+        self.inimigos.separar(self.hash_inimigos, self.grade)
+        self.celulas_livres.moverVarias(anteriores, self.inimigos.celulas())
+        for indice in alcancaram:
+            quantidade_roubada = 20.0
+            roubado = min(self.energia, quantidade_roubada)
+            self.energia -= roubado
+            self.pontos -= 5
+            self.reposicionarInimigoAleatorio(indice)
 
     # Desenha uma janela
     def desenharJanela(self, x, y, altura_janela):
@@ -621,85 +786,48 @@ class Labirinto3D:
         glVertex3f(cx - tamanho/2 + esp, h, cz + tamanho/2)
         glEnd()
 
-    # Desenha o jogador (boneco)
+    # Desenha o jogador (boneco): só a posição e o giro mudam a cada quadro;
+    # o corpo é uma malha montada uma única vez
     def desenharJogador(self):
+        if self.malha_jogador is None:
+            self.construirMalhaJogador()
         glPushMatrix()
         glTranslatef(self.posicao_jogador[0], self.posicao_jogador[1] - 1.0 , self.posicao_jogador[2])
         glRotatef(self.angulo_rotacao, 0, 1, 0)
-        quad = gluNewQuadric()
-        gluQuadricNormals(quad, GLU_SMOOTH)
-
-        # Perna esquerda
-        glPushMatrix()
-        glTranslatef(-0.18, 0.3, 0.0)      
-        glRotatef(-10, 1, 0, 0)
-        glColor3f(0.15, 0.15, 0.6)         
-        gluCylinder(quad, 0.09, 0.09, 0.55, 12, 4)
-        glTranslatef(0.0, 0.0, 0.55)
-        gluSphere(quad, 0.10, 10, 8)       
-        glPopMatrix()
-
-        # Perna direita 
-        glPushMatrix()
-        glTranslatef(0.18, 0.3, 0.0)
-        glRotatef(-10, 1, 0, 0)
-        glColor3f(0.15, 0.15, 0.6)
-        gluCylinder(quad, 0.09, 0.09, 0.55, 12, 4)
-        glTranslatef(0.0, 0.0, 0.55)
-        gluSphere(quad, 0.10, 10, 8)
-        glPopMatrix()
-        
-        # Tronco  
-        glPushMatrix()
-        glTranslatef(0.0, 0.8, 0.0)
-        glRotatef(-90, 1, 0, 0)            
-        glColor3f(0.2, 0.6, 0.9)           
-        gluCylinder(quad, 0.32, 0.28, 0.7, 16, 4)
-        glPopMatrix()
-
-        # Cabeça 
-        glPushMatrix()
-        glTranslatef(0.0, 1.6, 0.0)
-        glColor3f(1.0, 0.85, 0.7)          
-        gluSphere(quad, 0.28, 18, 16)
-        glPushMatrix()
-        glTranslatef(0.12, 0.05, 0.22)
-        glColor3f(0.0, 0.0, 0.0)
-        gluSphere(quad, 0.04, 8, 8)
-        glPopMatrix()
-        glPushMatrix()
-        glTranslatef(-0.12, 0.05, 0.22)
-        glColor3f(0.0, 0.0, 0.0)
-        gluSphere(quad, 0.04, 8, 8)
-        glPopMatrix()
-        glPopMatrix()  
-
-        # Braço esquerdo
-        glPushMatrix()
-        glTranslatef(-0.42, 1.05, 0.0)
-        glRotatef(10, 0, 0, 1)
-        glColor3f(0.15, 0.15, 0.6)
-        gluCylinder(quad, 0.07, 0.06, 0.45, 12, 4)
-        glTranslatef(0.0, 0.0, 0.45)
-        gluSphere(quad, 0.06, 8, 6)
+        self.malha_jogador.desenhar()
         glPopMatrix()
 
-        # Braço direito
-        glPushMatrix()
-        glTranslatef(0.42, 1.05, 0.0)
-        glRotatef(-10, 0, 0, 1)
-        glColor3f(0.15, 0.15, 0.6)
-        gluCylinder(quad, 0.07, 0.06, 0.45, 12, 4)
-        glTranslatef(0.0, 0.0, 0.45)
-        gluSphere(quad, 0.06, 8, 6)
-        glPopMatrix()
-        glPopMatrix()
+    # Tessela as partes do boneco (pernas, tronco, cabeça, olhos e braços)
+    # em uma única malha colorida, com as mesmas transformações que eram
+    # feitas com glTranslatef/glRotatef antes de cada cilindro ou esfera
+    def construirMalhaJogador(self):
+        T, R = MALHA.matrizTranslacao, MALHA.matrizRotacao
+        azul_escuro, azul, pele, preto = (0.15, 0.15, 0.6), (0.2, 0.6, 0.9), (1.0, 0.85, 0.7), (0.0, 0.0, 0.0)
+        perna = MALHA.verticesCilindro(0.09, 0.09, 0.55, 12, 4)
+        pe = MALHA.verticesEsfera(0.10, 10, 8)
+        braco = MALHA.verticesCilindro(0.07, 0.06, 0.45, 12, 4)
+        mao = MALHA.verticesEsfera(0.06, 8, 6)
+        olho = MALHA.verticesEsfera(0.04, 8, 8)
+        partes = []
+        for lado in (-1, 1):
+            quadril = T(0.18 * lado, 0.3, 0.0) @ R(-10, 1, 0, 0)
+            partes += [(perna, quadril, azul_escuro), (pe, quadril @ T(0.0, 0.0, 0.55), azul_escuro)]
+        partes.append((MALHA.verticesCilindro(0.32, 0.28, 0.7, 16, 4), T(0.0, 0.8, 0.0) @ R(-90, 1, 0, 0), azul))
+        cabeca = T(0.0, 1.6, 0.0)
+        partes.append((MALHA.verticesEsfera(0.28, 18, 16), cabeca, pele))
+        for lado in (1, -1):
+            partes.append((olho, cabeca @ T(0.12 * lado, 0.05, 0.22), preto))
+        for lado in (-1, 1):
+            ombro = T(0.42 * lado, 1.05, 0.0) @ R(-10 * lado, 0, 0, 1)
+            partes += [(braco, ombro, azul_escuro), (mao, ombro @ T(0.0, 0.0, 0.45), azul_escuro)]
+        vertices = npy.concatenate([MALHA.verticesColoridos(v, matriz, cor) for v, matriz, cor in partes])
+        self.malha_jogador = MalhaGL(vertices, GL_TRIANGLES)
 
     # Configura a perspectiva e a câmera
     def configurarPerspectiva(self):
         glMatrixMode(GL_PROJECTION)
         glLoadIdentity()
-        gluPerspective(45, (self.largura / self.altura), 5.0, 2000.0)
+        gluPerspective(self.campo_visao, (self.largura / self.altura), self.plano_perto, self.plano_longe)
         glMatrixMode(GL_MODELVIEW)
         glLoadIdentity()
 
@@ -711,6 +839,7 @@ class Labirinto3D:
             alvo_x = camera_x + math.sin(rad) * 5
             alvo_z = camera_z + math.cos(rad) * 5
             gluLookAt(camera_x, camera_y, camera_z, alvo_x, camera_y, alvo_z, 0, 1, 0)
+            self.posicao_camera = npy.array([camera_x, camera_y, camera_z])
         else:
             if self.alvo_camera == 1:
                 camera_x = self.posicao_jogador[0] - math.sin(math.radians(self.angulo_rotacao)) * 8
@@ -719,35 +848,88 @@ class Labirinto3D:
                 gluLookAt(camera_x, camera_y, camera_z,
                           self.posicao_jogador[0], self.posicao_jogador[1] + 1, self.posicao_jogador[2],
                           0, 1, 0)
+                self.posicao_camera = npy.array([camera_x, camera_y, camera_z])
             else:
                 centro_x = self.mapa_largura / 2
                 centro_z = self.mapa_altura / 2
                 gluLookAt(centro_x, 80, centro_z,
           centro_x, 0, centro_z,
           0, 0, -1)
+                self.posicao_camera = npy.array([centro_x, 80.0, centro_z])
+        # Só os blocos dentro do volume de visão serão desenhados
+        self.blocos.atualizarVisiveis(BLOCOS.planosDoFrustumAtual())
+        self.atualizarCelulasVisiveis()
 
+    # Em primeira pessoa a câmera fica abaixo do topo das paredes, então só
+    # aparece o que está no PVS das células onde os raios da tela começam
+    # (o plano de corte próximo fica a alguns metros do olho e pode estar
+    # além de paredes) ou, no modo 'raios' e em mapas grandes demais para o
+    # PVS, o que o leque de raios da câmera (um por coluna da tela, até o
+    # limite de RaiosLabirinto) alcança, com uma célula de folga. Os raios
+    # só tocam a janela do mapa que alcançam, e o desenho só passa pelos
+    # blocos visíveis
+    def atualizarCelulasVisiveis(self):
+        self.celulas_visiveis = None
+        if self.modo_camera != 0 or self.raios is None or self.modo_visibilidade == 'blocos':
+            return
+        inicio = time.perf_counter()
+        x, z = self.posicao_jogador[0], self.posicao_jogador[2]
+        aspecto = self.largura / self.altura
+        if self.modo_visibilidade == 'pvs' and self.pvs is not None:
+            xs, zs = celulasDaCamera(x, z, self.angulo_rotacao, self.plano_perto, self.campo_visao, aspecto,
+                                     self.TAMANHO_CELULA)
+            self.celulas_visiveis = CelulasVisiveis(self.pvs.mascara(xs, zs), 0, 0,
+                                                    self.mapa_largura, self.mapa_altura)
+        else:
+            self.celulas_visiveis = self.raios.celulasVistas(x, z, self.angulo_rotacao, self.plano_perto,
+                                                             self.campo_visao, aspecto, self.largura,
+                                                             self.TAMANHO_CELULA).aumentadas()
+        self.tempo_visibilidade = time.perf_counter() - inicio
 
 
-    # Desenha um modelo TRI
-    def desenharModeloTRI(self, obj_tri):
-        nome_modelo = obj_tri['modelo']
-        if nome_modelo not in self.modelos_tri:
-            return
-        triangulos = self.modelos_tri[nome_modelo]
-        glPushMatrix()
-        glTranslatef(obj_tri['x'], obj_tri['y'], obj_tri['z'])
-        glScalef(obj_tri['escala'], obj_tri['escala'], obj_tri['escala'])
-
-        glBegin(GL_TRIANGLES)
-        for tri in triangulos:
-            glColor3f(*tri['cor'])
-            glVertex3f(tri['v1'][0], tri['v1'][1], tri['v1'][2])
-            glColor3f(*tri['cor'])
-            glVertex3f(tri['v2'][0], tri['v2'][1], tri['v2'][2])
-            glColor3f(*tri['cor'])
-            glVertex3f(tri['v3'][0], tri['v3'][1], tri['v3'][2])
-        glEnd()
-        glPopMatrix()
+
+    # Desenha os objetos TRI agrupados por modelo: uma chamada de desenho
+    # por nível de detalhe de cada modelo, com a posição e a escala de cada
+    # objeto como instância. O nível vem da distância do objeto à câmera
+    def desenharModelosTRI(self):
+        self.objetos_por_nivel = []
+        if self.instancias_tri is None:
+            grupos = {}
+            for obj_tri in self.objetos_tri:
+                if obj_tri['modelo']:
+                    grupos.setdefault(obj_tri['modelo'], []).append(
+                        (obj_tri['x'], obj_tri['y'], obj_tri['z'], obj_tri['escala']))
+            self.instancias_tri = {nome: npy.array(lista, dtype=npy.float32) for nome, lista in grupos.items()}
+            self.tri_dentro_celulas = {}
+        for nome_modelo, instancias in self.instancias_tri.items():
+            modelo = self.obterModeloTRI(nome_modelo)
+            if modelo is None:
+                continue
+            if nome_modelo not in self.tri_dentro_celulas:
+                # O PVS só vale para modelos mais baixos que as paredes que
+                # não passam da célula vizinha (a folga da máscara)
+                vertices = modelo.vertices() * float(instancias[:, 3].max()) if len(modelo) else npy.zeros((1, 3))
+                self.tri_dentro_celulas[nome_modelo] = bool(
+                    vertices[:, 1].max() <= self.ALTURA_PAREDE
+                    and npy.abs(vertices[:, [0, 2]]).max() <= 1.5 * self.TAMANHO_CELULA)
+            visiveis = self.pontosVisiveis(instancias[:, 0], instancias[:, 2], self.tri_dentro_celulas[nome_modelo])
+            self.desenharNiveisTRI(nome_modelo, instancias[visiveis])
+
+    # Desenha as instâncias de um modelo TRI, cada uma com a malha do nível
+    # de detalhe da sua distância à câmera
+    def desenharNiveisTRI(self, nome_modelo, instancias):
+        malhas = self.malhasCoresLOD(nome_modelo) if self.cores_lod else self.malhasModeloTRI(nome_modelo)
+        distancias = npy.linalg.norm(instancias[:, :3] - self.posicao_camera, axis=1)
+        niveis = npy.minimum(npy.searchsorted(self.distancias_lod, distancias, side='right'), len(malhas) - 1)
+        if len(self.objetos_por_nivel) < len(malhas):
+            self.objetos_por_nivel += [0] * (len(malhas) - len(self.objetos_por_nivel))
+        for nivel in range(len(malhas)):
+            self.objetos_por_nivel[nivel] += int(npy.count_nonzero(niveis == nivel))
+        if not self.cores_lod:
+            # Níveis que repetem o anterior são desenhados juntos com ele
+            niveis = npy.array([malhas.index(malha) for malha in malhas])[niveis]
+        for nivel in npy.unique(niveis).tolist():
+            malhas[nivel].desenharInstancias(instancias[niveis == nivel])
 
     # Desenha o HUD (Energia e Pontos)
     def desenharHUD(self):
@@ -789,6 +971,24 @@ class Labirinto3D:
         glRasterPos2i(10, 40)  
         for ch in texto:
             glutBitmapCharacter(GLUT_BITMAP_9_BY_15, ord(ch))
+        texto = f"Blocos desenhados: {self.blocos.desenhados}/{len(self.blocos)}"
+        glRasterPos2i(10, 60)
+        for ch in texto:
+            glutBitmapCharacter(GLUT_BITMAP_9_BY_15, ord(ch))
+        if self.celulas_visiveis is not None:
+            modo = "PVS" if self.modo_visibilidade == 'pvs' and self.pvs is not None else "raios"
+            texto = (f"Células visíveis ({modo}, {self.tempo_visibilidade * 1000:.2f} ms): "
+                     f"{self.celulas_visiveis.quantidade()}/{self.mapa_largura * self.mapa_altura}")
+            glRasterPos2i(10, 80)
+            for ch in texto:
+                glutBitmapCharacter(GLUT_BITMAP_9_BY_15, ord(ch))
+        if self.cores_lod:
+            limites = "/".join(f"{d:g}" for d in self.distancias_lod)
+            texto = (f"Objetos TRI por nível (verde/amarelo/vermelho, trocas em {limites}): "
+                     + "/".join(str(q) for q in self.objetos_por_nivel))
+            glRasterPos2i(10, 100)
+            for ch in texto:
+                glutBitmapCharacter(GLUT_BITMAP_9_BY_15, ord(ch))
 
         glEnable(GL_DEPTH_TEST)
         glPopMatrix()
@@ -823,7 +1023,7 @@ def main():
     # Inicializa o jogo e o loop principal GLUT
     jogo = Labirinto3D()
     print("\n=== LABIRINTO 3D (GLUT) ===")
-    print("Controles: BARRA - Avançar | ESQ/DIR - Girar | 1/2/3 - Câmera | ESC - Sair")
+    print("Controles: BARRA - Avançar | ESQ/DIR - Girar | 1/2/3 - Câmera | 4 - Visibilidade | 5 - Cores do LOD | ESC - Sair")
     glutMainLoop()
 
 if __name__ == "__main__":
@@ -0,0 +1,68 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Teste de longa duração do Labirinto 3D: roda o laço principal do jogo
+(atualização e desenho) por muitos quadros seguidos, com o jogador andando
+e girando, e mostra a memória residente do processo ao longo do tempo.
+Com os recursos de desenho criados uma vez só, a memória fica estável.
+
+Uso:
+    python soak_labirinto.py             (100000 quadros)
+    python soak_labirinto.py 20000       (outra quantidade de quadros)
+"""
+
+import os
+import sys
+import time
+
+from OpenGL.GLUT import glutHideWindow
+
+from jogoLabirinto import Labirinto3D
+
+QUADROS = 100000
+AMOSTRAS = 10
+
+
+# Memória residente do processo em MB (None se o sistema não informar)
+def memoriaResidente():
+    try:
+        with open("/proc/self/statm") as arquivo:
+            paginas = int(arquivo.read().split()[1])
+        return paginas * os.sysconf("SC_PAGE_SIZE") / (1024 * 1024)
+    except (OSError, ValueError, AttributeError):
+        pass
+    try:
+        import psutil
+    except ImportError:
+        return None
+    return psutil.Process().memory_info().rss / (1024 * 1024)
+
+
+def main():
+    quadros = int(sys.argv[1]) if len(sys.argv) > 1 else QUADROS
+    jogo = Labirinto3D()
+    glutHideWindow()
+    jogo.espaco_pressionado = True
+    intervalo = max(quadros // AMOSTRAS, 1)
+    inicial = None
+    inicio = time.perf_counter()
+    print(f"{'quadro':>8}  {'memória (MB)':>12}  {'variação':>9}")
+    for quadro in range(1, quadros + 1):
+        # Mantém o jogador andando pelo mapa inteiro
+        jogo.energia = 100.0
+        jogo.angulo_rotacao = (jogo.angulo_rotacao + 0.7) % 360.0
+        jogo.loopPrincipal()
+        if quadro == 1 or quadro % intervalo == 0:
+            memoria = memoriaResidente()
+            if memoria is None:
+                print(f"{quadro:8d}  {'?':>12}")
+                continue
+            if inicial is None:
+                inicial = memoria
+            print(f"{quadro:8d}  {memoria:12.1f}  {memoria - inicial:+9.1f}")
+    tempo = time.perf_counter() - inicio
+    print(f"{quadros} quadros em {tempo:.1f} s ({quadros / tempo:.0f} quadros/s)")
+
+
+if __name__ == "__main__":
+    main()